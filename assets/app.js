@@ -0,0 +1,159 @@
+const searchInput = document.getElementById('search-input');
+const searchDropdown = document.getElementById('search-results-dropdown');
+const searchContent = document.getElementById('search-results-content');
+let searchTimeout;
+
+if (searchInput) {
+    searchInput.addEventListener('input', (e) => {
+        clearTimeout(searchTimeout);
+        const query = e.target.value.trim();
+        if (query.length < 2) { searchDropdown.classList.remove('visible'); return; }
+
+        searchTimeout = setTimeout(async () => {
+            const response = await fetch(`/api/search?q=${encodeURIComponent(query)}&limit=8`);
+            const results = await response.json();
+            searchContent.innerHTML = '';
+            if (results.length > 0) {
+                results.forEach(item => {
+                    const div = document.createElement('div');
+                    div.className = "flex items-center gap-3 p-3 hover:bg-indigo-50 cursor-pointer rounded-lg border-b last:border-0 border-gray-50";
+                    div.onclick = () => window.location.href = `/course/${item.id}`;
+                    div.innerHTML = `
+                        <div class="w-8 h-8 bg-indigo-100 rounded flex items-center justify-center text-indigo-600 text-[10px]"><i class="fa-solid fa-play"></i></div>
+                        <div class="flex-1 overflow-hidden">
+                            <div class="text-xs font-bold truncate">${item.title_html}</div>
+                            <div class="text-[10px] text-gray-400 truncate">${item.snippet_html}</div>
+                        </div>
+                    `;
+                    searchContent.appendChild(div);
+                });
+            } else {
+                searchContent.innerHTML = '<div class="p-3 text-center text-xs text-gray-400 italic">No matches...</div>';
+            }
+            searchDropdown.classList.add('visible');
+        }, 300);
+    });
+    document.addEventListener('click', (e) => {
+        if (!document.getElementById('search-container').contains(e.target)) searchDropdown.classList.remove('visible');
+    });
+}
+
+function toggleSection(sectionId) {
+    const content = document.getElementById('content-' + sectionId);
+    const icon = document.getElementById('icon-' + sectionId);
+    content.classList.toggle('expanded');
+    icon.classList.toggle('rotated');
+}
+
+function playLesson(title, position, video, poster) {
+    const videoTitle = document.getElementById('active-lesson-title');
+    if(videoTitle) videoTitle.innerText = title;
+    const lessonInput = document.getElementById('active-lesson');
+    if(lessonInput) lessonInput.value = position;
+    const player = document.getElementById('main-video');
+    if(player && player.getAttribute('src') !== (video || null)) {
+        player.pause();
+        if(video) { player.poster = poster; player.src = video; }
+        else { player.removeAttribute('poster'); player.removeAttribute('src'); player.load(); }
+        player.classList.toggle('hidden', !video);
+        document.getElementById('no-video').classList.toggle('hidden', !!video);
+    }
+    document.querySelectorAll('.lesson-item').forEach(item => {
+        item.classList.remove('bg-indigo-50', 'border-l-4', 'border-indigo-600');
+    });
+    if(event) event.currentTarget.classList.add('bg-indigo-50', 'border-l-4', 'border-indigo-600');
+}
+
+function switchTab(tabId) {
+    document.querySelectorAll('.tab-btn').forEach(btn => {
+        btn.classList.remove('border-indigo-600', 'text-indigo-600');
+        btn.classList.add('text-gray-400');
+    });
+    document.querySelectorAll('.tab-content').forEach(content => { content.classList.remove('active'); });
+    event.target.classList.add('border-indigo-600', 'text-indigo-600');
+    event.target.classList.remove('text-gray-400');
+    document.getElementById('tab-' + tabId).classList.add('active');
+    if (tabId === 'notes' && !notesLoaded) loadNotes();
+}
+
+async function loadMore(btn) {
+    btn.disabled = true;
+    const response = await fetch(btn.dataset.next);
+    document.getElementById('course-grid').insertAdjacentHTML('beforeend', await response.text());
+    const next = response.headers.get('X-Next-Page');
+    if (next) { btn.dataset.next = next; btn.disabled = false; } else { btn.parentElement.remove(); }
+}
+
+// Notes autosave: keystrokes only update the pending op for the current draft, and pending ops
+// are sent as one batch once typing pauses (or when the page is hidden).
+const NOTE_DEBOUNCE_MS = 1000;
+let noteKey = newNoteKey(), pendingNotes = {}, noteTimer = null, notesCursor = '', notesLoaded = false;
+
+function newNoteKey() {
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+}
+
+function notesUrl(suffix) {
+    return '/api/notes/' + document.getElementById('tab-notes').dataset.course + suffix;
+}
+
+function currentLesson() {
+    const input = document.getElementById('active-lesson');
+    return input && input.value !== '' ? parseInt(input.value) : null;
+}
+
+function queueNote(op) {
+    pendingNotes[op.key] = op;
+    clearTimeout(noteTimer);
+    noteTimer = setTimeout(flushNotes, NOTE_DEBOUNCE_MS);
+}
+
+function flushNotes(beacon) {
+    clearTimeout(noteTimer);
+    const ops = Object.values(pendingNotes);
+    if (!ops.length) return;
+    pendingNotes = {};
+    const body = JSON.stringify({ops: ops});
+    if (beacon && navigator.sendBeacon) { navigator.sendBeacon(notesUrl('/sync'), new Blob([body], {type: 'application/json'})); return; }
+    fetch(notesUrl('/sync'), {method: 'POST', headers: {'Content-Type': 'application/json'}, body: body})
+        .then(r => { if (!r.ok) throw new Error(r.status); })
+        .catch(() => { ops.forEach(op => { if (!pendingNotes[op.key]) pendingNotes[op.key] = op; }); noteTimer = setTimeout(flushNotes, NOTE_DEBOUNCE_MS * 5); });
+}
+
+function draftNote() {
+    queueNote({key: noteKey, lesson: currentLesson(), body: document.getElementById('note-input').value});
+}
+
+function renderNote(note, prepend) {
+    const div = document.createElement('div');
+    div.className = "p-3 bg-yellow-50 border-l-4 border-yellow-400 text-sm mb-3 rounded-r-lg";
+    const text = document.createElement('p'), meta = document.createElement('p');
+    text.textContent = note.body;
+    meta.className = "text-[10px] text-gray-400 mt-1";
+    meta.textContent = note.updated_at ? 'Saved ' + note.updated_at.slice(0, 16) + ' UTC' : 'Saved just now';
+    div.append(text, meta);
+    const list = document.getElementById('saved-notes');
+    prepend ? list.prepend(div) : list.append(div);
+}
+
+async function loadNotes() {
+    notesLoaded = true;
+    const res = await fetch(notesUrl('?cursor=' + encodeURIComponent(notesCursor)));
+    if (!res.ok) return;
+    const page = await res.json();
+    page.notes.filter(n => n.key !== noteKey).forEach(n => renderNote(n, false));
+    notesCursor = page.next_cursor || '';
+    document.getElementById('notes-more').classList.toggle('hidden', !page.next_cursor);
+}
+
+function saveNote() {
+    const input = document.getElementById('note-input');
+    if (!input.value.trim()) return;
+    draftNote();
+    flushNotes();
+    renderNote({body: input.value}, true);
+    input.value = '';
+    noteKey = newNoteKey();
+}
+
+window.addEventListener('pagehide', () => flushNotes(true));
@@ -0,0 +1,133 @@
+"""Course analytics: the admin overview read from the rollups vs. the same numbers aggregated from raw rows, the cost
+the rollup triggers add to enroll/progress writes, and how long a full rebuild takes.
+
+    python benchmarks/bench_analytics.py --scale 10k [--reads 20] [--writes 2000]
+
+Reads: totals, the 50 most-enrolled courses and a 30-day daily series, once from course_stats/daily_stats
+(lms.analytics_overview) and once as GROUP BY queries over enrollment and certificate. Writes: enroll and
+advance-progress transactions, one per request as the routes commit them, against the database and against a
+copy with the rollup triggers dropped. Rebuild: `flask analytics-rebuild --check`, i.e. recompute and compare.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import lms_main as lms  # noqa: E402
+import datagen  # noqa: E402
+from loadtest import percentile  # noqa: E402
+from lms_store import SQLiteStore  # noqa: E402
+
+UNTIL = date(2024, 12, 31)  # datagen spreads enrollments over 2024
+SINCE = UNTIL - timedelta(days=lms.ANALYTICS_DAYS - 1)
+
+RAW_TOTALS = """
+    SELECT COUNT(*) AS enrolled, IFNULL(SUM(status = 'Completed'), 0) AS completed, IFNULL(SUM(progress), 0) AS progress_sum,
+           (SELECT COUNT(*) FROM certificate) AS certificates, (SELECT COUNT(*) FROM course) AS courses
+    FROM enrollment
+"""
+RAW_COURSES = """
+    SELECT c.id AS course_id, c.title, COUNT(e.id) AS enrolled, IFNULL(SUM(e.status = 'Completed'), 0) AS completed,
+           IFNULL(SUM(e.progress), 0) AS progress_sum, (SELECT COUNT(*) FROM certificate WHERE course_id = c.id) AS certificates
+    FROM course c LEFT JOIN enrollment e ON e.course_id = c.id
+    GROUP BY c.id ORDER BY enrolled DESC, c.id LIMIT ?
+"""
+RAW_DAILY = """
+    SELECT day, SUM(enrolled) AS enrolled, SUM(completed) AS completed, SUM(certificates) AS certificates FROM (
+        SELECT substr(enrolled_at, 1, 10) AS day, 1 AS enrolled, 0 AS completed, 0 AS certificates FROM enrollment WHERE enrolled_at >= ?1 AND enrolled_at < ?2
+        UNION ALL SELECT substr(completed_at, 1, 10), 0, 1, 0 FROM enrollment WHERE completed_at >= ?1 AND completed_at < ?2
+        UNION ALL SELECT date_issued, 0, 0, 1 FROM certificate WHERE date_issued >= ?1 AND date_issued < ?2
+    ) GROUP BY day ORDER BY day
+"""
+
+
+def raw_overview(conn):
+    until = (UNTIL + timedelta(days=1)).isoformat()
+    totals = conn.execute(RAW_TOTALS).fetchone()
+    courses = conn.execute(RAW_COURSES, (lms.ANALYTICS_PAGE_SIZE,)).fetchall()
+    daily = conn.execute(RAW_DAILY, (SINCE.isoformat(), until)).fetchall()
+    return totals, courses, daily
+
+def rollup_overview(conn):
+    return lms.analytics_overview(SQLiteStore(conn), lms.ANALYTICS_START, lms.ANALYTICS_PAGE_SIZE, SINCE, UNTIL)
+
+def timed(fn, reps):
+    times = []
+    for _ in range(reps):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return sorted(times)
+
+def writes(path, ops):
+    conn = lms.connect_db(path)
+    store = SQLiteStore(conn)
+    times = []
+    for kind, uid, course_id in ops:
+        started = time.perf_counter()
+        if kind == 'enroll': store.enroll(uid, course_id)
+        else: store.advance_progress(lms.progress_params(uid, course_id))
+        store.commit()
+        times.append(time.perf_counter() - started)
+    conn.close()
+    return sorted(times)
+
+def without_triggers(conn):
+    """A copy of the database with the rollup triggers dropped, as the schema was before them."""
+    path = os.path.join(tempfile.mkdtemp(), 'no-rollups.db')
+    copy = lms.connect_db(path)
+    conn.backup(copy)
+    for (name,) in copy.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND (name LIKE 'trg_course_stats%' OR name LIKE 'trg_enrollment_times%')").fetchall():
+        copy.execute(f"DROP TRIGGER {name}")
+    copy.commit()
+    copy.close()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(datagen.SCALES), default='1k', help='dataset generated into an empty LMS_DB')
+    parser.add_argument('--reads', type=int, default=20)
+    parser.add_argument('--writes', type=int, default=2000, help='enroll and progress transactions per variant')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    if not conn.execute("SELECT 1 FROM user WHERE email LIKE 'learner%' LIMIT 1").fetchone():
+        lms.seed_db(conn)
+        datagen.generate(conn, *datagen.SCALES[args.scale], seed=args.seed)
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ('course', 'enrollment', 'certificate')}
+    print(f"db {lms.DB_NAME}: " + ', '.join(f"{n:,} {t}s" for t, n in counts.items()))
+
+    print(f"{'overview':<10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, fn in (('raw', lambda: raw_overview(conn)), ('rollups', lambda: rollup_overview(conn))):
+        times = timed(fn, args.reads)
+        print(f"{name:<10}{percentile(times, 50):>10.2f}{percentile(times, 95):>10.2f}")
+
+    rng = random.Random(args.seed)
+    users = [r[0] for r in conn.execute("SELECT id FROM user ORDER BY id")]
+    courses = [r[0] for r in conn.execute("SELECT id FROM course ORDER BY id")]
+    pairs = [(rng.choice(users), rng.choice(courses)) for _ in range(args.writes // 2)]
+    ops = [('enroll', *p) for p in pairs] + [('progress', *p) for p in pairs]
+    plain = without_triggers(conn)
+    conn.close()
+    print(f"{'writes':<10}{'p50 ms':>10}{'p95 ms':>10}{'tx/s':>10}")
+    for name, path in (('plain', plain), ('rollups', lms.DB_NAME)):
+        times = writes(path, ops)
+        print(f"{name:<10}{percentile(times, 50):>10.3f}{percentile(times, 95):>10.3f}{len(times) / sum(times):>10,.0f}")
+
+    conn = lms.connect_db()
+    started = time.perf_counter()
+    report = lms.rebuild_analytics(conn, check=True)
+    print(f"rebuild --check {time.perf_counter() - started:.2f}s, rows differed: " + ', '.join(f"{t} {d}" for t, (rows, d) in report.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""The JSON read APIs under many concurrent connections: threaded lms_serve.py against async lms_async.py.
+
+    python benchmarks/bench_async.py --scale 10k [--clients 1000] [--requests 5] [--threads 8]
+
+Both servers get the same database, the same thread budget (request threads for lms_serve, database
+threads for lms_async) and the same load: every client opens its own keep-alive connection, sends
+--requests requests drawn from /api/search, /api/catalogue and /api/dashboard, and closes it.
+All clients start together. 503 responses (the async server's back-pressure) are counted apart
+from errors.
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import lms_main as lms  # noqa: E402
+import datagen  # noqa: E402
+from bench_search import vocabulary  # noqa: E402
+from bench_serve import free_port  # noqa: E402
+from loadtest import percentile, sample_learners  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUEST_TIMEOUT = 60
+
+
+def start(command, port):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, command[0]), '--port', str(port)] + command[1:],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit(f"{command[0]} did not come up")
+
+def paths(words, weights):
+    """Request factory over the three read APIs; search queries follow the long-tailed vocabulary."""
+    def factory(rng):
+        kind = rng.random()
+        if kind < 0.5:
+            q = ' '.join(w[:rng.randint(2, 6)] for w in rng.choices(words, cum_weights=weights, k=rng.choice((1, 1, 2))))
+            return '/api/search?' + urlencode({'q': q})
+        if kind < 0.8: return '/api/catalogue'
+        return '/api/dashboard'
+    return factory
+
+async def client(port, cookie, factory, rng, requests, latencies, statuses):
+    reader = writer = None
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            if writer is None: reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f"GET {factory(rng)} HTTP/1.1\r\nHost: bench\r\nCookie: session={cookie}\r\n\r\n".encode())
+            status_line, length, close = await reader.readline(), 0, False
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                name, _, value = line.partition(b':')
+                name = name.lower()
+                if name == b'content-length': length = int(value)
+                elif name == b'connection': close = value.strip().lower() == b'close'
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            statuses.append(int(status_line.split()[1]))
+            if close:  # the server would not keep the connection; the next request pays for a new one
+                writer.close()
+                writer = None
+    finally:
+        if writer: writer.close()
+
+async def load(port, cookies, factory, requests, seed):
+    latencies, statuses = [], []
+    started = time.perf_counter()
+    results = await asyncio.gather(*(asyncio.wait_for(client(port, cookie, factory, random.Random(seed + i), requests, latencies, statuses), REQUEST_TIMEOUT * requests)
+                                     for i, cookie in enumerate(cookies)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    failed = sum(isinstance(r, BaseException) for r in results)  # connection refused, reset or timed out
+    return {'rps': len(latencies) / elapsed, 'p50_ms': percentile(latencies, 50), 'p95_ms': percentile(latencies, 95), 'p99_ms': percentile(latencies, 99),
+            'errors': failed + sum(s >= 400 and s != 503 for s in statuses), 'rejected': statuses.count(503)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(datagen.SCALES), default='1k', help='dataset generated into an empty LMS_DB')
+    parser.add_argument('--clients', type=int, default=1000, help='concurrent connections')
+    parser.add_argument('--requests', type=int, default=5, help='keep-alive requests per connection')
+    parser.add_argument('--threads', type=int, default=8, help='request threads (lms_serve) / database threads (lms_async)')
+    parser.add_argument('--max-pending', type=int, default=4096, help="lms_async's queued-query limit")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    if not conn.execute("SELECT 1 FROM user WHERE email LIKE 'learner%' LIMIT 1").fetchone():
+        lms.seed_db(conn)
+        datagen.generate(conn, *datagen.SCALES[args.scale], seed=args.seed)
+    learners = sample_learners(conn, 200, random.Random(args.seed))
+    conn.close()
+    serializer = lms.app.session_interface.get_signing_serializer(lms.app)
+    cookies = [serializer.dumps({'user_id': learners[i % len(learners)].uid}) for i in range(args.clients)]
+    factory = paths(*vocabulary(random.Random(args.seed)))
+
+    servers = [('lms_serve', ['lms_serve.py', '--workers', '1', '--threads', str(args.threads), '--backlog', str(args.clients)]),
+               ('lms_async', ['lms_async.py', '--db-threads', str(args.threads), '--max-pending', str(args.max_pending), '--backlog', str(args.clients)])]
+    print(f"db {lms.DB_NAME}, {os.cpu_count()} cpus, {args.clients} connections x {args.requests} requests, {args.threads} threads")
+    print(f"{'server':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'503s':>7}")
+    for name, command in servers:
+        port = free_port()
+        proc = start(command, port)
+        try:
+            asyncio.run(load(port, cookies[:50], factory, 2, args.seed))  # warm caches and the connection pool
+            res = asyncio.run(load(port, cookies, factory, args.requests, args.seed))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(60)
+        print(f"{name:<10}{res['rps']:>10,.1f}{res['p50_ms']:>10.2f}{res['p95_ms']:>10.2f}{res['p99_ms']:>10.2f}{res['errors']:>8}{res['rejected']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Type-ahead latency and memory: in-memory Autocomplete index vs. the legacy LIKE query.
+
+    python benchmarks/bench_autocomplete.py [--sizes 10000 100000 1000000] [--queries 500]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lms_autocomplete import Autocomplete  # noqa: E402
+from bench_search import CATEGORIES, vocabulary  # noqa: E402
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return [samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1e6 for p in (50, 99)]
+
+
+def run(fn, queries):
+    times = []
+    for q in queries:
+        t = time.perf_counter()
+        fn(q)
+        times.append(time.perf_counter() - t)
+    return percentiles(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    words, weights = vocabulary(rng)
+    print(f"{'titles':>9} {'build s':>8} {'MB':>7} {'trie p50 us':>12} {'trie p99 us':>12} {'LIKE p50 us':>12} {'LIKE p99 us':>12} {'SQL fallbacks':>14}")
+    for size in args.sizes:
+        rows = [(i + 1, ' '.join(rng.choices(words, cum_weights=weights, k=3)).title(), rng.choice(CATEGORIES)) for i in range(size)]
+        queries = []
+        for _ in range(args.queries):
+            terms = rng.choices(words, cum_weights=weights, k=rng.choice((1, 1, 2)))
+            queries.append(' '.join(w[:rng.randint(1, 6)] for w in terms))
+
+        start = time.perf_counter()
+        index = Autocomplete.from_rows(rows)
+        build = time.perf_counter() - start
+        megabytes = index.stats()['total_bytes'] / 2 ** 20
+        # None means the index gave up and /api/search falls back to SQL
+        misses = sum(1 for q in queries if index.search(q, 8) is None)
+        trie = run(lambda q: index.search(q, 8), queries)
+
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE course (id INTEGER PRIMARY KEY, title TEXT, category TEXT)")
+        conn.executemany("INSERT INTO course VALUES (?,?,?)", rows)
+        like = run(lambda q: conn.execute("SELECT id, title FROM course WHERE LOWER(title) LIKE ?", (f'%{q.lower()}%',)).fetchall(), queries[:max(20, args.queries * 10_000 // size)])
+        conn.close()
+        print(f"{size:>9} {build:>8.2f} {megabytes:>7.1f} {trie[0]:>12.1f} {trie[1]:>12.1f} {like[0]:>12.1f} {like[1]:>12.1f} {misses:>14}")
+
+
+if __name__ == '__main__':
+    main()
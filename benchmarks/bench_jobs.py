@@ -0,0 +1,116 @@
+"""Job queue throughput: enqueue rate, drain rate and enqueue-to-run latency per worker pool shape.
+
+    python benchmarks/bench_jobs.py [--jobs 2000] [--work-ms 0] [--pools 1x1,1x4,2x2] [--rate 200]
+
+Enqueue: one job per transaction, as the routes do, and the /support route end to end. Drain:
+--jobs jobs queued up front, then a pool of PROCESSESxTHREADS workers (lms_jobs.run_pool) empties
+the queue; every job sleeps --work-ms to stand in for mail or scanning I/O. Steady: jobs arrive at
+--rate per second for a few seconds while the pool runs, and latency is measured from enqueue to
+the handler's start.
+"""
+import argparse
+import os
+import signal
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ['LMS_JOB_THREADS'] = '0'  # only the measured pools take jobs
+
+import lms_main as lms  # noqa: E402
+from loadtest import percentile  # noqa: E402
+
+STEADY_SECONDS = 3
+
+
+@lms.JOBS.handler('bench')
+def bench_job(store, payload):
+    started = time.time()
+    if payload['work_ms']: time.sleep(payload['work_ms'] / 1000)
+    store.conn.execute("INSERT INTO bench_done (n, latency) VALUES (?, ?)", (payload['n'], started - payload['at']))
+
+def enqueue(n, work_ms):
+    with lms.pooled_store() as store:
+        lms.JOBS.enqueue(store, 'bench', {'n': n, 'at': time.time(), 'work_ms': work_ms})
+        store.commit()
+
+def done_count(conn):
+    return conn.execute("SELECT count(*) FROM bench_done").fetchone()[0]
+
+def start_pool(processes, threads):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            lms.lms_jobs.run_pool(lms.JOBS, processes, threads, poll=0.05)
+        finally:
+            os._exit(0)
+    return pid
+
+def stop_pool(pid):
+    os.kill(pid, signal.SIGTERM)
+    os.waitpid(pid, 0)
+
+def wait_done(conn, total, timeout=600):
+    deadline = time.monotonic() + timeout
+    while done_count(conn) < total:
+        if time.monotonic() > deadline: raise SystemExit(f"only {done_count(conn)} of {total} jobs ran")
+        time.sleep(0.02)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--work-ms', type=float, default=0, help='simulated I/O per job')
+    parser.add_argument('--pools', default='1x1,1x4,2x2', help='comma-separated PROCESSESxTHREADS')
+    parser.add_argument('--rate', type=float, default=200, help='arrivals per second in the steady run')
+    args = parser.parse_args()
+
+    lms.init_db()
+    conn = lms.connect_db()
+    conn.execute("CREATE TABLE IF NOT EXISTS bench_done (n INTEGER, latency REAL)")
+    conn.commit()
+
+    started = time.perf_counter()
+    for n in range(args.jobs): enqueue(n, args.work_ms)
+    enqueue_rate = args.jobs / (time.perf_counter() - started)
+    conn.execute("DELETE FROM job")
+    conn.commit()
+    client = lms.app.test_client()
+    client.post('/login', data={'email': 'user@example.com', 'password': 'password123'})
+    started = time.perf_counter()
+    for n in range(200): client.post('/support', data={'subject': f'Ticket {n}', 'body': 'Please help'})
+    support_rate = 200 / (time.perf_counter() - started)
+    conn.execute("DELETE FROM job")
+    conn.commit()
+    print(f"db {lms.DB_NAME}, {os.cpu_count()} cpus, {args.work_ms:g}ms of work per job")
+    print(f"enqueue: {enqueue_rate:,.0f} jobs/s one per transaction, POST /support {support_rate:,.0f} req/s")
+    print(f"{'pool':<8}{'drain jobs/s':>14}{'steady p50 ms':>15}{'p95 ms':>10}{'p99 ms':>10}")
+
+    for shape in args.pools.split(','):
+        processes, threads = (int(x) for x in shape.split('x'))
+        conn.execute("DELETE FROM bench_done")
+        conn.commit()
+        for n in range(args.jobs): enqueue(n, args.work_ms)
+        started = time.perf_counter()
+        pid = start_pool(processes, threads)
+        try:
+            wait_done(conn, args.jobs)
+            drain = args.jobs / (time.perf_counter() - started)
+            conn.execute("DELETE FROM bench_done")
+            conn.commit()
+            arrivals = int(args.rate * STEADY_SECONDS)
+            begin = time.perf_counter()
+            for n in range(arrivals):
+                time.sleep(max(0, begin + n / args.rate - time.perf_counter()))
+                enqueue(n, args.work_ms)
+            wait_done(conn, arrivals)
+        finally:
+            stop_pool(pid)
+        latencies = sorted(r[0] for r in conn.execute("SELECT latency FROM bench_done"))
+        print(f"{shape:<8}{drain:>14,.0f}{percentile(latencies, 50):>15.1f}{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
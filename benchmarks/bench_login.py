@@ -0,0 +1,89 @@
+"""Sign-in throughput per password-hash method: logins/s, logins/s per core and latency.
+
+    python benchmarks/bench_login.py [--methods scrypt,pbkdf2:sha256:600000] [--workers 0,1,4] [--clients 16] [--seconds 5]
+
+Concurrent clients post correct credentials to /login through the Flask test client for a fixed
+time, with hashing on the request threads (--workers 0) or on a process pool of that many
+processes. Throttling is off. Per core divides the rate by the cores the run could keep busy.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ['LMS_LOGIN_IP_PER_MINUTE'] = os.environ['LMS_LOGIN_ACCOUNT_PER_MINUTE'] = '0'
+os.environ.setdefault('LMS_SLOW_REQUEST_MS', '60000')  # every queued sign-in is slow; that is the point
+
+import lms_main as lms  # noqa: E402
+import lms_auth  # noqa: E402
+from loadtest import percentile  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+PASSWORD = 'password123'
+ACCOUNTS = 50
+
+
+def setup(conn):
+    lms.migrate_db(conn)
+    lms.seed_db(conn)
+    conn.executemany("INSERT OR IGNORE INTO user (name, email, password) VALUES (?, ?, '')",
+                     [(f"Login {i}", f"login{i}@example.com") for i in range(ACCOUNTS)])
+    conn.commit()
+
+def run(method, workers, clients, seconds):
+    # Every account gets a hash of `method` up front, so no login pays for a rehash
+    conn = lms.connect_db()
+    conn.execute("UPDATE user SET password=? WHERE email LIKE 'login%'", (generate_password_hash(PASSWORD, method),))
+    conn.commit()
+    conn.close()
+    lms.USER_CACHE.clear()
+    lms.password_hasher = hasher = lms_auth.PasswordHasher(method, workers, max_pending=clients)
+    hasher.start()
+    latencies, failures, deadline = [], [], time.perf_counter() + seconds
+
+    def client(n):
+        app = lms.app.test_client()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            resp = app.post('/login', data={'email': f"login{n % ACCOUNTS}@example.com", 'password': PASSWORD})
+            latencies.append(time.perf_counter() - started)
+            if resp.status_code != 302: failures.append(resp.status_code)
+            n += clients
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+    latencies.sort()
+    rate = (len(latencies) - len(failures)) / elapsed
+    cores = min(os.cpu_count() or 1, workers or clients)
+    return {'rate': rate, 'per_core': rate / cores, 'p50_ms': percentile(latencies, 50), 'p95_ms': percentile(latencies, 95), 'failures': len(failures)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--methods', default=f"{lms.PASSWORD_METHOD},pbkdf2:sha256:600000,pbkdf2:sha256:100000", help='comma-separated werkzeug hash methods')
+    parser.add_argument('--workers', default=f"0,{os.cpu_count() or 1}", help='comma-separated hash pool sizes; 0 hashes on the request threads')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent sign-ins')
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    conn = lms.connect_db()
+    setup(conn)
+    conn.close()
+    print(f"db {lms.DB_NAME}, {os.cpu_count()} cpus, {args.clients} clients, {args.seconds:g}s per run")
+    print(f"{'method':<24}{'workers':>8}{'logins/s':>10}{'per core':>10}{'p50 ms':>10}{'p95 ms':>10}{'failed':>8}")
+    for method in args.methods.split(','):
+        for workers in (int(w) for w in args.workers.split(',')):
+            res = run(method, workers, args.clients, args.seconds)
+            print(f"{method:<24}{workers:>8}{res['rate']:>10,.1f}{res['per_core']:>10,.1f}{res['p50_ms']:>10.1f}{res['p95_ms']:>10.1f}{res['failures']:>8}")
+
+
+if __name__ == '__main__':
+    main()
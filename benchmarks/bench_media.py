@@ -0,0 +1,141 @@
+"""Lesson video serving to many simultaneous range readers, with sendfile(2) and through Python.
+
+    python benchmarks/bench_media.py [--size-mb 128] [--readers 1 16 64] [--seconds 5] [--range-kb 1024] [--workers 2] [--threads 16]
+
+A video of --size-mb random bytes is uploaded in 8 MB chunks through the resumable upload API of
+lms_serve.py, which is reported in MB/s. Then each reader, on a connection of its own, asks for
+random --range-kb byte ranges of it, as a seeking player does, for --seconds per reader count. The
+server runs once as deployed and once with --no-sendfile; the file is in the page cache either way,
+so the difference is what copying every byte through Python costs.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('LMS_MEDIA_DIR', os.path.join(os.path.dirname(os.environ['LMS_DB']), 'media'))
+os.environ['LMS_ADMIN_EMAILS'] = 'user@example.com'
+
+import lms_main as lms  # noqa: E402
+from bench_serve import free_port  # noqa: E402
+from loadtest import percentile  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK = 8 * 1024 * 1024
+
+
+def start(port, workers, threads, sendfile):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, 'lms_serve.py'), '--port', str(port), '--workers', str(workers),
+                             '--threads', str(threads)] + ([] if sendfile else ['--no-sendfile']),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            http.client.HTTPConnection('127.0.0.1', port, timeout=1).request('HEAD', '/login')
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit("server did not come up")
+
+def stop(proc):
+    proc.send_signal(signal.SIGTERM)
+    proc.wait(30)
+
+def call(port, method, path, cookie='', body=None, headers=()):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request(method, path, body=body, headers=dict(headers, Cookie=cookie))
+    resp = conn.getresponse()
+    return resp, resp.read()
+
+def login(port):
+    resp, _ = call(port, 'POST', '/login', body='email=user%40example.com&password=password123',
+                   headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    return resp.getheader('Set-Cookie').split(';', 1)[0]
+
+def upload(port, cookie, size):
+    """Upload `size` random bytes as an .mp4 and return (video id, MB/s, the bytes)."""
+    data = b'\x00\x00\x00\x18ftypmp42' + os.urandom(size - 12)
+    resp, body = call(port, 'POST', '/api/admin/videos', cookie, f'{{"course_id": 1, "lesson": 0, "filename": "bench.mp4", "size": {size}}}',
+                      {'Content-Type': 'application/json'})
+    if resp.status != 201: raise SystemExit(f"upload refused: {resp.status} {body!r}")
+    video = json.loads(body)
+    started = time.perf_counter()
+    for offset in range(0, size, CHUNK):
+        resp, body = call(port, 'PATCH', video['upload_url'], cookie, data[offset:offset + CHUNK], {'Upload-Offset': str(offset)})
+        if resp.status != 200: raise SystemExit(f"chunk at {offset} failed: {resp.status} {body!r}")
+    if json.loads(body)['status'] != 'ready': raise SystemExit(f"upload did not complete: {body!r}")
+    return video['id'], size / (time.perf_counter() - started) / 1e6, data
+
+def reader(port, cookie, path, size, span, deadline, seed, results):
+    rng, latencies, received, errors = random.Random(seed), [], 0, 0
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.monotonic() < deadline:
+        first = rng.randrange(size - span)
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers={'Cookie': cookie, 'Range': f'bytes={first}-{first + span - 1}'})
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            errors += 1
+            continue
+        if resp.status != 206 or len(body) != span: errors += 1
+        latencies.append(time.perf_counter() - started)
+        received += len(body)
+    results.append((latencies, received, errors))
+
+def run(port, cookie, path, size, span, readers, seconds):
+    results, deadline = [], time.monotonic() + seconds
+    threads = [threading.Thread(target=reader, args=(port, cookie, path, size, span, deadline, n, results)) for n in range(readers)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    latencies = sorted(l for r in results for l in r[0])
+    return len(latencies) / seconds, sum(r[1] for r in results) / seconds / 1e6, latencies, sum(r[2] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=128)
+    parser.add_argument('--readers', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--range-kb', type=int, default=1024, help='bytes per range request')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+    lms.init_db()
+    size, span = args.size_mb * 1024 * 1024, args.range_kb * 1024
+
+    print(f"db {lms.DB_NAME}, media {lms.MEDIA_DIR}, {os.cpu_count()} cpus, {args.workers} workers x {args.threads} threads, {args.range_kb} KB ranges")
+    print(f"{'mode':<12}{'readers':>8}{'req/s':>10}{'MB/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    video_id = None
+    for sendfile in (True, False):
+        port = free_port()
+        proc = start(port, args.workers, args.threads, sendfile)
+        try:
+            cookie = login(port)
+            if video_id is None:
+                video_id, rate, data = upload(port, cookie, size)
+                resp, body = call(port, 'GET', f'/media/videos/{video_id}', cookie, headers={'Range': 'bytes=1000-1999'})
+                if resp.status != 206 or body != data[1000:2000]: raise SystemExit("served bytes differ from the upload")
+                print(f"upload: {args.size_mb} MB in {CHUNK // (1024 * 1024)} MB chunks at {rate:,.0f} MB/s")
+            for readers in args.readers:
+                rps, mbps, latencies, errors = run(port, cookie, f'/media/videos/{video_id}', size, span, readers, args.seconds)
+                print(f"{'sendfile' if sendfile else 'python':<12}{readers:>8}{rps:>10,.0f}{mbps:>10,.0f}{percentile(latencies, 50):>10.1f}"
+                      f"{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}{errors:>8}")
+        finally:
+            stop(proc)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Concurrent lesson-completion throughput: legacy 5-statement flow vs. atomic UPDATE ... RETURNING vs. batched executemany.
+
+    python benchmarks/bench_progress.py [--writers 8] [--events 400] [--batch 50]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import lms_main as lms  # noqa: E402
+from lms_store import SQLiteStore  # noqa: E402
+
+SQL = SQLiteStore.SQL
+
+COURSES = 20
+
+
+def legacy(conn, uid, course_ids):
+    # The pre-RETURNING update_progress(): five round trips, certificate check-then-insert
+    for course_id in course_ids:
+        conn.execute("UPDATE enrollment SET progress = MIN(progress + 25, 100) WHERE user_id=? AND course_id=?", (uid, course_id))
+        row = conn.execute("SELECT progress FROM enrollment WHERE user_id=? AND course_id=?", (uid, course_id)).fetchone()
+        if row and row['progress'] >= 100:
+            conn.execute("UPDATE enrollment SET status = 'Completed' WHERE user_id=? AND course_id=?", (uid, course_id))
+            if not conn.execute("SELECT id FROM certificate WHERE user_id=? AND course_id=?", (uid, course_id)).fetchone():
+                conn.execute("INSERT INTO certificate (id, user_id, course_id, date_issued) VALUES (?, ?, ?, date('now'))", (lms.new_certificate_id(), uid, course_id))
+        conn.commit()
+
+
+def atomic(conn, uid, course_ids):
+    for course_id in course_ids:
+        params = lms.progress_params(uid, course_id)
+        row = conn.execute(SQL['progress'] + " RETURNING progress", params).fetchone()
+        if row and row['progress'] >= 100:
+            conn.execute(SQL['issue_certificate'], params)
+        conn.commit()
+
+
+def batched(size):
+    def run(conn, uid, course_ids):
+        for start in range(0, len(course_ids), size):
+            params = [lms.progress_params(uid, c) for c in course_ids[start:start + size]]
+            conn.executemany(SQL['progress'], params)
+            conn.executemany(SQL['issue_certificate'], params)
+            conn.commit()
+    return run
+
+
+def reset(conn, writers):
+    conn.execute("DELETE FROM certificate")
+    conn.execute("DELETE FROM enrollment")
+    conn.executemany("INSERT INTO enrollment (user_id, course_id, status, progress, updated_at) VALUES (?, ?, 'In Progress', 0, '')",
+                     [(uid, cid) for uid in range(1, writers + 1) for cid in range(1, COURSES + 1)])
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--events', type=int, default=400, help='lesson completions per writer')
+    parser.add_argument('--batch', type=int, default=50)
+    args = parser.parse_args()
+
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    lms.seed_db(conn)
+    modes = (('legacy', legacy), ('atomic', atomic), (f'batch/{args.batch}', batched(args.batch)))
+    print(f"{args.writers} writers x {args.events} events, {COURSES} courses each")
+    print(f"{'mode':<12}{'events/s':>12}{'statements':>12}{'errors':>8}")
+    for name, fn in modes:
+        reset(conn, args.writers)
+        errors, statements = [], [0]
+        lock = threading.Lock()
+
+        def writer(uid):
+            c, traced = lms.connect_db(), []
+            c.set_trace_callback(traced.append)
+            try:
+                fn(c, uid, [(i % COURSES) + 1 for i in range(args.events)])
+            except sqlite3.Error as e:
+                with lock: errors.append(e)
+            finally:
+                c.close()
+                with lock: statements[0] += len(traced)
+
+        threads = [threading.Thread(target=writer, args=(uid,)) for uid in range(1, args.writers + 1)]
+        start = time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12}{args.writers * args.events / elapsed:>12.0f}{statements[0]:>12}{len(errors):>8}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
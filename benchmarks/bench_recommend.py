@@ -0,0 +1,85 @@
+"""Course recommendations: building the top-k neighbour table, and the serving query against counting co-enrollments live.
+
+    python benchmarks/bench_recommend.py --scale 1m [--reads 500] [--live-reads 5] [--k 20]
+
+Build: `flask recommend-build` on the generated dataset (--scale 100k is 500k enrollments, 1m is 5M of a
+million learners over 50k courses), split into reading and computing the neighbours and writing them.
+Serving: the suggestions of random learners, once as the dashboard reads them (one query on course_similar)
+and once counted from the enrollment rows at request time, for a few learners only.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import lms_main as lms  # noqa: E402
+import datagen  # noqa: E402
+from loadtest import percentile  # noqa: E402
+from lms_store import SQLiteStore  # noqa: E402
+
+# Learners who share a course with the reader, and what else they take: what the neighbour table saves
+LIVE = """
+    SELECT o.course_id, COUNT(*) AS n FROM enrollment mine
+    JOIN enrollment peer ON peer.course_id = mine.course_id AND peer.user_id != mine.user_id
+    JOIN enrollment o ON o.user_id = peer.user_id
+    WHERE mine.user_id = ?1 AND o.course_id NOT IN (SELECT course_id FROM enrollment WHERE user_id = ?1)
+    GROUP BY o.course_id ORDER BY n DESC, o.course_id LIMIT ?2
+"""
+
+
+def timed(fn, uids):
+    times = []
+    for uid in uids:
+        started = time.perf_counter()
+        fn(uid)
+        times.append(time.perf_counter() - started)
+    return sorted(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(datagen.SCALES), default='100k', help='dataset generated into an empty LMS_DB')
+    parser.add_argument('--reads', type=int, default=500, help='learners served from the neighbour table')
+    parser.add_argument('--live-reads', type=int, default=5, help='learners served by counting co-enrollments live')
+    parser.add_argument('--k', type=int, default=lms.RECOMMEND_K, help='neighbours kept per course')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    if not conn.execute("SELECT 1 FROM user WHERE email LIKE 'learner%' LIMIT 1").fetchone():
+        lms.seed_db(conn)
+        datagen.generate(conn, *datagen.SCALES[args.scale], seed=args.seed)
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ('user', 'course', 'enrollment')}
+    print(f"db {lms.DB_NAME}: " + ', '.join(f"{n:,} {t}s" for t, n in counts.items()))
+
+    lms.RECOMMEND_K = args.k
+    store = SQLiteStore(conn)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    rows = lms.build_recommendations(store)
+    total = time.perf_counter() - started
+    build = store.recommend_build()
+    print(f"build k={args.k}: {len(rows):,} neighbours of {len({r[0] for r in rows}):,} courses in {total:.2f}s "
+          f"(read + compute {build['seconds']:.2f}s, write {total - build['seconds']:.2f}s), "
+          f"peak RSS +{(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024:,.0f} MB")
+
+    rng = random.Random(args.seed)
+    first, last = conn.execute("SELECT MIN(id), MAX(id) FROM user WHERE email LIKE 'learner%'").fetchone()
+    uids = [rng.randint(first, last) for _ in range(args.reads)]
+    print(f"{'serving':<14}{'reads':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, fn, sample in (('query', lambda uid: store.recommended(uid, lms.RECOMMEND_LIMIT), uids),
+                             ('+ fallback', lambda uid: lms.recommended_courses(store, uid), uids),
+                             ('live', lambda uid: conn.execute(LIVE, (uid, lms.RECOMMEND_LIMIT)).fetchall(), uids[:args.live_reads])):
+        times = timed(fn, sample)
+        print(f"{name:<14}{len(times):>8}{percentile(times, 50):>10.2f}{percentile(times, 95):>10.2f}{percentile(times, 99):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
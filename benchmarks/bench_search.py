@@ -0,0 +1,85 @@
+"""Course search latency over a synthetic catalogue: LIKE scan vs. the FTS5 index.
+
+    python benchmarks/bench_search.py [--courses 100000] [--queries 200]
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import lms_main as lms  # noqa: E402
+from lms_store import SQLiteStore  # noqa: E402
+
+TOPICS = ('python', 'design', 'backend', 'cloud', 'docker', 'kubernetes', 'agile', 'data', 'science', 'machine', 'learning',
+          'systems', 'architecture', 'security', 'testing', 'react', 'figma', 'pandas', 'numpy', 'rust', 'golang', 'kanban',
+          'scrum', 'networking', 'linux', 'databases', 'analytics', 'leadership', 'marketing', 'finance', 'statistics', 'ethics')
+CATEGORIES = ('Python', 'Design', 'Backend', 'DevOps', 'Management')
+SYLLABLES = ('ka', 'lo', 'mi', 'ter', 'ra', 'ven', 'so', 'dul', 'pra', 'xi', 'mon', 'ta', 'gre', 'fil', 'qua', 'sen', 'bor', 'nu', 'vel', 'tri')
+
+
+def vocabulary(rng, size=6000):
+    # Real catalogues have a long-tailed vocabulary: a few topic words are common, most words are rare.
+    words = list(TOPICS)
+    while len(words) < size:
+        words.append(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    weights = list(itertools.accumulate(1 / (rank + 100) for rank in range(len(words))))
+    return words, weights
+
+
+def populate(conn, count, rng, words, weights):
+    def text(k):
+        return ' '.join(rng.choices(words, cum_weights=weights, k=k))
+    rows = ((text(3).title() + f' {i}', text(20).capitalize() + '.', 'Video', rng.choice(CATEGORIES)) for i in range(count))
+    conn.executemany("INSERT INTO course (title, description, type, category) VALUES (?,?,?,?)", rows)
+    conn.commit()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {p: samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000 for p in (50, 95, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--courses', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    lms.seed_db(conn)
+    start = time.perf_counter()
+    words, weights = vocabulary(rng)
+    populate(conn, args.courses, rng, words, weights)
+    print(f"inserted {args.courses} courses (FTS kept in sync by triggers) in {time.perf_counter() - start:.1f}s")
+
+    # Type-ahead style queries: 2-5 character prefixes, sometimes two words
+    queries = []
+    for _ in range(args.queries):
+        terms = rng.choices(words, cum_weights=weights, k=rng.choice((1, 1, 2)))
+        queries.append(' '.join(w[:rng.randint(2, 6)] for w in terms))
+
+    def run(fn):
+        times = []
+        for q in queries:
+            t = time.perf_counter()
+            fn(q)
+            times.append(time.perf_counter() - t)
+        return percentiles(times)
+
+    like = run(lambda q: conn.execute("SELECT id, title FROM course WHERE LOWER(title) LIKE ?", (f'%{q}%',)).fetchall())
+    fts = run(lambda q: [(lms.highlight_html(r['title'], q), lms.snippet_html(r['description'], q)) for r in lms.search_courses(SQLiteStore(conn), q, 1)])
+    print(f"{'query':<8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, res in (('LIKE', like), ('FTS5', fts)):
+        print(f"{name:<8}{res[50]:>10.2f}{res[95]:>10.2f}{res[99]:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
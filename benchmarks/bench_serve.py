@@ -0,0 +1,95 @@
+"""Throughput of lms_serve.py as the number of worker processes grows.
+
+    python benchmarks/bench_serve.py --scale 10k [--workers 1 2 4] [--threads 8] [--clients 16] [--requests 2000]
+
+For every worker count a fresh server is started on the same generated database, loaded with a
+mix of read routes over keep-alive connections, and stopped with SIGTERM. Scaling is bounded by
+the cores of the machine: compare the req/s column against `cpus` in the header.
+"""
+import argparse
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import lms_main as lms  # noqa: E402
+import datagen  # noqa: E402
+from bench_search import vocabulary  # noqa: E402
+from loadtest import HttpSession, routes, run_route, sample_learners  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READ_ROUTES = ('dashboard', 'my_courses', 'view_course', 'api_search', 'certificates')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start(workers, threads, port):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, 'lms_serve.py'), '--port', str(port),
+                             '--workers', str(workers), '--threads', str(threads)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit(f"server with {workers} workers did not come up")
+
+def mixed(factories):
+    """One factory that picks a route per request, so every worker count sees the same mix."""
+    def factory(rng, learner):
+        return rng.choice(factories)(rng, learner)
+    return factory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(datagen.SCALES), default='1k', help='dataset generated into an empty LMS_DB')
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent keep-alive connections')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    if not conn.execute("SELECT 1 FROM user WHERE email LIKE 'learner%' LIMIT 1").fetchone():
+        lms.seed_db(conn)
+        datagen.generate(conn, *datagen.SCALES[args.scale], seed=args.seed)
+    learners = sample_learners(conn, args.clients, random.Random(args.seed))
+    conn.close()
+    factory = mixed([f for name, _, f in routes(*vocabulary(random.Random(args.seed))) if name in READ_ROUTES])
+
+    print(f"db {lms.DB_NAME}, {os.cpu_count()} cpus, {len(learners)} clients, {args.threads} threads/worker")
+    print(f"{'workers':>8}{'req/s':>10}{'speedup':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    base = None
+    for workers in args.workers:
+        port = free_port()
+        proc = start(workers, args.threads, port)
+        try:
+            sessions = [HttpSession(l, f'http://127.0.0.1:{port}') for l in learners]
+            run_route(sessions, learners, factory, 'GET', len(sessions) * 5, args.seed)  # warm caches in every worker
+            res = run_route(sessions, learners, factory, 'GET', args.requests, args.seed)
+            for s in sessions: s.conn.close()
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(60)
+        base = base or res['rps']
+        print(f"{workers:>8}{res['rps']:>10,.1f}{res['rps'] / base:>8.2f}x{res['p50_ms']:>9.2f}{res['p95_ms']:>9.2f}{res['p99_ms']:>9.2f}{res['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
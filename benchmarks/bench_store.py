@@ -0,0 +1,147 @@
+"""Run the same data-access scenario against every storage backend, check they agree, and time each method.
+
+    python benchmarks/bench_store.py [--repeat 500]
+    python benchmarks/bench_store.py --postgres postgresql://lms@localhost/lms_bench   # an empty, disposable database
+
+SQLite always runs, on a fresh temporary file. With --postgres the schema is created in the given
+database (which should be empty) and the scenario is replayed there; any result that differs
+from SQLite is printed and makes the script exit 1.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import lms_main as lms  # noqa: E402
+import lms_store  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+PASSWORD_HASH = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+VOLATILE = {'updated_at', 'created_at', 'score', 'password'}  # clock-, ranking- or salt-dependent
+
+
+def normalize(value):
+    if isinstance(value, list): return [normalize(v) for v in value]
+    if isinstance(value, tuple): return tuple(normalize(v) for v in value)
+    if hasattr(value, 'keys'): return {k: normalize(value[k]) for k in value.keys() if k not in VOLATILE}
+    return value
+
+def scenario(store):
+    """(step, result) pairs covering every Store method; writes are committed as the routes do."""
+    out = []
+    step = lambda name, value: out.append((name, normalize(value)))
+    uid = store.user_by_email('user@example.com')['id']
+    step('user_by_email', store.user_by_email('user@example.com'))
+    store.create_user('Bench Learner', 'bench@example.com', PASSWORD_HASH)
+    store.commit()
+    step('create_user', store.user_by_email('bench@example.com')['name'])
+    step('user_stats', store.user_stats(uid))
+    step('recent_enrollments', store.recent_enrollments(uid))
+    step('enrollments', sorted(normalize(store.enrollments(uid)), key=lambda r: r['course_id']))
+    step('course_enrollment', store.course_enrollment(uid, 2))
+    step('catalogue', store.catalogue(uid, None, 0, 3))
+    step('catalogue_category', store.catalogue(uid, 'Python', 1, 10))
+    step('catalogue_version', [type(v).__name__ for v in store.catalogue_version()])
+    step('curriculum', store.curriculum(1))
+    step('courses_after', store.courses_after(4))
+
+    step('enroll', [store.enroll(uid, 3), store.enroll(uid, 3)])
+    store.commit()
+    total = len(store.curriculum(3))
+    progress = [store.complete_lesson(lms.progress_params(uid, 3, lesson=n, total=total)) for n in (0, 0, 5, 1, 2, 3)]
+    step('complete_lesson', progress)
+    step('lessons_done', store.lessons_done(uid, 3))
+    step('issue_certificate', store.issue_certificate(lms.progress_params(uid, 3)))
+    store.commit()
+    store.enroll(uid, 4)
+    store.enroll(uid, 5)
+    completions = [lms.progress_params(uid, 4, lesson=n, total=4) for n in range(4)]
+    store.apply_progress(completions, [lms.progress_params(uid, 5, 2)])
+    store.commit()
+    step('advance_progress', store.advance_progress(lms.progress_params(uid, 5)))
+    store.commit()
+    step('enrollment_progress', sorted(normalize(store.enrollment_progress(uid, [3, 4, 5])), key=lambda r: r['course_id']))
+
+    notes = [{'uid': uid, 'course_id': 1, 'lesson': n % 2, 'key': f'bench-note-{n}', 'body': f'note {n}', 'at': f'2024-01-01 00:00:0{n}.000'} for n in range(5)]
+    store.save_notes(notes + [dict(notes[0], body=None), dict(notes[1], body='edited', at='2024-01-02 00:00:00.000')])
+    store.commit()
+    step('notes', [(r['client_key'], r['body']) for r in store.notes(uid, 1, None, 2 ** 63 - 1, 10)])
+    step('notes_lesson', [(r['client_key'], r['body']) for r in store.notes(uid, 1, 1, 2 ** 63 - 1, 10)])
+
+    step('search', sorted(r['id'] for r in store.search(uid, ['py'], 10, lms.SEARCH_START, lms.SEARCH_CANDIDATES)))
+    step('search_two_terms', [r['id'] for r in store.search(uid, ['data', 'sci'], 10, lms.SEARCH_START, lms.SEARCH_CANDIDATES)])
+    step('certificate_list', sorted((r['course_title'], r['date']) for r in store.certificate_list(uid)))  # issued ids are random
+    step('certificates', [r['course_title'] for r in store.certificates(uid)])
+    step('certificate', store.certificate(uid, 'CERT-101'))
+    step('verify_certificate', store.verify_certificate('CERT-101'))
+    step('certificate_count', store.certificate_count())
+    step('certificate_ids', len(store.certificate_ids()))
+    return out
+
+READS = [
+    ('user_by_email', lambda s, uid: s.user_by_email('user@example.com')),
+    ('user_stats', lambda s, uid: s.user_stats(uid)),
+    ('recent_enrollments', lambda s, uid: s.recent_enrollments(uid)),
+    ('catalogue', lambda s, uid: s.catalogue(uid, None, 0, 25)),
+    ('course_enrollment', lambda s, uid: s.course_enrollment(uid, 1)),
+    ('search', lambda s, uid: s.search(uid, ['py'], 8, lms.SEARCH_START, lms.SEARCH_CANDIDATES)),
+    ('verify_certificate', lambda s, uid: s.verify_certificate('CERT-101')),
+]
+
+def timings(store, repeat):
+    uid = store.user_by_email('user@example.com')['id']
+    result = {}
+    for name, fn in READS:
+        start = time.perf_counter()
+        for _ in range(repeat): fn(store, uid)
+        result[name] = (time.perf_counter() - start) / repeat * 1e6
+    store.rollback()
+    return result
+
+def sqlite_store():
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    lms.seed_db(conn)
+    return lms_store.SQLiteStore(conn)
+
+def postgres_store(url):
+    pool = lms_store.PostgresPool(url, 1, 10)
+    store = lms_store.PostgresStore(pool.acquire())
+    store.create_schema()
+    store.seed(PASSWORD_HASH, lms.DEMO_COURSES)
+    if store.user_by_email('bench@example.com'): raise SystemExit(f"{url} has been used by an earlier run; point --postgres at an empty database")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--postgres', help='URL of an empty PostgreSQL database to run the scenario against as well')
+    parser.add_argument('--repeat', type=int, default=500, help='calls per timed read method')
+    args = parser.parse_args()
+
+    backends = [('sqlite', sqlite_store)] + ([('postgres', lambda: postgres_store(args.postgres))] if args.postgres else [])
+    results, times = {}, {}
+    for name, make in backends:
+        store = make()
+        results[name] = scenario(store)
+        times[name] = timings(store, args.repeat)
+
+    mismatches = 0
+    for (step, expected), *others in zip(results['sqlite'], *(results[n] for n, _ in backends[1:])):
+        for (name, _), (_, got) in zip(backends[1:], others):
+            if got != expected:
+                mismatches += 1
+                print(f"MISMATCH {step}: sqlite={expected!r} {name}={got!r}")
+    print(f"{len(results['sqlite'])} scenario steps, {len(backends)} backend(s), {mismatches} mismatches")
+    print(f"{'method':<22}" + ''.join(f"{name + ' us':>14}" for name, _ in backends))
+    for method, _ in READS:
+        print(f"{method:<22}" + ''.join(f"{times[name][method]:>14.1f}" for name, _ in backends))
+    if mismatches: raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Render latency per page: legacy string splicing + render_template_string vs. the cached templates.
+
+    python benchmarks/bench_templates.py [--iterations 300]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from flask import render_template_string, session  # noqa: E402
+import lms_main as lms  # noqa: E402
+
+COURSE = {'id': 1, 'course_id': 1, 'title': 'Python Masterclass 2024', 'description': 'Complete Python from fundamentals to advanced web scraping.',
+          'category': 'Python', 'status': 'In Progress', 'progress': 45, 'enrolled': 1}
+CERT = {'id': 'ATH-1A2B3C4D', 'course_title': 'UI/UX Design Systems', 'date': '2024-05-10'}
+
+# (route, template, legacy fragment, active_page, context)
+PAGES = [
+    ('/', 'dashboard.html', lms.DASHBOARD_FRAG, 'dashboard', {'stats': {'in_progress': 3, 'completed': 2}, 'recent_courses': [COURSE] * 4}),
+    ('/explore', 'explore.html', lms.EXPLORE_FRAG, 'explore', {'courses': [COURSE] * 24, 'current_cat': None}),
+    ('/search', 'search.html', lms.SEARCH_FRAG, 'search', {'courses': [COURSE] * 6, 'q': 'python'}),
+    ('/my-courses', 'courses.html', lms.COURSES_FRAG, 'courses', {'courses': [COURSE] * 6}),
+    ('/course/<id>', 'view_course.html', lms.VIEW_COURSE_FRAG, 'view_course',
+     {'course': COURSE, 'curriculum': [{'name': 'Basics', 'lessons': [{'title': 'Intro', 'position': 0, 'completed': True}, {'title': 'Setup', 'position': 1, 'completed': False}]}],
+      'active_lesson': {'title': 'Setup', 'position': 1, 'completed': False}}),
+    ('/certificates', 'certificates.html', lms.CERTS_FRAG, 'certificates', {'certificates': [CERT] * 3}),
+    ('/support', 'support.html', lms.SUPPORT_FRAG, 'support', {}),
+    ('/login', 'login.html', lms.LOGIN_FRAG, None, {}),
+    ('/signup', 'signup.html', lms.SIGNUP_FRAG, None, {}),
+]
+
+
+def legacy_render(fragment, active_page, context):
+    block = '{% block content_area %}{% endblock %}' if active_page else '{% block public_area %}{% endblock %}'
+    return render_template_string(lms.MASTER_TEMPLATE.replace(block, fragment), active_page=active_page, **context)
+
+
+def timed(fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=300)
+    args = parser.parse_args()
+
+    lms.preload_templates()
+    print(f"{'route':<16}{'legacy us':>12}{'cached us':>12}{'speedup':>10}")
+    for route, template, fragment, active_page, context in PAGES:
+        with lms.app.test_request_context(route):
+            if active_page:
+                session.update({'user_id': 1, 'name': 'Demo Student'})
+            before = timed(lambda: legacy_render(fragment, active_page, context), args.iterations)
+            after = timed(lambda: lms.render_lms(template, active_page=active_page, **context), args.iterations)
+        print(f"{route:<16}{before:>12.1f}{after:>12.1f}{before / after:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
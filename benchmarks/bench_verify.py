@@ -0,0 +1,101 @@
+"""Certificate verification under a mostly-invalid ID workload: direct database lookup vs. Bloom filter + LRU.
+
+    python benchmarks/bench_verify.py [--certificates 100000] [--requests 200000] [--valid 0.01]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import lms_main as lms  # noqa: E402
+from lms_store import SQLiteStore  # noqa: E402
+
+
+def random_id(rng):
+    return f"ATH-{rng.getrandbits(32):08X}"
+
+
+def populate(conn, count, rng):
+    conn.execute("DELETE FROM certificate")
+    users = max(1, count // 5)
+    conn.executemany("INSERT OR IGNORE INTO user (id, name, email, password) VALUES (?, ?, ?, '')",
+                     ((uid, f"Learner {uid}", f"learner{uid}@example.com") for uid in range(2, users + 2)))
+    courses = [r[0] for r in conn.execute("SELECT id FROM course")]
+    ids = set()
+    while len(ids) < count: ids.add(random_id(rng))
+    ids = sorted(ids)
+    conn.executemany("INSERT OR IGNORE INTO certificate (id, user_id, course_id, date_issued) VALUES (?, ?, ?, '2024-05-10')",
+                     ((cid, 2 + i // len(courses) % users, courses[i % len(courses)]) for i, cid in enumerate(ids)))
+    conn.commit()
+    return [r[0] for r in conn.execute("SELECT id FROM certificate")]
+
+
+def workload(issued, requests, valid_share, rng):
+    # Valid lookups are skewed towards a few popular certificates, as shared links are
+    known = set(issued)
+    popular = rng.sample(issued, min(len(issued), 1000))
+    ids = []
+    for _ in range(requests):
+        if rng.random() < valid_share:
+            ids.append(popular[min(int(rng.expovariate(1 / 50)), len(popular) - 1)])
+        else:
+            cid = random_id(rng)
+            while cid in known: cid = random_id(rng)
+            ids.append(cid)
+    return ids
+
+
+def direct(conn, cert_id):
+    row = conn.execute(SQLiteStore.SQL['verify'], (cert_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def run(name, fn, conn, ids):
+    queries = [0]
+    conn.set_trace_callback(lambda sql: queries.__setitem__(0, queries[0] + 1))
+    latencies, found = [], 0
+    start = time.perf_counter()
+    for cert_id in ids:
+        t = time.perf_counter()
+        found += fn(conn, cert_id) is not None
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    conn.set_trace_callback(None)
+    latencies.sort()
+    pct = lambda p: latencies[int(p * (len(latencies) - 1))] * 1e6
+    print(f"{name:<14}{len(ids) / elapsed:>12,.0f}{pct(0.5):>10.1f}{pct(0.99):>10.1f}{queries[0]:>12,}{found:>8,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--certificates', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--valid', type=float, default=0.01, help='share of lookups for issued certificates')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    lms.seed_db(conn)
+    issued = populate(conn, args.certificates, rng)
+    ids = workload(issued, args.requests, args.valid, rng)
+
+    start = time.perf_counter()
+    store = SQLiteStore(conn)
+    bloom = lms.get_cert_filter(store)
+    print(f"{len(issued):,} certificates; filter built in {(time.perf_counter() - start) * 1000:.0f}ms, "
+          f"{bloom.stats()['bytes'] / 1024:.0f}KB, {bloom.hashes} hashes")
+    print(f"{args.requests:,} lookups, {args.valid:.0%} for issued certificates")
+    print(f"{'mode':<14}{'lookups/s':>12}{'p50 us':>10}{'p99 us':>10}{'queries':>12}{'found':>8}")
+    run('direct', direct, conn, ids)
+    run('bloom+lru', lambda conn, cert_id: lms.lookup_certificate(store, cert_id), conn, ids)
+    print({k: v for k, v in lms.VERIFY_STATS.items()})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Bytes on the wire per route: uncompressed, gzip, brotli, and what a reload of an unchanged page costs.
+
+    python benchmarks/bench_wire.py --scale 10k [--learners 20] [--requests 10]
+
+Every route of the load test that reads, plus the JSON APIs, is requested through the Flask test
+client as generated learners. Each response is fetched without compression, with gzip and (when the
+brotli module is installed) with br, then once more with its ETag as a reload would, and the
+average body sizes are reported next to the time compression added.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import lms_main as lms  # noqa: E402
+import datagen  # noqa: E402
+from bench_search import vocabulary  # noqa: E402
+from loadtest import TestClientSession, routes, sample_learners  # noqa: E402
+
+ENCODINGS = ['identity', 'gzip'] + (['br'] if lms.brotli else [])
+
+
+def read_routes(words, weights):
+    out = [(name, factory) for name, method, factory in routes(words, weights) if method == 'GET']
+    return out + [('api_catalogue', lambda rng, l: ('/api/catalogue', None)), ('api_dashboard', lambda rng, l: ('/api/dashboard', None))]
+
+def measure(sessions, learners, factory, requests, rng):
+    sizes, times, fresh = {e: 0 for e in ENCODINGS}, {e: 0.0 for e in ENCODINGS}, [0, 0]
+    for _ in range(requests):
+        n = rng.randrange(len(sessions))
+        path, _ = factory(rng, learners[n])
+        client, etag = sessions[n].client, None
+        for encoding in ENCODINGS:
+            started = time.perf_counter()
+            resp = client.get(path, headers={'Accept-Encoding': encoding})
+            times[encoding] += time.perf_counter() - started
+            sizes[encoding] += len(resp.get_data())
+            etag = resp.headers.get('ETag')
+        resp = client.get(path, headers={'Accept-Encoding': ENCODINGS[-1], 'If-None-Match': etag or ''})
+        fresh[0] += resp.status_code == 304
+        fresh[1] += len(resp.get_data())
+    return {e: sizes[e] / requests for e in ENCODINGS}, {e: times[e] / requests * 1000 for e in ENCODINGS}, fresh[0] / requests, fresh[1] / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(datagen.SCALES), default='1k', help='dataset generated into an empty LMS_DB')
+    parser.add_argument('--learners', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=10, help='sampled requests per route')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    if not conn.execute("SELECT 1 FROM user WHERE email LIKE 'learner%' LIMIT 1").fetchone():
+        lms.seed_db(conn)
+        datagen.generate(conn, *datagen.SCALES[args.scale], seed=args.seed)
+    learners = sample_learners(conn, args.learners, random.Random(args.seed))
+    conn.close()
+    sessions = [TestClientSession(l) for l in learners]
+
+    print(f"db {lms.DB_NAME}, compression above {lms.COMPRESS_MIN_BYTES}B, gzip level {lms.GZIP_LEVEL}" + (f", brotli quality {lms.BROTLI_QUALITY}" if lms.brotli else ", brotli not installed"))
+    print(f"{'route':<16}" + ''.join(f"{e + ' B':>12}" for e in ENCODINGS) + f"{'saved':>8}{'+ms':>7}{'reload 304':>12}{'reload B':>10}")
+    for name, factory in read_routes(*vocabulary(random.Random(args.seed))):
+        sizes, ms, fresh, reload_bytes = measure(sessions, learners, factory, args.requests, random.Random(args.seed))
+        best = min(sizes.values())
+        saved = 1 - best / sizes['identity'] if sizes['identity'] else 0
+        print(f"{name:<16}" + ''.join(f"{sizes[e]:>12,.0f}" for e in ENCODINGS) + f"{saved:>8.0%}{ms[ENCODINGS[-1]] - ms['identity']:>7.2f}{fresh:>12.0%}{reload_bytes:>10,.0f}")
+
+
+if __name__ == '__main__':
+    main()
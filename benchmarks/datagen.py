@@ -0,0 +1,115 @@
+"""Synthetic LMS dataset: users, courses, enrollments and certificates at a chosen scale.
+
+    LMS_DB=/tmp/lms-100k.db python benchmarks/datagen.py --scale 100k [--seed 42]
+    python benchmarks/datagen.py --users 5000 --courses 300 --enrollments 8 --completed 0.2
+
+Every generated learner can log in as learner<N>@example.com with password123. The same seed
+always produces the same data, so runs against regenerated databases stay comparable.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import lms_main as lms  # noqa: E402
+from bench_search import CATEGORIES, vocabulary  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+PASSWORD = 'password123'
+CHUNK = 10000
+# users, courses, enrollments per user, share of enrollments completed
+SCALES = {
+    '1k': (1_000, 100, 4, 0.2),
+    '10k': (10_000, 1_000, 5, 0.2),
+    '100k': (100_000, 10_000, 5, 0.2),
+    '1m': (1_000_000, 50_000, 5, 0.2),
+}
+
+
+def chunks(rows):
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, CHUNK)):
+        yield chunk
+
+
+def generate(conn, users, courses, enrollments, completed, seed=42, log=sys.stderr):
+    """Add the synthetic rows to a migrated database and return their counts."""
+    rng = random.Random(seed)
+    words, weights = vocabulary(rng)
+    started = time.perf_counter()
+    text = lambda k: ' '.join(rng.choices(words, cum_weights=weights, k=k))
+
+    first_course = (conn.execute("SELECT MAX(id) FROM course").fetchone()[0] or 0) + 1
+    for chunk in chunks((text(3).title() + f' {i}', text(20).capitalize() + '.', 'Video', rng.choice(CATEGORIES)) for i in range(courses)):
+        conn.executemany("INSERT INTO course (title, description, type, category) VALUES (?,?,?,?)", chunk)
+    conn.commit()
+    print(f"{courses:,} courses ({time.perf_counter() - started:.1f}s)", file=log)
+
+    # One hash shared by every learner: hashing a million passwords would dominate generation time
+    password = generate_password_hash(PASSWORD)
+    first_user = (conn.execute("SELECT MAX(id) FROM user").fetchone()[0] or 0) + 1
+    for chunk in chunks((f"Learner {i}", f"learner{i}@example.com", password) for i in range(first_user, first_user + users)):
+        conn.executemany("INSERT OR IGNORE INTO user (name, email, password) VALUES (?,?,?)", chunk)
+    conn.commit()
+    print(f"{users:,} users ({time.perf_counter() - started:.1f}s)", file=log)
+
+    # Course popularity is long-tailed: a few courses hold most of the enrollments
+    cum = list(itertools.accumulate(1 / (rank + 10) for rank in range(courses)))
+
+    def enrollment_rows():
+        for uid in range(first_user, first_user + users):
+            picked = {first_course + i for i in rng.choices(range(courses), cum_weights=cum, k=enrollments)}
+            for course_id in picked:
+                done = rng.random() < completed
+                progress = 100 if done else rng.choice((0, 25, 50, 75))
+                at = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00.000"
+                yield (uid, course_id, 'Completed' if done else 'In Progress', progress, at, at, at if done else None)
+
+    total = 0
+    for chunk in chunks(enrollment_rows()):
+        conn.executemany("INSERT OR IGNORE INTO enrollment (user_id, course_id, status, progress, updated_at, enrolled_at, completed_at) VALUES (?,?,?,?,?,?,?)", chunk)
+        conn.commit()
+        total += len(chunk)
+    print(f"{total:,} enrollments ({time.perf_counter() - started:.1f}s)", file=log)
+
+    conn.execute("""
+        INSERT OR IGNORE INTO certificate (id, user_id, course_id, date_issued)
+        SELECT printf('ATH-%08X', e.id), e.user_id, e.course_id, substr(e.updated_at, 1, 10) FROM enrollment e
+        WHERE e.user_id >= ? AND e.progress >= 100
+    """, (first_user,))
+    conn.commit()
+    conn.executescript(lms.DEFAULT_CURRICULUM_SQL)
+    conn.execute("ANALYZE")
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ('user', 'course', 'enrollment', 'certificate')}
+    print(f"done in {time.perf_counter() - started:.1f}s: {counts}", file=log)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--courses', type=int)
+    parser.add_argument('--enrollments', type=int, help='enrollments per user')
+    parser.add_argument('--completed', type=float, help='share of enrollments that are completed')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    users, courses, enrollments, completed = SCALES[args.scale]
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    lms.seed_db(conn)
+    counts = generate(conn, args.users or users, args.courses or courses, args.enrollments or enrollments,
+                      completed if args.completed is None else args.completed, args.seed)
+    print(json.dumps({'db': lms.DB_NAME, **counts}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""Per-route load test through Flask's test client and/or real HTTP, with JSON results for diffing runs.
+
+    python benchmarks/loadtest.py --scale 10k [--mode both] [--requests 400] [--threads 8] [--output run.json]
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --mode http          # an already running server
+    python benchmarks/loadtest.py --baseline main.json --max-regression 0.2       # exit 1 on a p95 regression
+
+An empty LMS_DB is first filled by datagen.py at the chosen scale. Every worker thread logs in as
+its own generated learner, then hammers one route at a time; throughput, latency percentiles and
+SQL statements per request (from the Server-Timing header) are reported for each route.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LMS_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+# Every simulated learner signs in from 127.0.0.1, many times over: no sign-in throttling (servers started from here inherit this)
+os.environ.setdefault('LMS_LOGIN_IP_PER_MINUTE', '0')
+os.environ.setdefault('LMS_LOGIN_ACCOUNT_PER_MINUTE', '0')
+
+import lms_main as lms  # noqa: E402
+import datagen  # noqa: E402
+from bench_search import vocabulary  # noqa: E402
+
+# ==========================================
+# QUERY COUNTING
+# ==========================================
+
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+def query_count(server_timing):
+    """SQL statements of one request, from the app's Server-Timing header (None when instrumentation is off)."""
+    match = SERVER_TIMING_QUERIES.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+# ==========================================
+# SCENARIOS
+# ==========================================
+
+class Learner:
+    def __init__(self, uid, email, courses):
+        self.uid, self.email, self.courses = uid, email, courses
+
+def sample_learners(conn, count, rng):
+    lo, hi = conn.execute("SELECT MIN(id), MAX(id) FROM user WHERE email LIKE 'learner%'").fetchone()
+    if lo is None: raise SystemExit("no generated learners in the database; run datagen.py or start from an empty LMS_DB")
+    learners = []
+    for uid in rng.sample(range(lo, hi + 1), min(hi - lo + 1, count * 4)):
+        courses = [r[0] for r in conn.execute("SELECT course_id FROM enrollment WHERE user_id = ? ORDER BY course_id", (uid,))]
+        email = conn.execute("SELECT email FROM user WHERE id = ?", (uid,)).fetchone()
+        if courses and email: learners.append(Learner(uid, email[0], courses))
+        if len(learners) == count: break
+    return learners
+
+def routes(words, weights):
+    """(name, method, request factory) for every route under test; factories return (path, form data)."""
+    def search_query(rng):
+        return ' '.join(w[:rng.randint(2, 6)] for w in rng.choices(words, cum_weights=weights, k=rng.choice((1, 1, 2))))
+    return [
+        ('dashboard', 'GET', lambda rng, l: ('/', None)),
+        ('explore', 'GET', lambda rng, l: ('/explore', None)),
+        ('my_courses', 'GET', lambda rng, l: ('/my-courses', None)),
+        ('view_course', 'GET', lambda rng, l: (f'/course/{rng.choice(l.courses)}', None)),
+        ('update_progress', 'POST', lambda rng, l: (f'/update-progress/{rng.choice(l.courses)}', {})),
+        ('api_search', 'GET', lambda rng, l: ('/api/search?' + urlencode({'q': search_query(rng)}), None)),
+        ('certificates', 'GET', lambda rng, l: ('/certificates', None)),
+        ('login', 'POST', lambda rng, l: ('/login', {'email': l.email, 'password': datagen.PASSWORD})),
+    ]
+
+# ==========================================
+# CLIENTS
+# ==========================================
+
+class TestClientSession:
+    """In-process requests through Flask's test client; no sockets involved."""
+
+    def __init__(self, learner):
+        self.client = lms.app.test_client()
+        self.request('POST', '/login', {'email': learner.email, 'password': datagen.PASSWORD})
+
+    def request(self, method, path, data):
+        resp = self.client.open(path, method=method, data=data)
+        return resp.status_code, query_count(resp.headers.get('Server-Timing'))
+
+class HttpSession:
+    """One keep-alive HTTP/1.1 connection carrying the learner's session cookie."""
+
+    def __init__(self, learner, base_url):
+        url = urlsplit(base_url)
+        self.conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        self.cookie = ''
+        self.request('POST', '/login', {'email': learner.email, 'password': datagen.PASSWORD})
+
+    def request(self, method, path, data):
+        headers = {'Cookie': self.cookie} if self.cookie else {}
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+            resp.read()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()  # reconnects on the next request
+            return 599, None
+        cookie = resp.getheader('Set-Cookie')
+        if cookie: self.cookie = cookie.split(';', 1)[0]
+        return resp.status, query_count(resp.getheader('Server-Timing'))
+
+class QuietHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like a real deployment behind a proxy
+
+    def log_request(self, *args):
+        pass
+
+def start_server():
+    server = make_server('127.0.0.1', 0, lms.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+# ==========================================
+# RUNNER
+# ==========================================
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000 if samples else None
+
+def run_route(sessions, learners, factory, method, requests, seed):
+    per_thread = [requests // len(sessions) + (i < requests % len(sessions)) for i in range(len(sessions))]
+    latencies, queries, errors = [], [], [0]
+    lock = threading.Lock()
+
+    def worker(i):
+        rng, session, learner = random.Random(seed + i), sessions[i], learners[i]
+        mine_lat, mine_q, mine_err = [], [], 0
+        for _ in range(per_thread[i]):
+            path, data = factory(rng, learner)
+            t = time.perf_counter()
+            status, count = session.request(method, path, data)
+            mine_lat.append(time.perf_counter() - t)
+            if status >= 400: mine_err += 1
+            if count is not None: mine_q.append(count)
+        with lock:
+            latencies.extend(mine_lat)
+            queries.extend(mine_q)
+            errors[0] += mine_err
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(sessions))]
+    started = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies), 'errors': errors[0], 'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 3), 'p95_ms': round(percentile(latencies, 95), 3), 'p99_ms': round(percentile(latencies, 99), 3),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+def run_mode(mode, learners, args, words, weights, base_url=None):
+    make = (lambda l: TestClientSession(l)) if mode == 'client' else (lambda l: HttpSession(l, base_url))
+    sessions = [make(l) for l in learners]
+    results = {}
+    for n, (name, method, factory) in enumerate(routes(words, weights)):
+        if args.routes and name not in args.routes: continue
+        # Password hashing is deliberately slow; a tenth of the requests is enough to measure it
+        count = max(len(sessions), args.requests // 10) if name == 'login' else args.requests
+        results[name] = res = run_route(sessions, learners, factory, method, count, args.seed + 1000 * n)
+        print(f"{mode:<7}{name:<16}{res['rps']:>10,.1f}{res['p50_ms']:>10.2f}{res['p95_ms']:>10.2f}{res['p99_ms']:>10.2f}"
+              f"{res['queries_per_request'] if res['queries_per_request'] is not None else '-':>10}{res['errors']:>8}", file=sys.stderr)
+    return results
+
+def compare(results, baseline, max_regression):
+    """Routes whose p95 got worse than the baseline by more than `max_regression` (a fraction)."""
+    regressions = []
+    for mode, routes_ in results.items():
+        for name, res in routes_.items():
+            old = baseline.get('results', {}).get(mode, {}).get(name)
+            if old and old.get('p95_ms') and res['p95_ms'] > old['p95_ms'] * (1 + max_regression):
+                regressions.append(f"{mode}/{name}: p95 {old['p95_ms']:.2f}ms -> {res['p95_ms']:.2f}ms")
+    return regressions
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(datagen.SCALES), default='1k', help='dataset generated into an empty LMS_DB')
+    parser.add_argument('--mode', choices=['client', 'http', 'both'], default='both')
+    parser.add_argument('--url', help='load an already running server instead of an in-process one (http mode only)')
+    parser.add_argument('--requests', type=int, default=400, help='requests per route')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--routes', nargs='*', help='only these routes')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='JSON report of an earlier run to compare p95 latencies against')
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    if not conn.execute("SELECT 1 FROM user WHERE email LIKE 'learner%' LIMIT 1").fetchone():
+        lms.seed_db(conn)
+        datagen.generate(conn, *datagen.SCALES[args.scale], seed=args.seed)
+    rng = random.Random(args.seed)
+    learners = sample_learners(conn, args.threads, rng)
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ('user', 'course', 'enrollment', 'certificate')}
+    conn.close()
+    words, weights = vocabulary(random.Random(args.seed))
+
+    modes = ['http'] if args.url else (['client', 'http'] if args.mode == 'both' else [args.mode])
+    print(f"{'mode':<7}{'route':<16}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}{'errors':>8}", file=sys.stderr)
+    results = {}
+    for mode in modes:
+        server, base_url = (None, args.url) if args.url or mode == 'client' else start_server()
+        try:
+            results[mode] = run_mode(mode, learners, args, words, weights, base_url)
+        finally:
+            if server: server.shutdown()
+
+    report = {
+        'meta': {'revision': git_revision(), 'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'db': lms.DB_NAME,
+                 'rows': counts, 'threads': args.threads, 'requests_per_route': args.requests, 'target': args.url or 'in-process',
+                 'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'cpus': os.cpu_count()},
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f: f.write(text + '\n')
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for line in regressions: print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions: raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
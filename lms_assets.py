@@ -0,0 +1,406 @@
+"""Static asset pipeline: purged utility CSS, fingerprinted files and precompressed variants.
+
+    python lms_assets.py build       # what lms_main does on import; prints the manifest
+    python lms_assets.py vendor      # download Font Awesome into assets/vendor/ once (needs network)
+
+Stylesheets are generated, not downloaded: every token in the templates and scripts that names a
+Tailwind utility is turned into its CSS, so app.css holds exactly the classes the pages use. Font
+Awesome is purged the same way down to the icons in use once vendored; until then pages fall back
+to its CDN stylesheet, loaded without blocking rendering. Every output file is named after a hash
+of its content, so it can be cached forever, and text files get .gz (and .br, when the brotli
+module is installed) siblings compressed once at build time rather than per request.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import urllib.request
+
+try:
+    import brotli
+except ImportError:  # optional: .br variants are only written when it is installed
+    brotli = None
+
+log = logging.getLogger('lms.assets')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(ROOT, 'assets')
+STATIC_DIR = os.environ.get('LMS_STATIC_DIR', os.path.join(ROOT, 'static'))
+
+FONT_AWESOME_VERSION = '6.4.0'
+FONT_AWESOME_URL = f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FONT_AWESOME_VERSION}/'
+FONT_AWESOME_CDN = FONT_AWESOME_URL + 'css/all.min.css'
+FONT_AWESOME_DIR = os.path.join(SOURCE_DIR, 'vendor', 'fontawesome')
+FONT_AWESOME_FILES = ('css/all.min.css', 'webfonts/fa-solid-900.woff2', 'webfonts/fa-regular-400.woff2', 'webfonts/fa-brands-400.woff2')
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json')
+
+
+# ==========================================
+# UTILITY CSS
+# ==========================================
+
+PALETTE = {
+    'slate': ('#f8fafc', '#f1f5f9', '#e2e8f0', '#cbd5e1', '#94a3b8', '#64748b', '#475569', '#334155', '#1e293b', '#0f172a'),
+    'gray': ('#f9fafb', '#f3f4f6', '#e5e7eb', '#d1d5db', '#9ca3af', '#6b7280', '#4b5563', '#374151', '#1f2937', '#111827'),
+    'red': ('#fef2f2', '#fee2e2', '#fecaca', '#fca5a5', '#f87171', '#ef4444', '#dc2626', '#b91c1c', '#991b1b', '#7f1d1d'),
+    'orange': ('#fff7ed', '#ffedd5', '#fed7aa', '#fdba74', '#fb923c', '#f97316', '#ea580c', '#c2410c', '#9a3412', '#7c2d12'),
+    'yellow': ('#fefce8', '#fef9c3', '#fef08a', '#fde047', '#facc15', '#eab308', '#ca8a04', '#a16207', '#854d0e', '#713f12'),
+    'green': ('#f0fdf4', '#dcfce7', '#bbf7d0', '#86efac', '#4ade80', '#22c55e', '#16a34a', '#15803d', '#166534', '#14532d'),
+    'blue': ('#eff6ff', '#dbeafe', '#bfdbfe', '#93c5fd', '#60a5fa', '#3b82f6', '#2563eb', '#1d4ed8', '#1e40af', '#1e3a8a'),
+    'indigo': ('#eef2ff', '#e0e7ff', '#c7d2fe', '#a5b4fc', '#818cf8', '#6366f1', '#4f46e5', '#4338ca', '#3730a3', '#312e81'),
+}
+SHADES = ('50', '100', '200', '300', '400', '500', '600', '700', '800', '900')
+COLORS = {f'{name}-{shade}': hex_ for name, hexes in PALETTE.items() for shade, hex_ in zip(SHADES, hexes)}
+COLORS.update({'black': '#000', 'white': '#fff', 'transparent': 'transparent', 'current': 'currentColor'})
+
+FONT_SIZES = {'xs': ('0.75rem', '1rem'), 'sm': ('0.875rem', '1.25rem'), 'base': ('1rem', '1.5rem'), 'lg': ('1.125rem', '1.75rem'),
+              'xl': ('1.25rem', '1.75rem'), '2xl': ('1.5rem', '2rem'), '3xl': ('1.875rem', '2.25rem'), '4xl': ('2.25rem', '2.5rem'), '5xl': ('3rem', '1')}
+FONT_WEIGHTS = {'light': 300, 'normal': 400, 'medium': 500, 'semibold': 600, 'bold': 700, 'extrabold': 800, 'black': 900}
+TRACKING = {'tighter': '-0.05em', 'tight': '-0.025em', 'normal': '0em', 'wide': '0.025em', 'wider': '0.05em', 'widest': '0.1em'}
+LEADING = {'none': '1', 'tight': '1.25', 'snug': '1.375', 'normal': '1.5', 'relaxed': '1.625', 'loose': '2'}
+RADII = {'none': '0px', 'sm': '0.125rem', '': '0.25rem', 'md': '0.375rem', 'lg': '0.5rem', 'xl': '0.75rem', '2xl': '1rem', '3xl': '1.5rem', 'full': '9999px'}
+MAX_WIDTHS = {'xs': '20rem', 'sm': '24rem', 'md': '28rem', 'lg': '32rem', 'xl': '36rem', '2xl': '42rem', '3xl': '48rem',
+              '4xl': '56rem', '5xl': '64rem', '6xl': '72rem', '7xl': '80rem', 'full': '100%'}
+SHADOWS = {'sm': '0 1px 2px 0 {c}', '': '0 1px 3px 0 {c}, 0 1px 2px -1px {c}', 'md': '0 4px 6px -1px {c}, 0 2px 4px -2px {c}',
+           'lg': '0 10px 15px -3px {c}, 0 4px 6px -4px {c}', 'xl': '0 20px 25px -5px {c}, 0 8px 10px -6px {c}', '2xl': '0 25px 50px -12px {c}'}
+BREAKPOINTS = {'sm': 640, 'md': 768, 'lg': 1024, 'xl': 1280}
+PSEUDO = {'hover': ':hover', 'focus': ':focus', 'active': ':active', 'disabled': ':disabled', 'first': ':first-child', 'last': ':last-child'}
+EASE = 'transition-timing-function:cubic-bezier(0.4,0,0.2,1);transition-duration:150ms'
+TRANSITIONS = {'': 'color,background-color,border-color,text-decoration-color,fill,stroke,opacity,box-shadow,transform,filter,backdrop-filter',
+               'all': 'all', 'colors': 'color,background-color,border-color,text-decoration-color,fill,stroke', 'opacity': 'opacity',
+               'shadow': 'box-shadow', 'transform': 'transform'}
+TRANSFORM = 'transform:translate(var(--tw-translate-x),var(--tw-translate-y)) rotate(var(--tw-rotate)) scaleX(var(--tw-scale-x)) scaleY(var(--tw-scale-y))'
+SIDES = {'': ('',), 'x': ('-left', '-right'), 'y': ('-top', '-bottom'), 't': ('-top',), 'r': ('-right',), 'b': ('-bottom',), 'l': ('-left',)}
+CORNERS = {'t': ('top-left', 'top-right'), 'r': ('top-right', 'bottom-right'), 'b': ('bottom-right', 'bottom-left'), 'l': ('top-left', 'bottom-left')}
+
+PREFLIGHT = """*,::before,::after{box-sizing:border-box;border:0 solid #e5e7eb;--tw-translate-x:0;--tw-translate-y:0;--tw-rotate:0;--tw-scale-x:1;--tw-scale-y:1;--tw-ring-inset: ;--tw-ring-offset-width:0px;--tw-ring-offset-color:#fff;--tw-ring-color:rgb(59 130 246/0.5);--tw-ring-offset-shadow:0 0 #0000;--tw-ring-shadow:0 0 #0000;--tw-shadow:0 0 #0000;--tw-shadow-colored:0 0 #0000}
+html{line-height:1.5;-webkit-text-size-adjust:100%;tab-size:4;font-family:ui-sans-serif,system-ui,sans-serif}
+body{margin:0;line-height:inherit}
+h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}
+a{color:inherit;text-decoration:inherit}
+b,strong{font-weight:bolder}
+code,kbd,samp,pre{font-family:ui-monospace,SFMono-Regular,Menlo,monospace;font-size:1em}
+button,input,optgroup,select,textarea{font-family:inherit;font-size:100%;font-weight:inherit;line-height:inherit;color:inherit;margin:0;padding:0}
+button,[type=button],[type=reset],[type=submit]{-webkit-appearance:button;background-color:transparent;background-image:none}
+blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}
+ol,ul,menu{list-style:none;margin:0;padding:0}
+textarea{resize:vertical}
+input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}
+button,[role=button]{cursor:pointer}
+:disabled{cursor:default}
+img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}
+img,video{max-width:100%;height:auto}
+[hidden]{display:none}
+"""
+
+def spacing(value):
+    """A Tailwind spacing-scale value (4 = 1rem), fraction, keyword or [arbitrary] value as CSS."""
+    if value.startswith('[') and value.endswith(']'): return value[1:-1].replace('_', ' ')
+    if value in ('auto', 'px', 'full', 'screen'): return {'px': '1px', 'full': '100%', 'screen': '100vw'}.get(value, value)
+    num, _, den = value.partition('/')
+    if den: return f'{int(num) / int(den) * 100:g}%' if num.isdigit() and den.isdigit() and int(den) else None
+    if not re.fullmatch(r'\d+(\.\d+)?', value): return None
+    return f'{float(value) / 4:g}rem' if float(value) else '0px'
+
+def color(value):
+    """A palette color, optionally with an /opacity modifier (bg-indigo-50/50)."""
+    name, _, alpha = value.partition('/')
+    hex_ = COLORS.get(name)
+    if hex_ is None or not alpha: return hex_
+    if not alpha.isdigit() or not hex_.startswith('#'): return None
+    r, g, b = (int(hex_[i:i + 2], 16) for i in (1, 3, 5))
+    return f'rgb({r} {g} {b}/{int(alpha) / 100:g})'
+
+def negate(value):
+    return None if value is None else value[1:] if value.startswith('-') else '0px' if value == '0px' else f'-{value}'
+
+def box(prop, sides, value):
+    return ';'.join(f'{prop}{side}:{value}' for side in SIDES[sides]) if value else None
+
+def _text(v):
+    if v in FONT_SIZES: return 'font-size:{};line-height:{}'.format(*FONT_SIZES[v])
+    if v in ('left', 'center', 'right', 'justify'): return f'text-align:{v}'
+    if v.startswith('['): return f'font-size:{spacing(v)}'
+    return f'color:{color(v)}' if color(v) else None
+
+def _border(m):
+    side, rest = m.group(1) or '', m.group(2)
+    if rest in ('none', 'solid', 'dashed', 'dotted'): return None if side else f'border-style:{rest}'
+    if rest is None or rest.isdigit(): return ';'.join(f'border{s}-width:{rest or 1}px' for s in SIDES[side])
+    c = color(rest)
+    return ';'.join(f'border{s}-color:{c}' for s in SIDES[side]) if c else None
+
+def _rounded(m):
+    corner, size = m.group(1), m.group(2) or ''
+    if size not in RADII: return None
+    if not corner: return f'border-radius:{RADII[size]}'
+    return ';'.join(f'border-{c}-radius:{RADII[size]}' for c in CORNERS[corner])
+
+def _shadow(v):
+    if v == 'none': return '--tw-shadow:0 0 #0000;box-shadow:var(--tw-ring-offset-shadow,0 0 #0000),var(--tw-ring-shadow,0 0 #0000),var(--tw-shadow)'
+    if v in SHADOWS:
+        alpha = '0.25' if v == '2xl' else '0.05' if v == 'sm' else '0.1'
+        return (f"--tw-shadow:{SHADOWS[v].format(c=f'rgb(0 0 0/{alpha})')};--tw-shadow-colored:{SHADOWS[v].format(c='var(--tw-shadow-color)')};"
+                'box-shadow:var(--tw-ring-offset-shadow,0 0 #0000),var(--tw-ring-shadow,0 0 #0000),var(--tw-shadow)')
+    return f'--tw-shadow-color:{color(v)};--tw-shadow:var(--tw-shadow-colored)' if color(v) else None
+
+def _ring(v):
+    if v == '' or v.isdigit():
+        return ('--tw-ring-offset-shadow:var(--tw-ring-inset) 0 0 0 var(--tw-ring-offset-width) var(--tw-ring-offset-color);'
+                f'--tw-ring-shadow:var(--tw-ring-inset) 0 0 0 calc({v or 3}px + var(--tw-ring-offset-width)) var(--tw-ring-color);'
+                'box-shadow:var(--tw-ring-offset-shadow),var(--tw-ring-shadow),var(--tw-shadow,0 0 #0000)')
+    return f'--tw-ring-color:{color(v)}' if color(v) else None
+
+def _size(prop, v):
+    if v == 'screen' and 'height' in prop: return f'{prop}:100vh'
+    value = spacing(v) if v not in ('min', 'max', 'fit') else f'{v}-content'
+    return f'{prop}:{value}' if value else None
+
+def _inset(m, neg):
+    value = spacing(m.group(2))
+    if neg: value = negate(value)
+    return ';'.join(f'{p}:{value}' for p in {'inset': ('top', 'right', 'bottom', 'left'), 'inset-x': ('left', 'right'), 'inset-y': ('top', 'bottom')}.get(m.group(1), (m.group(1),))) if value else None
+
+# (pattern, function of the match and the negative flag) in cascade order: later rules win ties, so
+# shorthands come before the longhands that refine them (p before px before pt).
+UTILITIES = [
+    (r'(block|inline-block|inline|flex|inline-flex|grid|inline-grid|table|contents|hidden)', lambda m, n: f"display:{'none' if m.group(1) == 'hidden' else m.group(1)}"),
+    (r'(static|fixed|absolute|relative|sticky)', lambda m, n: f'position:{m.group(1)}'),
+    (r'(inset|inset-x|inset-y|top|right|bottom|left)-(.+)', _inset),
+    (r'z-(\d+|auto)', lambda m, n: f'z-index:{m.group(1)}'),
+    (r'col-span-(full|\d+)', lambda m, n: 'grid-column:1/-1' if m.group(1) == 'full' else f'grid-column:span {m.group(1)}/span {m.group(1)}'),
+    (r'(m|mx|my|mt|mr|mb|ml)-(.+)', lambda m, n: box('margin', m.group(1)[1:], negate(spacing(m.group(2))) if n else spacing(m.group(2)))),
+    (r'space-(x|y)-(.+)', lambda m, n: ('>:not([hidden])~:not([hidden])', f"margin-{'left' if m.group(1) == 'x' else 'top'}:{spacing(m.group(2))}") if spacing(m.group(2)) else None),
+    (r'aspect-(video|square)', lambda m, n: f"aspect-ratio:{'16/9' if m.group(1) == 'video' else '1/1'}"),
+    (r'h-(.+)', lambda m, n: _size('height', m.group(1))),
+    (r'max-h-(.+)', lambda m, n: _size('max-height', m.group(1))),
+    (r'min-h-(0|full|screen)', lambda m, n: f"min-height:{ {'0': '0px', 'full': '100%', 'screen': '100vh'}[m.group(1)]}"),
+    (r'w-(.+)', lambda m, n: _size('width', m.group(1))),
+    (r'max-w-(.+)', lambda m, n: f'max-width:{MAX_WIDTHS[m.group(1)]}' if m.group(1) in MAX_WIDTHS else None),
+    (r'flex-(1|auto|initial|none)', lambda m, n: 'flex:' + {'1': '1 1 0%', 'auto': '1 1 auto', 'initial': '0 1 auto', 'none': 'none'}[m.group(1)]),
+    (r'flex-shrink-0|shrink-0', lambda m, n: 'flex-shrink:0'),
+    (r'(translate-x|translate-y)-(.+)', lambda m, n: f"--tw-{m.group(1)}:{negate(spacing(m.group(2))) if n else spacing(m.group(2))};{TRANSFORM}" if spacing(m.group(2)) else None),
+    (r'rotate-(\d+)', lambda m, n: f"--tw-rotate:{'-' if n else ''}{m.group(1)}deg;{TRANSFORM}"),
+    (r'scale-(\d+)', lambda m, n: f'--tw-scale-x:{int(m.group(1)) / 100:g};--tw-scale-y:{int(m.group(1)) / 100:g};{TRANSFORM}'),
+    (r'cursor-(pointer|default|not-allowed|wait|text)', lambda m, n: f'cursor:{m.group(1)}'),
+    (r'grid-cols-(\d+)', lambda m, n: f'grid-template-columns:repeat({m.group(1)},minmax(0,1fr))'),
+    (r'flex-(row|row-reverse|col|col-reverse)', lambda m, n: 'flex-direction:' + m.group(1).replace('col', 'column')),
+    (r'flex-(wrap|nowrap)', lambda m, n: f'flex-wrap:{m.group(1)}'),
+    (r'items-(start|end|center|baseline|stretch)', lambda m, n: 'align-items:' + {'start': 'flex-start', 'end': 'flex-end'}.get(m.group(1), m.group(1))),
+    (r'justify-(start|end|center|between|around|evenly)', lambda m, n: 'justify-content:' + {'start': 'flex-start', 'end': 'flex-end', 'between': 'space-between', 'around': 'space-around', 'evenly': 'space-evenly'}.get(m.group(1), m.group(1))),
+    (r'gap-(.+)', lambda m, n: f'gap:{spacing(m.group(1))}' if spacing(m.group(1)) else None),
+    (r'overflow-(?:(x|y)-)?(auto|hidden|scroll|visible)', lambda m, n: f"overflow{'-' + m.group(1) if m.group(1) else ''}:{m.group(2)}"),
+    (r'truncate', lambda m, n: 'overflow:hidden;text-overflow:ellipsis;white-space:nowrap'),
+    (r'whitespace-(normal|nowrap|pre|pre-line|pre-wrap)', lambda m, n: f'white-space:{m.group(1)}'),
+    (r'rounded(?:-(t|r|b|l))?(?:-(none|sm|md|lg|xl|2xl|3xl|full))?', lambda m, n: _rounded(m)),
+    (r'border(?:-(x|y|t|r|b|l))?(?:-(.+))?', lambda m, n: _border(m)),
+    (r'bg-(.+)', lambda m, n: f'background-color:{color(m.group(1))}' if color(m.group(1)) else None),
+    (r'(p|px|py|pt|pr|pb|pl)-(.+)', lambda m, n: None if n else box('padding', m.group(1)[1:], spacing(m.group(2)))),
+    (r'text-(.+)', lambda m, n: _text(m.group(1))),
+    (r'font-(sans|mono)', lambda m, n: 'font-family:' + ('ui-monospace,SFMono-Regular,Menlo,monospace' if m.group(1) == 'mono' else 'ui-sans-serif,system-ui,sans-serif')),
+    (r'font-(\w+)', lambda m, n: f'font-weight:{FONT_WEIGHTS[m.group(1)]}' if m.group(1) in FONT_WEIGHTS else None),
+    (r'(uppercase|lowercase|capitalize)', lambda m, n: f'text-transform:{m.group(1)}'),
+    (r'(italic|not-italic)', lambda m, n: f"font-style:{'italic' if m.group(1) == 'italic' else 'normal'}"),
+    (r'leading-(\w+)', lambda m, n: f'line-height:{LEADING[m.group(1)]}' if m.group(1) in LEADING else None),
+    (r'tracking-(\w+)', lambda m, n: f'letter-spacing:{TRACKING[m.group(1)]}' if m.group(1) in TRACKING else None),
+    (r'(underline|line-through|no-underline)', lambda m, n: 'text-decoration-line:' + ('none' if m.group(1) == 'no-underline' else m.group(1))),
+    (r'opacity-(\d+)', lambda m, n: f'opacity:{int(m.group(1)) / 100:g}'),
+    (r'shadow(?:-(.+))?', lambda m, n: _shadow(m.group(1) or '')),
+    (r'outline-none', lambda m, n: 'outline:2px solid transparent;outline-offset:2px'),
+    (r'ring(?:-(.+))?', lambda m, n: _ring(m.group(1) or '')),
+    (r'transition(?:-(\w+))?', lambda m, n: f"transition-property:{TRANSITIONS[m.group(1) or '']};{EASE}" if (m.group(1) or '') in TRANSITIONS else None),
+    (r'duration-(\d+)', lambda m, n: f'transition-duration:{m.group(1)}ms'),
+    (r'ease-(linear|in|out|in-out)', lambda m, n: 'transition-timing-function:' + {'linear': 'linear', 'in': 'cubic-bezier(0.4,0,1,1)', 'out': 'cubic-bezier(0,0,0.2,1)', 'in-out': 'cubic-bezier(0.4,0,0.2,1)'}[m.group(1)]),
+]
+UTILITIES = [(re.compile(pattern + '$'), fn) for pattern, fn in UTILITIES]
+
+CANDIDATE_RE = re.compile(r'[A-Za-z0-9_\-:/.\[\]]+')
+
+def escape_class(name):
+    return re.sub(r'([^A-Za-z0-9_-])', r'\\\1', name)
+
+def utility_rule(token):
+    """(sort key, CSS rule) for a token naming a utility, possibly with variants, or None."""
+    *variants, name = token.split(':')
+    negative = name.startswith('-')
+    if negative: name = name[1:]
+    for order, (pattern, fn) in enumerate(UTILITIES):
+        match = pattern.match(name)
+        if match:
+            declarations = fn(match, negative)
+            if declarations: break
+    else:
+        return None
+    suffix = ''
+    if isinstance(declarations, tuple): suffix, declarations = declarations
+    selector, prefix, breakpoint, pseudo = '.' + escape_class(token), '', 0, False
+    for variant in variants:
+        if variant in BREAKPOINTS and not breakpoint:
+            breakpoint = BREAKPOINTS[variant]
+        elif variant in PSEUDO:
+            selector, pseudo = selector + PSEUDO[variant], True
+        elif variant.startswith('group-') and variant[6:] in PSEUDO:
+            prefix, pseudo = '.group' + PSEUDO[variant[6:]] + ' ', True
+        else:
+            return None
+    rule = f'{prefix}{selector}{suffix}{{{declarations}}}'
+    return (breakpoint, pseudo, order, token), rule
+
+def utility_css(content):
+    """Preflight plus a rule for every utility named anywhere in `content` (an iterable of strings)."""
+    tokens = {t for text in content for t in CANDIDATE_RE.findall(text)}
+    rules = sorted(r for r in map(utility_rule, tokens) if r)
+    out, media = [PREFLIGHT], 0
+    for (breakpoint, *_), rule in rules:
+        if breakpoint != media:
+            if media: out.append('}\n')
+            out.append(f'@media (min-width:{breakpoint}px){{\n')
+            media = breakpoint
+        out.append(rule + '\n')
+    if media: out.append('}\n')
+    return ''.join(out)
+
+
+# ==========================================
+# FONT AWESOME
+# ==========================================
+
+def css_blocks(css):
+    """Top-level (prelude, body) pairs of a stylesheet; nested blocks stay inside body."""
+    blocks, depth, start, prelude = [], 0, 0, ''
+    for i, ch in enumerate(css):
+        if ch == '{':
+            if depth == 0: prelude, start = css[start:i].strip(), i + 1
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude, css[start:i]))
+                start = i + 1
+    return blocks
+
+CLASS_RE = re.compile(r'\.(-?[A-Za-z_][\w-]*)')
+
+def purge_css(css, used):
+    """Rules of `css` whose selectors only name classes in `used`; @font-face and @keyframes are kept."""
+    out = []
+    for prelude, body in css_blocks(css):
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = purge_css(body, used)
+            if inner: out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            out.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [s for s in prelude.split(',') if set(CLASS_RE.findall(s)) <= used]
+            if selectors: out.append(f"{','.join(selectors)}{{{body}}}")
+    return ''.join(out)
+
+def icon_css(used, fonts):
+    """The vendored Font Awesome stylesheet purged to `used` classes, fonts pointing at `fonts` (name -> output file)."""
+    with open(os.path.join(FONT_AWESOME_DIR, 'css', 'all.min.css'), encoding='utf-8') as f:
+        css = purge_css(f.read(), used)
+    blocks, out = css_blocks(css), []
+    rules = ''.join(body for prelude, body in blocks if not prelude.startswith('@'))
+    for prelude, body in blocks:
+        if prelude == '@font-face':
+            woff2 = re.search(r'webfonts/([\w-]+\.woff2)', body)
+            if not woff2 or woff2.group(1) not in fonts: continue
+            body = re.sub(r'src:[^;}]*', f'src:url({fonts[woff2.group(1)]}) format("woff2")', body)
+        elif 'keyframes' in prelude and prelude.split()[-1] not in rules:
+            continue  # animation of a purged class
+        out.append(f'{prelude}{{{body}}}')
+    return ''.join(out)
+
+def vendor():
+    """Download the Font Awesome stylesheet and webfonts the build purges from."""
+    for name in FONT_AWESOME_FILES:
+        path = os.path.join(FONT_AWESOME_DIR, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(FONT_AWESOME_URL + name, timeout=30) as resp:
+            write_atomic(path, resp.read())
+        print(f"{FONT_AWESOME_URL + name} -> {os.path.relpath(path, ROOT)}")
+
+
+# ==========================================
+# BUILD
+# ==========================================
+
+def write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f: f.write(data)
+    os.replace(tmp, path)
+
+def emit(name, data, out_dir):
+    """Write `data` as name.<hash>.ext plus its compressed variants, unless already there; return the file name."""
+    base, ext = os.path.splitext(name)
+    filename = f"{base}.{hashlib.sha1(data).hexdigest()[:10]}{ext}"
+    path = os.path.join(out_dir, filename)
+    if not os.path.exists(path):
+        if ext in COMPRESSIBLE:
+            variants = [('.gz', gzip.compress(data, 9, mtime=0))]
+            if brotli: variants.append(('.br', brotli.compress(data, quality=11)))
+            for suffix, packed in variants:
+                if len(packed) < len(data): write_atomic(path + suffix, packed)
+        write_atomic(path, data)  # last, so a present file implies its variants are complete
+    return filename
+
+def source(name):
+    with open(os.path.join(SOURCE_DIR, name), 'rb') as f:
+        return f.read()
+
+def build(content, out_dir=STATIC_DIR):
+    """Build every asset for pages made of `content` (template sources); return {logical name: file name or URL}."""
+    os.makedirs(out_dir, exist_ok=True)
+    js = source('app.js')
+    content = list(content) + [js.decode()]
+    manifest = {'app.js': emit('app.js', js, out_dir)}
+    manifest['app.css'] = emit('app.css', utility_css(content).encode() + source('app.css'), out_dir)
+    if os.path.exists(os.path.join(FONT_AWESOME_DIR, 'css', 'all.min.css')):
+        used = {t for text in content for t in CANDIDATE_RE.findall(text)}
+        fonts = {}
+        for name in FONT_AWESOME_FILES:
+            if name.endswith('.woff2') and os.path.exists(os.path.join(FONT_AWESOME_DIR, name)):
+                with open(os.path.join(FONT_AWESOME_DIR, name), 'rb') as f:
+                    fonts[os.path.basename(name)] = emit(os.path.basename(name), f.read(), out_dir)
+        manifest['icons.css'] = emit('icons.css', icon_css(used, fonts).encode(), out_dir)
+    else:
+        log.info('Font Awesome is not vendored; icons load from %s (run `python lms_assets.py vendor`)', FONT_AWESOME_CDN)
+        manifest['icons.css'] = FONT_AWESOME_CDN
+    data = json.dumps(manifest, indent=2, sort_keys=True).encode()
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    current = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'rb') as f: current = f.read()
+    if current != data: write_atomic(manifest_path, data)
+    return manifest
+
+def variant(out_dir, filename, accepts):
+    """(path, content encoding or None) of the smallest variant of a built file the client accepts, or None."""
+    path = os.path.join(out_dir, filename)
+    if os.path.basename(filename) != filename or filename.startswith('.') or not os.path.isfile(path): return None
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accepts(encoding) and os.path.isfile(path + suffix): return path + suffix, encoding
+    return path, None
+
+
+def main(argv=None):
+    args = (argv if argv is not None else sys.argv[1:]) or ['build']
+    if args[0] == 'vendor':
+        vendor()
+    elif args[0] != 'build':
+        raise SystemExit(__doc__)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+    import lms_main  # noqa: F401  (builds on import, from the app's templates)
+    for name, target in sorted(lms_main.ASSETS.items()):
+        path = os.path.join(STATIC_DIR, target)
+        sizes = ' '.join(f"{suffix or 'raw'} {os.path.getsize(path + suffix):,}B" for suffix in ('', '.gz', '.br') if os.path.exists(path + suffix)) if '://' not in target else 'external'
+        print(f"{name:<10} {target:<32} {sizes}")
+
+
+if __name__ == '__main__':
+    main()
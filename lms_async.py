@@ -0,0 +1,310 @@
+"""Async read path: the catalogue, search and dashboard JSON APIs as an ASGI app with concurrent query fan-out.
+
+    python lms_async.py [--host 127.0.0.1] [--port 8001] [--db-threads 8] [--max-pending 256]
+    uvicorn lms_async:app --port 8001        # or under any ASGI server
+
+The endpoints answer exactly like their Flask twins (/api/catalogue, /api/search, /api/dashboard)
+and share lms_main's data layer, caches and session cookie, so a reverse proxy can send these
+paths here and everything else to lms_serve.py. Every query runs on a bounded thread pool with a
+pooled connection of its own: independent queries of one request run at the same time, and
+thousands of open client connections cost the event loop nothing while they wait. Once
+--max-pending queries are queued, new requests get 503 with Retry-After instead of piling up.
+The built-in HTTP/1.1 server is deliberately small (keep-alive, no chunked request bodies) and is
+meant to sit behind a proxy.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http import HTTPStatus
+from urllib.parse import parse_qsl, unquote
+
+from flask.sessions import SecureCookieSessionInterface
+from itsdangerous import BadSignature
+from werkzeug.http import http_date, parse_accept_header, parse_cookie, parse_date, parse_etags
+
+import lms_main as lms
+
+log = logging.getLogger('lms.async')
+
+DB_THREADS = int(os.environ.get('LMS_ASYNC_DB_THREADS', lms.DB_POOL_SIZE))
+MAX_PENDING = int(os.environ.get('LMS_ASYNC_MAX_PENDING', 256))
+KEEP_ALIVE_SECONDS = 5
+GRACEFUL_SECONDS = 30
+
+
+class Overloaded(Exception):
+    pass
+
+
+class Database:
+    """Store calls on a bounded thread pool: `threads` run at once, at most `max_pending` wait."""
+
+    def __init__(self, threads=DB_THREADS, max_pending=MAX_PENDING):
+        self.threads, self.max_pending = threads, max_pending
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='lms-db')
+        self.pending = 0  # only touched from the event loop
+        self.counters = {'queries': 0, 'rejected': 0, 'peak_pending': 0}
+
+    async def run(self, fn, *args):
+        """fn(store, *args) on a pool thread, with a connection of its own for the duration of the call."""
+        if self.pending >= self.max_pending:
+            self.counters['rejected'] += 1
+            raise Overloaded()
+        self.pending += 1
+        self.counters['queries'] += 1
+        self.counters['peak_pending'] = max(self.counters['peak_pending'], self.pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self._call, fn, args)
+        finally:
+            self.pending -= 1
+
+    def _call(self, fn, args):
+        conn = lms.db_pool.acquire()
+        try:
+            return fn(lms.STORE_CLASS(conn), *args)
+        finally:
+            lms.db_pool.release(conn)
+
+    def stats(self):
+        return dict(self.counters, threads=self.threads, max_pending=self.max_pending, pending=self.pending)
+
+
+# ==========================================
+# REQUESTS & RESPONSES
+# ==========================================
+
+SESSION_SERIALIZER = SecureCookieSessionInterface().get_signing_serializer(lms.app)  # when LMS_SESSION_STORE is off
+SESSION_MAX_AGE = int(lms.app.permanent_session_lifetime.total_seconds())
+
+class Request:
+    def __init__(self, scope):
+        self.method, self.path = scope['method'], scope['path']
+        self.args = dict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        self.headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope['headers']}
+
+    async def session(self, db):
+        """The data of the session cookie (Flask's signed cookie, or the id of a stored session); {} without one."""
+        token = parse_cookie(self.headers.get('cookie', '')).get(lms.app.config['SESSION_COOKIE_NAME'])
+        if not token: return {}
+        if lms.SESSION_STORE:
+            found = await db.run(lms.stored_session, token)
+            return lms.app.session_interface.loads(found[0]) if found else {}
+        try:
+            return SESSION_SERIALIZER.loads(token, max_age=SESSION_MAX_AGE)
+        except BadSignature:
+            return {}
+
+    async def user_id(self, db):
+        """The learner of the session cookie, or None."""
+        return (await self.session(db)).get('user_id')
+
+    def limit(self, default, maximum):
+        try:
+            return max(1, min(int(self.args.get('limit', default)), maximum))
+        except ValueError:
+            return default
+
+def is_fresh(request, etag, last_modified):
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match: return parse_etags(if_none_match).contains_weak(etag)
+    since = parse_date(request.headers.get('if-modified-since'))
+    return since is not None and since >= last_modified
+
+def validator_headers(etag, last_modified):
+    return [(b'etag', f'W/"{etag}"'.encode()), (b'last-modified', http_date(last_modified).encode()), (b'cache-control', b'private, no-cache')]
+
+def json_response(data, status=200, headers=()):
+    return status, [(b'content-type', b'application/json')] + list(headers), json.dumps(data).encode() + b'\n'
+
+
+# ==========================================
+# HANDLERS
+# ==========================================
+
+def user_stats(store, uid):
+    return store.user_stats(uid)
+
+def recent_enrollments(store, uid):
+    return [dict(r) for r in store.recent_enrollments(uid)]
+
+async def api_dashboard(db, request, uid):
+    data = lms.DASHBOARD_CACHE.get(uid)
+    if data is None:
+        stats, recent, recommended = await asyncio.gather(db.run(user_stats, uid), db.run(recent_enrollments, uid),
+                                                          db.run(lms.recommended_courses, uid))
+        data = {'stats': stats, 'recent': recent, 'recommended': recommended}
+        lms.DASHBOARD_CACHE.set(uid, data)
+    return json_response(data)
+
+async def api_search(db, request, uid):
+    q, limit = request.args.get('q', ''), request.limit(lms.SEARCH_LIMIT_DEFAULT, lms.SEARCH_LIMIT_MAX)
+    etag, last_modified = await db.run(lms.search_validators, q, limit)
+    if is_fresh(request, etag, last_modified): return 304, validator_headers(etag, last_modified), b''
+    return json_response(await db.run(lms.search_results, q, uid, limit), headers=validator_headers(etag, last_modified))
+
+async def api_catalogue(db, request, uid):
+    cat, cursor, limit = request.args.get('category'), request.args.get('cursor', ''), request.limit(lms.CATALOGUE_PAGE_SIZE, 100)
+    after = lms.decode_cursor(cursor, int)
+    page = lambda store: lms.catalogue_page(store, None, cat, after[0] if after else 0, limit)
+    if 'if-none-match' in request.headers or 'if-modified-since' in request.headers:
+        # A revalidation usually ends in a 304, so the page is only read once the version says it changed
+        version, updated_at = await db.run(lms.catalogue_version)
+        courses = None
+    else:
+        (version, updated_at), courses = await asyncio.gather(db.run(lms.catalogue_version), db.run(page))
+    etag, last_modified = lms.catalogue_etag(version, cat, cursor, limit), datetime.fromtimestamp(updated_at, timezone.utc)
+    if is_fresh(request, etag, last_modified): return 304, validator_headers(etag, last_modified), b''
+    courses, next_cursor = courses or await db.run(page)
+    body = {'items': lms.catalogue_items(courses), 'next_cursor': next_cursor, 'version': version}
+    return json_response(body, headers=validator_headers(etag, last_modified))
+
+
+# ==========================================
+# ASGI APP
+# ==========================================
+
+class AsyncApp:
+    routes = {'/api/dashboard': api_dashboard, '/api/search': api_search, '/api/catalogue': api_catalogue}
+
+    def __init__(self, db=None):
+        self.db = db or Database()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http': return
+        request = Request(scope)
+        status, headers, body = await self.respond(request)
+        if status == 200:
+            # Compressed as the Flask app does, so both front ends put the same bytes on the wire
+            encoding = lms.response_encoding(parse_accept_header(request.headers.get('accept-encoding'))) if len(body) >= lms.COMPRESS_MIN_BYTES else None
+            if encoding: body, headers = lms.compress(body, encoding), headers + [(b'content-encoding', encoding.encode())]
+            headers = headers + [(b'vary', b'Accept-Encoding')]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers + [(b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def respond(self, request):
+        if request.path == '/api/async-stats':
+            # Admins only, as the stats routes of lms_main
+            if not (await request.session(self.db)).get('admin'): return json_response({'error': 'forbidden'}, 403)
+            return json_response({'db': self.db.stats(), 'pool': lms.db_pool.stats()})
+        handler = self.routes.get(request.path)
+        if handler is None: return json_response({'error': 'not found'}, 404)
+        if request.method != 'GET': return json_response({'error': 'method not allowed'}, 405, [(b'allow', b'GET')])
+        try:
+            uid = await request.user_id(self.db)
+            if uid is None: return 302, [(b'location', b'/login')], b''  # as Flask's login_required
+            return await handler(self.db, request, uid)
+        except Overloaded:
+            return json_response({'error': 'too many pending queries, retry shortly'}, 503, [(b'retry-after', b'1')])
+        except Exception:
+            log.exception('%s %s failed', request.method, request.path)
+            return json_response({'error': 'internal error'}, 500)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await asyncio.get_running_loop().run_in_executor(None, lms.init_db)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.db.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+app = AsyncApp()
+
+
+# ==========================================
+# HTTP/1.1 SERVER
+# ==========================================
+
+async def handle_connection(app, reader, writer):
+    client, server = writer.get_extra_info('peername'), writer.get_extra_info('sockname')
+    try:
+        while True:
+            try:
+                line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                break
+            if not line: break
+            method, target, version = line.decode('latin-1').split()
+            headers = []
+            while (header := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                name, _, value = header.decode('latin-1').partition(':')
+                headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+            fields = dict(headers)
+            length = int(fields.get(b'content-length', 0))
+            body = await reader.readexactly(length) if length else b''
+            path, _, query = target.partition('?')
+            scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': version[5:], 'method': method.upper(), 'scheme': 'http',
+                     'path': unquote(path), 'raw_path': path.encode('latin-1'), 'query_string': query.encode('latin-1'), 'root_path': '',
+                     'headers': headers, 'client': client[:2] if client else None, 'server': server[:2] if server else None}
+            sent = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            async def send(message):
+                sent.append(message)
+
+            await app(scope, receive, send)
+            start, content = sent[0], b''.join(m.get('body', b'') for m in sent[1:])
+            keep_alive = version == 'HTTP/1.1' and fields.get(b'connection', b'').lower() != b'close'
+            head = [f"HTTP/1.1 {start['status']} {HTTPStatus(start['status']).phrase}".encode()]
+            head += [name + b': ' + value for name, value in start['headers'] if name != b'content-length']
+            head.append(b'content-length: %d' % len(content))
+            if not keep_alive: head.append(b'connection: close')
+            writer.write(b'\r\n'.join(head) + b'\r\n\r\n' + content)
+            await writer.drain()
+            if not keep_alive: break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass  # client went away or sent something this server does not speak
+    finally:
+        writer.close()
+
+async def serve(app, host, port, backlog=2048):
+    connections = set()
+
+    def accept(reader, writer):
+        task = asyncio.create_task(handle_connection(app, reader, writer))
+        connections.add(task)
+        task.add_done_callback(connections.discard)
+
+    server = await asyncio.start_server(accept, host, port, backlog=backlog)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT): loop.add_signal_handler(sig, stop.set)
+    log.info('listening on http://%s:%d (%d database threads, %d pending queries max)', host, port, app.db.threads, app.db.max_pending)
+    await stop.wait()
+    # Graceful stop: no new connections; open ones finish their request or idle out
+    server.close()
+    if connections: await asyncio.wait(connections, timeout=GRACEFUL_SECONDS)
+    app.db.executor.shutdown(wait=True)
+    lms.NOTE_BUFFER.flush()
+    log.info('stopped')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--db-threads', type=int, default=DB_THREADS, help='queries running at once')
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING, help='queued queries before requests are refused with 503')
+    parser.add_argument('--backlog', type=int, default=2048)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+
+    lms.init_db()
+    lms.db_pool.size = max(lms.db_pool.size, args.db_threads)  # every database thread can hold a connection
+    asyncio.run(serve(AsyncApp(Database(args.db_threads, args.max_pending)), args.host, args.port, args.backlog))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Login throughput: password hashing off the request threads, login throttling and server-side sessions.
+
+PasswordHasher runs Werkzeug's deliberately slow password hashes in a small process pool, so a
+login spike queues there instead of pinning every request thread of a worker, and refuses new work
+with Overloaded once `max_pending` hashes are waiting. A login whose stored hash was made with other
+parameters than the configured method gets a fresh hash in the same trip to the pool.
+
+RateLimiter keeps in-memory token buckets (per process) for client addresses and accounts.
+
+ServerSessionInterface swaps Flask's signed-cookie session for a random id whose data lives in the
+database; the cookie only changes when the id does.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class Overloaded(Exception):
+    pass
+
+
+# ==========================================
+# PASSWORD HASHING
+# ==========================================
+
+def hash_params(pwhash):
+    """The method part of a Werkzeug hash: 'scrypt:32768:8:1' of 'scrypt:32768:8:1$salt$hash'."""
+    return pwhash.split('$', 1)[0]
+
+def _verify(pwhash, password, method, params):
+    # Runs in a pool process; rehashes right away when the stored parameters are out of date
+    if not check_password_hash(pwhash, password): return False, None
+    return True, generate_password_hash(password, method) if hash_params(pwhash) != params else None
+
+class PasswordHasher:
+    """Password hashes on `workers` processes (0: on the calling thread); at most `max_pending` wait for one."""
+
+    def __init__(self, method='scrypt', workers=1, max_pending=64):
+        self.method, self.workers, self.max_pending = method, workers, max_pending
+        self.pending = 0
+        self.counters = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+        self._executor, self._pid = None, None
+
+    @cached_property
+    def params(self):
+        return hash_params(generate_password_hash('', self.method))  # 'scrypt' -> 'scrypt:32768:8:1'
+
+    def _pool(self):
+        # One pool per process: its processes and pipes must not cross lms_serve's fork
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor, self._pid = ProcessPoolExecutor(self.workers), os.getpid()
+        return self._executor
+
+    def _run(self, counter, fn, *args):
+        with self._lock:
+            if self.workers and self.pending >= self.max_pending:
+                self.counters['rejected'] += 1
+                raise Overloaded()
+            self.pending += 1
+            self.counters[counter] += 1
+        try:
+            return self._pool().submit(fn, *args).result() if self.workers else fn(*args)
+        finally:
+            with self._lock: self.pending -= 1
+
+    def start(self):
+        """Fork the pool's processes now, before the caller starts threads of its own."""
+        if self.workers: self._pool().submit(int).result()
+
+    def shutdown(self):
+        if self._executor and self._pid == os.getpid(): self._executor.shutdown(wait=True)
+
+    def hash(self, password):
+        return self._run('hashed', generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """(matches, new hash or None): a new hash when `pwhash` was made with other parameters."""
+        ok, new_hash = self._run('verified', _verify, pwhash, password, self.method, self.params)
+        if new_hash:
+            with self._lock: self.counters['rehashed'] += 1
+        return ok, new_hash
+
+    def stats(self):
+        return dict(self.counters, method=self.params, workers=self.workers, max_pending=self.max_pending, pending=self.pending)
+
+
+# ==========================================
+# RATE LIMITING
+# ==========================================
+
+class RateLimiter:
+    """Token bucket per key: `per_minute` attempts refill evenly, up to `burst` at once; 0 disables it."""
+
+    def __init__(self, per_minute, burst=None, maxsize=100000):
+        self.rate, self.burst, self.maxsize = per_minute / 60, burst or per_minute, maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, monotonic time of last update)
+        self._lock = threading.Lock()
+        self.allowed = self.limited = 0
+
+    def take(self, key):
+        """0 when `key` may go ahead (spending a token), else the seconds until it may."""
+        if not self.rate: return 0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            if wait: self.limited += 1
+            else: tokens, self.allowed = tokens - 1, self.allowed + 1
+            self._buckets[key] = (tokens, now)
+            # The least recently seen key goes first; its bucket has mostly refilled by then anyway
+            if len(self._buckets) > self.maxsize: self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self):
+        return {'per_minute': round(self.rate * 60, 3), 'burst': self.burst, 'keys': len(self._buckets), 'allowed': self.allowed, 'limited': self.limited}
+
+
+# ==========================================
+# SERVER-SIDE SESSIONS
+# ==========================================
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, data=None, sid=None, expires=0):
+        def on_update(self):
+            self.modified = True
+        super().__init__(data, on_update)
+        self.sid, self.expires, self.modified = sid, expires, False
+        self.owner = self.get('user_id')  # the id is replaced whenever this changes (login, logout)
+
+class ServerSessionInterface(SessionInterface):
+    """Session data stored under a random id; the cookie carries only the id.
+
+    `load(sid)` returns the stored (data, expires) of an unexpired session or None, and
+    `write(sid, data, expires)` stores it (data None deletes). Sessions live for the app's
+    PERMANENT_SESSION_LIFETIME since their last write; unmodified sessions are written again at most
+    every `touch` seconds to slide that window.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, load, write, touch=3600):
+        self.load, self.write, self.touch = load, write, touch
+
+    def loads(self, data):
+        return self.serializer.loads(data)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        found = self.load(sid) if sid else None
+        if found is None: return ServerSession()
+        return ServerSession(self.loads(found[0]), sid, found[1])
+
+    def save_session(self, app, session, response):
+        name, domain, path = self.get_cookie_name(app), self.get_cookie_domain(app), self.get_cookie_path(app)
+        secure, samesite, httponly = self.get_cookie_secure(app), self.get_cookie_samesite(app), self.get_cookie_httponly(app)
+        if session.sid or session: response.vary.add('Cookie')
+        if not session:
+            if session.sid:
+                self.write(session.sid, None, 0)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly)
+            return
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        # A new id on every change of user, so an id planted before login is worthless after it
+        rotate = session.sid is None or session.get('user_id') != session.owner
+        if not (rotate or session.modified or session.expires - time.time() < lifetime - self.touch): return
+        if rotate:
+            if session.sid: self.write(session.sid, None, 0)
+            session.sid = secrets.token_urlsafe(32)
+        self.write(session.sid, self.serializer.dumps(dict(session)), time.time() + lifetime)
+        if rotate or session.permanent:
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session), httponly=httponly,
+                                domain=domain, path=path, secure=secure, samesite=samesite)
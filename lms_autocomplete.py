@@ -0,0 +1,172 @@
+import re
+import sys
+import heapq
+import bisect
+import threading
+from array import array
+
+TOKEN_RE = re.compile(r'\w+')
+TOP_PREFIX_LEN = 3
+TOP_K = 10
+MAX_CANDIDATES = 1000
+SET_FILTER_MAX = 2000
+COMPACT_AFTER = 2048
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class Autocomplete:
+    """In-memory prefix index over course titles for the live search dropdown.
+
+    Terms are kept in one sorted list, so every term sharing a prefix is a contiguous
+    range found by bisection. Their posting lists (document numbers, ascending) are
+    concatenated into a single array('I') addressed through an offsets array, which keeps
+    the structure to a handful of flat objects instead of one Python object per trie node.
+    The newest TOP_K documents of every prefix up to TOP_PREFIX_LEN characters are
+    precomputed, so the first keystrokes are a single dict lookup.
+
+    Courses added after the build go to a small delta index and are folded in by
+    `compact()`. Title edits and deletions are not tracked; rebuild for those.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.ids, self.titles, self.categories = array('I'), [], []
+        self.terms, self.offsets, self.postings = [], array('I', [0]), array('I')
+        self.top = {}
+        self.delta, self.delta_terms = {}, []
+        self.last_id = 0
+
+    @classmethod
+    def from_rows(cls, rows):
+        index = cls()
+        index.build(rows)
+        return index
+
+    def build(self, rows):
+        """Index an iterable of (id, title, category) rows, ordered by id."""
+        ids, titles, categories, by_term = array('I'), [], [], {}
+        for course_id, title, category in rows:
+            doc = len(ids)
+            ids.append(course_id)
+            titles.append(title or '')
+            categories.append(sys.intern(category or ''))
+            for term in set(tokenize(title)):
+                by_term.setdefault(term, []).append(doc)
+        terms = sorted(by_term)
+        offsets, postings, top = array('I', [0]), array('I'), {}
+        for term in terms:
+            docs = by_term[term]
+            postings.extend(docs)
+            offsets.append(len(postings))
+            newest = docs[-TOP_K:]
+            for n in range(1, min(len(term), TOP_PREFIX_LEN) + 1):
+                top.setdefault(term[:n], []).extend(newest)
+        top = {prefix: array('I', heapq.nlargest(TOP_K, set(docs))) for prefix, docs in top.items()}
+        with self._lock:
+            self.ids, self.titles, self.categories = ids, titles, categories
+            self.terms, self.offsets, self.postings, self.top = terms, offsets, postings, top
+            self.delta, self.delta_terms = {}, []
+            self.last_id = ids[-1] if ids else 0
+
+    def add(self, course_id, title, category=None):
+        with self._lock:
+            doc = len(self.ids)
+            self.ids.append(course_id)
+            self.titles.append(title or '')
+            self.categories.append(sys.intern(category or ''))
+            self.last_id = max(self.last_id, course_id)
+            for term in set(tokenize(title)):
+                if term not in self.delta:
+                    bisect.insort(self.delta_terms, term)
+                    self.delta[term] = array('I')
+                self.delta[term].append(doc)
+                for n in range(1, min(len(term), TOP_PREFIX_LEN) + 1):
+                    docs = self.top.get(term[:n], array('I'))
+                    if doc not in docs:
+                        self.top[term[:n]] = array('I', [doc]) + docs[:TOP_K - 1]
+            pending = sum(len(d) for d in self.delta.values())
+        if pending > COMPACT_AFTER:
+            self.compact()
+
+    def compact(self):
+        with self._lock:
+            self.build(list(zip(self.ids, self.titles, self.categories)))
+
+    def sync(self, rows):
+        """Pick up courses inserted since the last build or sync, given as (id, title, category) rows after `last_id`."""
+        for course_id, title, category in rows:
+            self.add(course_id, title, category)
+
+    def _ranges(self, prefix):
+        # Posting lists (ascending doc numbers) of every term starting with `prefix`, as
+        # zero-copy views into the postings array plus any delta-index arrays
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + '\U0010ffff', lo)
+        view, offsets = memoryview(self.postings), self.offsets
+        lists = [view[offsets[i]:offsets[i + 1]] for i in range(lo, hi)]
+        lo = bisect.bisect_left(self.delta_terms, prefix)
+        hi = bisect.bisect_left(self.delta_terms, prefix + '\U0010ffff', lo)
+        lists.extend(self.delta[t] for t in self.delta_terms[lo:hi])
+        return lists
+
+    def search(self, q, limit=TOP_K):
+        """Return up to `limit` (id, title, category) matches, newest first, or None when unsure.
+
+        Every query word is treated as a prefix of some title word. None means the index
+        gave up (too many candidates to filter) and the caller should ask the database.
+        """
+        words = tokenize(q)[:8]
+        if not words: return []
+        with self._lock:
+            if len(words) == 1 and len(words[0]) <= TOP_PREFIX_LEN and limit <= TOP_K:
+                docs = list(self.top.get(words[0], ()))[:limit]
+            else:
+                docs = self._match(words, limit)
+            if docs is None: return None
+            return [(self.ids[d], self.titles[d], self.categories[d]) for d in docs]
+
+    def _match(self, words, limit):
+        # Walk the rarest word's postings newest-first. Other words are checked against a set of
+        # their postings when that is small enough, otherwise against the title text.
+        ranges = [self._ranges(w) for w in words]
+        counts = [sum(len(p) for p in r) for r in ranges]
+        driver = counts.index(min(counts))
+        sets, prefixes = [], []
+        for i, word in enumerate(words):
+            if i == driver: continue
+            if counts[i] <= SET_FILTER_MAX: sets.append(set().union(*ranges[i]))
+            else: prefixes.append(word)
+        postings = ranges[driver]
+        stream = reversed(postings[0]) if len(postings) == 1 else heapq.merge(*map(reversed, postings), reverse=True)
+        docs, seen, last = [], 0, None
+        for doc in stream:
+            if doc == last: continue
+            last = doc
+            seen += 1
+            if seen > MAX_CANDIDATES: return None
+            if sets and not all(doc in s for s in sets): continue
+            if prefixes:
+                title_words = tokenize(self.titles[doc])
+                if not all(any(t.startswith(w) for t in title_words) for w in prefixes): continue
+            docs.append(doc)
+            if len(docs) >= limit: break
+        return docs
+
+    def stats(self):
+        """Approximate memory footprint in bytes, per component."""
+        with self._lock:
+            strings = lambda items: sys.getsizeof(items) + sum(sys.getsizeof(s) for s in items)
+            sizes = {
+                'ids': sys.getsizeof(self.ids),
+                'titles': strings(self.titles),
+                'categories': sys.getsizeof(self.categories),  # category strings are interned
+                'terms': strings(self.terms),
+                'postings': sys.getsizeof(self.postings) + sys.getsizeof(self.offsets),
+                'top_prefixes': sys.getsizeof(self.top) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.top.items()),
+                'delta': sys.getsizeof(self.delta) + sum(sys.getsizeof(v) for v in self.delta.values()),
+            }
+            return {'courses': len(self.ids), 'terms': len(self.terms), 'delta_terms': len(self.delta_terms),
+                    'bytes': sizes, 'total_bytes': sum(sizes.values())}
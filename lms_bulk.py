@@ -0,0 +1,253 @@
+"""Bulk import and export of users, courses and enrollments as CSV or JSON Lines.
+
+    python lms_bulk.py import users learners.csv [--batch 1000] [--workers 4]
+    python lms_bulk.py import enrollments enrollments.jsonl
+    python lms_bulk.py export users -o users.csv [--with-password-hashes]
+
+Input is streamed in constant memory and committed in chunks; after each chunk the number of
+records done is written to a checkpoint file, so an interrupted import resumes where it stopped
+when run again with the same arguments. The database is the one lms_main uses (LMS_DB).
+"""
+import argparse
+import csv
+import json
+import os
+import secrets
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from werkzeug.security import generate_password_hash
+
+import lms_main as lms
+
+BATCH_SIZE = 1000
+
+USER_SQL = "INSERT INTO user (name, email, password) VALUES (:name, :email, :password) ON CONFLICT (email) DO NOTHING"
+COURSE_SQL = """
+    INSERT INTO course (id, title, description, type, category) VALUES (:id, :title, :description, :type, :category)
+    ON CONFLICT (id) DO NOTHING
+"""
+# Learners are matched by email so files from other systems need no knowledge of our user ids
+ENROLLMENT_SQL = """
+    INSERT INTO enrollment (user_id, course_id, status, progress, updated_at, enrolled_at, completed_at)
+    SELECT u.id, :course_id, :status, :progress, :updated_at, :updated_at, CASE WHEN :status = 'Completed' THEN :updated_at END FROM user u
+    WHERE u.email = :email AND EXISTS (SELECT 1 FROM course WHERE id = :course_id)
+    ON CONFLICT (user_id, course_id) DO NOTHING
+"""
+
+EXPORTS = {
+    'users': ("SELECT id, name, email FROM user ORDER BY id", ['id', 'name', 'email']),
+    'courses': ("SELECT id, title, description, type, category FROM course ORDER BY id", ['id', 'title', 'description', 'type', 'category']),
+    'enrollments': ("SELECT u.email, e.course_id, e.status, e.progress, e.updated_at FROM enrollment e JOIN user u ON u.id = e.user_id ORDER BY e.id",
+                    ['email', 'course_id', 'status', 'progress', 'updated_at']),
+}
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+# ==========================================
+# READING & WRITING
+# ==========================================
+
+def detect_format(path, fmt):
+    if fmt: return fmt
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+def read_records(f, fmt):
+    """Yield one dict per CSV row or JSON line, lazily."""
+    if fmt == 'csv':
+        yield from csv.DictReader(f)
+        return
+    for line in f:
+        if not line.strip(): continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None  # counted as invalid, like any other bad record
+
+def write_records(records, f, fmt, fields):
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+# ==========================================
+# ROW VALIDATION
+# ==========================================
+
+def text(record, key, required=False):
+    value = record.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value: raise InvalidRow(f"missing {key}")
+    return value or None
+
+def integer(record, key, default=None):
+    value = record.get(key)
+    if value in (None, ''): return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidRow(f"{key} must be an integer")
+
+def user_row(record):
+    email = lms.normalize_email(text(record, 'email', required=True))
+    if '@' not in email: raise InvalidRow(f"invalid email {email!r}")
+    # A ready-made werkzeug hash (e.g. from `export --with-password-hashes`) is kept as is; learners
+    # without any password get a random one and have to reset it.
+    return {'name': text(record, 'name') or email.split('@')[0], 'email': email,
+            'password': text(record, 'password_hash'), 'plain': text(record, 'password') or secrets.token_urlsafe(16)}
+
+def course_row(record):
+    return {'id': integer(record, 'id'), 'title': text(record, 'title', required=True), 'description': text(record, 'description'),
+            'type': text(record, 'type') or 'Video', 'category': text(record, 'category')}
+
+def enrollment_row(record):
+    progress = max(0, min(100, integer(record, 'progress', 0)))
+    return {'email': lms.normalize_email(text(record, 'email', required=True)), 'course_id': integer(record, 'course_id'),
+            'status': text(record, 'status') or ('Completed' if progress >= 100 else 'In Progress'), 'progress': progress,
+            'updated_at': text(record, 'updated_at') or time.strftime('%Y-%m-%d %H:%M:%S.000', time.gmtime())}
+
+IMPORTS = {'users': (user_row, USER_SQL), 'courses': (course_row, COURSE_SQL), 'enrollments': (enrollment_row, ENROLLMENT_SQL)}
+
+# ==========================================
+# IMPORT
+# ==========================================
+
+def load_checkpoint(path, kind, source):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    return state.get('done', 0) if (state.get('kind'), state.get('source')) == (kind, source) else 0
+
+def save_checkpoint(path, kind, source, done):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'kind': kind, 'source': source, 'done': done, 'saved_at': time.time()}, f)
+    os.replace(tmp, path)
+
+def hash_passwords(pool, workers, rows, hasher):
+    # generate_password_hash is deliberately slow, so it runs on every core
+    pending = [row for row in rows if not row['password']]
+    if pending:
+        chunksize = max(1, len(pending) // (workers * 4))
+        for row, hashed in zip(pending, pool.map(hasher, [row['plain'] for row in pending], chunksize=chunksize)):
+            row['password'] = hashed
+    for row in rows: del row['plain']
+
+def import_records(conn, kind, records, batch=BATCH_SIZE, skip=0, pool=None, workers=1, hasher=generate_password_hash,
+                   checkpoint=None, source=None, log=sys.stderr):
+    """Insert records in chunked transactions; returns (records read, rows inserted, invalid records)."""
+    parse, sql = IMPORTS[kind]
+    done, inserted, invalid, started = skip, 0, 0, time.perf_counter()
+    for chunk in chunked(islice(records, skip, None), batch):
+        rows = []
+        for n, record in enumerate(chunk, done + 1):
+            try:
+                if not isinstance(record, dict): raise InvalidRow('malformed record')
+                rows.append(parse(record))
+            except InvalidRow as e:
+                invalid += 1
+                if invalid <= 20: print(f"record {n}: {e}", file=log)
+        if kind == 'users': hash_passwords(pool, workers, rows, hasher)
+        if rows: inserted += conn.executemany(sql, rows).rowcount  # busy_timeout waits out concurrent app writes
+        conn.commit()
+        done += len(chunk)
+        if checkpoint: save_checkpoint(checkpoint, kind, source, done)
+        rate = (done - skip) / max(time.perf_counter() - started, 1e-9)
+        print(f"{kind}: {done:,} read, {inserted:,} inserted, {invalid:,} invalid ({rate:,.0f} records/s)", file=log)
+    if kind != 'users':
+        conn.executescript(lms.DEFAULT_CURRICULUM_SQL)  # lessons for new courses, bitmaps for imported progress
+    return done, inserted, invalid
+
+def run_import(args):
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    fmt = detect_format(args.path, args.format)
+    source = os.path.abspath(args.path) if args.path != '-' else '-'
+    checkpoint = args.checkpoint or (None if args.path == '-' else args.path + '.checkpoint')
+    skip = 0 if args.restart or not checkpoint else load_checkpoint(checkpoint, args.kind, source)
+    if skip: print(f"resuming after {skip:,} records (checkpoint {checkpoint})", file=sys.stderr)
+    f = sys.stdin if args.path == '-' else open(args.path, newline='', encoding='utf-8-sig')
+    hasher = partial(generate_password_hash, method=args.hash_method or lms.PASSWORD_METHOD)
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            done, inserted, invalid = import_records(conn, args.kind, read_records(f, fmt), args.batch, skip, pool, args.workers, hasher,
+                                                     checkpoint, source)
+    finally:
+        if f is not sys.stdin: f.close()
+    if checkpoint and os.path.exists(checkpoint): os.remove(checkpoint)
+    print(f"done: {done:,} records, {inserted:,} inserted, {done - skip - inserted - invalid:,} skipped (duplicates or unknown users/courses), {invalid:,} invalid",
+          file=sys.stderr)
+    return 1 if invalid else 0
+
+# ==========================================
+# EXPORT
+# ==========================================
+
+def export_records(conn, kind, with_password_hashes=False):
+    """Yield dicts for every row of `kind`, straight off the cursor."""
+    sql, fields = EXPORTS[kind]
+    if kind == 'users' and with_password_hashes:
+        sql = sql.replace('email FROM', 'email, password AS password_hash FROM')
+    cursor = conn.execute(sql)
+    cursor.arraysize = BATCH_SIZE
+    while rows := cursor.fetchmany():
+        for row in rows: yield dict(row)
+
+def run_export(args):
+    conn = lms.connect_db()
+    lms.migrate_db(conn)
+    fields = EXPORTS[args.kind][1] + (['password_hash'] if args.kind == 'users' and args.with_password_hashes else [])
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        count = write_records(export_records(conn, args.kind, args.with_password_hashes), out, detect_format(args.output, args.format), fields)
+    finally:
+        if out is not sys.stdout: out.close()
+    print(f"exported {count:,} {args.kind}", file=sys.stderr)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    imp = commands.add_parser('import', help='stream records from a CSV/JSONL file ("-" for stdin) into the database')
+    imp.add_argument('kind', choices=sorted(IMPORTS))
+    imp.add_argument('path')
+    imp.add_argument('--format', choices=['csv', 'jsonl'], help='default: from the file extension, else csv')
+    imp.add_argument('--batch', type=int, default=BATCH_SIZE, help='records per transaction')
+    imp.add_argument('--workers', type=int, default=os.cpu_count(), help='password hashing processes')
+    imp.add_argument('--hash-method', help='werkzeug hash method, e.g. pbkdf2:sha256 (default: LMS_PASSWORD_METHOD)')
+    imp.add_argument('--checkpoint', help='checkpoint file (default: <path>.checkpoint)')
+    imp.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    imp.set_defaults(run=run_import)
+    exp = commands.add_parser('export', help='stream records from the database to a CSV/JSONL file')
+    exp.add_argument('kind', choices=sorted(EXPORTS))
+    exp.add_argument('-o', '--output', default='-')
+    exp.add_argument('--format', choices=['csv', 'jsonl'])
+    exp.add_argument('--with-password-hashes', action='store_true', help='include users\' password hashes, for migrating between databases')
+    exp.set_defaults(run=run_export)
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Durable background jobs: a queue table in the app database and worker threads that drain it.
+
+A job is a row holding a kind and a JSON payload, added by `enqueue` in the caller's transaction, so
+it exists exactly when the change that asked for it was committed. A worker claims the oldest
+visible job by moving its visibility `visibility` seconds ahead and counting the attempt, runs the
+handler registered for its kind on the same connection, and deletes the job in the handler's
+transaction: whatever the handler writes, jobs it enqueues included, commits once. A worker that
+dies mid-job leaves it to reappear when its visibility runs out. Failures are retried with
+exponential backoff and after `max_attempts` kept with state 'dead' for inspection. Effects outside
+the database (mail, files) happen at least once.
+
+The queries live in lms_store (enqueue_job, claim_job, ...), so the queue works on either backend.
+"""
+import json
+import logging
+import os
+import signal
+import threading
+import time
+
+log = logging.getLogger('lms.jobs')
+
+
+class JobQueue:
+    """Handlers by job kind, and the claim/run/settle cycle; `checkout()` yields a store on a connection of its own."""
+
+    def __init__(self, checkout, visibility=60, max_attempts=5, backoff=2.0, max_backoff=600, on_finish=None):
+        self.checkout, self.visibility, self.max_attempts = checkout, visibility, max_attempts
+        self.backoff, self.max_backoff = backoff, max_backoff
+        self.on_finish = on_finish  # (kind, outcome, run seconds, seconds since enqueue) after every attempt
+        self.handlers = {}
+        self._wake = threading.Event()
+
+    def handler(self, kind):
+        """Decorator registering fn(store, payload) for jobs of `kind`; it must not commit."""
+        def register(fn):
+            self.handlers[kind] = fn
+            return fn
+        return register
+
+    def enqueue(self, store, kind, payload, delay=0):
+        """Add a job in the store's current transaction: one insert, visible once the caller commits."""
+        now = time.time()
+        store.enqueue_job(kind, json.dumps(payload), now + delay, now)
+
+    def notify(self):
+        """Wake this process's idle workers, e.g. right after committing new jobs."""
+        self._wake.set()
+
+    def wait(self, timeout):
+        if self._wake.wait(timeout): self._wake.clear()
+
+    def work_one(self):
+        """Claim and run one job; False when none was visible."""
+        with self.checkout() as store:
+            now = time.time()
+            if not store.job_ready(now): return False  # a read, so idle polling never takes the write lock
+            job = store.claim_job(now + self.visibility, now)
+            store.commit()
+            if job is None: return False  # another worker got there first
+            kind, started = job['kind'], time.monotonic()
+            try:
+                handler = self.handlers.get(kind)
+                if handler is None: raise LookupError(f"no handler for job kind {kind!r}")
+                handler(store, json.loads(job['payload']))
+                store.finish_job(job['id'], job['attempts'])
+                store.commit()
+                outcome = 'done'
+            except Exception as e:
+                store.rollback()
+                error = f"{type(e).__name__}: {e}"
+                if job['attempts'] >= self.max_attempts:
+                    store.bury_job(job['id'], job['attempts'], error)
+                    outcome = 'dead'
+                    log.error('job %s (%s) failed %d times, giving up: %s', job['id'], kind, job['attempts'], error)
+                else:
+                    delay = min(self.max_backoff, self.backoff * 2 ** (job['attempts'] - 1))
+                    store.retry_job(job['id'], job['attempts'], time.time() + delay, error)
+                    outcome = 'retry'
+                    log.warning('job %s (%s) attempt %d failed, retrying in %gs: %s', job['id'], kind, job['attempts'], delay, error)
+                store.commit()
+            if self.on_finish: self.on_finish(kind, outcome, time.monotonic() - started, time.time() - job['created_at'])
+        return True
+
+
+class Workers:
+    """`threads` threads draining a JobQueue in this process; started lazily so forked processes get their own."""
+
+    def __init__(self, queue, threads=1, poll=1.0):
+        self.queue, self.threads, self.poll = queue, threads, poll
+        self._lock = threading.Lock()
+        self._pid, self._threads, self._stop = None, [], threading.Event()
+
+    def ensure_started(self):
+        if not self.threads or self._pid == os.getpid(): return
+        with self._lock:
+            if self._pid == os.getpid(): return
+            self._stop = threading.Event()
+            self._threads = [threading.Thread(target=self._run, name=f'lms-jobs-{i}', daemon=True) for i in range(self.threads)]
+            for t in self._threads: t.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                busy = self.queue.work_one()
+            except Exception:
+                log.exception('job worker error')
+                busy = False
+            if not busy: self.queue.wait(self.poll)
+
+    def stop(self, timeout=30):
+        """Finish the jobs in hand and stop claiming new ones."""
+        if self._pid != os.getpid(): return
+        self._stop.set()
+        self.queue.notify()
+        for t in self._threads: t.join(timeout)
+        self._pid = None
+
+def run_pool(queue, processes=1, threads=1, poll=1.0):
+    """Drain the queue with `processes` forked processes of `threads` threads each until SIGTERM or SIGINT."""
+    def serve():
+        workers = Workers(queue, threads, poll)
+        stopped = threading.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT): signal.signal(sig, lambda signum, frame: stopped.set())
+        workers.ensure_started()
+        stopped.wait()
+        workers.stop()
+
+    if processes <= 1: return serve()
+    children = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                serve()
+            except BaseException:
+                log.exception('job process %d crashed', os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        children.append(pid)
+    forward = lambda signum, frame: [os.kill(pid, signal.SIGTERM) for pid in children]
+    for sig in (signal.SIGTERM, signal.SIGINT): signal.signal(sig, forward)
+    for pid in children: os.waitpid(pid, 0)
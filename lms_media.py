@@ -0,0 +1,156 @@
+"""Lesson videos on local disk: resumable chunked uploads, byte-range reads and cached posters.
+
+Under the media root, a video is uploads/<id>.part while it is being received, videos/<id><ext>
+once complete, and its poster is posters/<id>.jpg or .svg. The offset of an upload is the size of
+its .part file: every chunk is copied from the request stream straight into the file at the offset
+the client names, so nothing is buffered whole and a client whose connection dropped asks for the
+offset and carries on from there. A finished video never changes (a replacement is a new upload
+with a new id), so it can be served with strong validators and cached for as long as browsers like.
+
+FileRange reads only the requested bytes, with pread, and lms_serve sends it with sendfile(2)
+instead, from the page cache to the socket without copying through Python. Posters are a frame
+grabbed by ffmpeg when it is installed, else an SVG title card; either is made once per video.
+"""
+import fcntl
+import html
+import logging
+import os
+import shutil
+import subprocess
+import threading
+
+log = logging.getLogger('lms.media')
+
+BLOCK = 256 * 1024
+VIDEO_TYPES = {'.mp4': 'video/mp4', '.m4v': 'video/mp4', '.webm': 'video/webm', '.ogv': 'video/ogg'}
+# Container signatures: (offset, bytes) that a file of each type starts with
+MAGIC = {'.mp4': (4, b'ftyp'), '.m4v': (4, b'ftyp'), '.webm': (0, b'\x1aE\xdf\xa3'), '.ogv': (0, b'OggS')}
+FFMPEG = shutil.which('ffmpeg')
+
+
+class OffsetMismatch(Exception):
+    """A chunk does not start where the upload stands; `offset` is where it does."""
+
+    def __init__(self, offset):
+        super().__init__(f'upload is at byte {offset}')
+        self.offset = offset
+
+
+class UploadBusy(Exception):
+    """Another request is appending to the same upload."""
+
+
+class MediaStore:
+    def __init__(self, root):
+        self.root = root
+
+    def part_path(self, video_id):
+        return os.path.join(self.root, 'uploads', f'{video_id}.part')
+
+    def video_path(self, video_id, ext):
+        return os.path.join(self.root, 'videos', f'{video_id}{ext}')
+
+    def poster_path(self, video_id):
+        """The cached poster of a video, or None before it is made."""
+        for ext in ('.jpg', '.svg'):
+            path = os.path.join(self.root, 'posters', f'{video_id}{ext}')
+            if os.path.exists(path): return path
+        return None
+
+    def start(self, video_id):
+        os.makedirs(os.path.dirname(self.part_path(video_id)), exist_ok=True)
+        open(self.part_path(video_id), 'wb').close()
+
+    def offset(self, video_id):
+        """Bytes received so far, or None when the upload is not in progress."""
+        try:
+            return os.path.getsize(self.part_path(video_id))
+        except FileNotFoundError:
+            return None
+
+    def append(self, video_id, offset, stream, length):
+        """Copy `length` bytes of `stream` into the upload at `offset` and return the new offset.
+
+        What arrived before a dropped connection is kept, so the next chunk resumes after it.
+        """
+        with open(self.part_path(video_id), 'r+b') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)  # released when the file is closed
+            except BlockingIOError:
+                raise UploadBusy() from None
+            current = os.fstat(f.fileno()).st_size
+            if current != offset: raise OffsetMismatch(current)
+            f.seek(offset)
+            while length:
+                chunk = stream.read(min(BLOCK, length))
+                if not chunk: break
+                f.write(chunk)
+                length -= len(chunk)
+            f.flush()
+            return f.tell()
+
+    def finish(self, video_id, ext):
+        """Move a complete upload into place; False (and the upload discarded) when it is not a video of type `ext`."""
+        part = self.part_path(video_id)
+        with open(part, 'rb') as f:
+            start, magic = MAGIC[ext]
+            ok = f.read(start + len(magic))[start:] == magic
+            if ok: os.fsync(f.fileno())
+        if not ok:
+            os.remove(part)
+            return False
+        os.makedirs(os.path.dirname(self.video_path(video_id, ext)), exist_ok=True)
+        os.replace(part, self.video_path(video_id, ext))
+        return True
+
+    def make_poster(self, video_id, video, title, subtitle):
+        """Write the poster of a video, a frame of it with ffmpeg or else a title card, and return its path."""
+        base = os.path.join(self.root, 'posters', str(video_id))
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        tmp = f"{base}.{os.getpid()}.{threading.get_ident()}.tmp"
+        # A second in, past any fade from black; the first frame for clips shorter than that
+        for seek in ('1', '0') if FFMPEG else ():
+            try:
+                subprocess.run([FFMPEG, '-nostdin', '-loglevel', 'error', '-y', '-ss', seek, '-i', video, '-frames:v', '1',
+                                '-vf', 'scale=640:-2', '-q:v', '4', '-f', 'image2', tmp], check=True, timeout=60)
+                if os.path.getsize(tmp):
+                    os.replace(tmp, base + '.jpg')  # atomic, so concurrent renders of the same poster are harmless
+                    return base + '.jpg'
+            except (OSError, subprocess.SubprocessError) as e:
+                log.warning('ffmpeg could not grab a frame of %s: %s', video, e)
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(title_card(title, subtitle))
+        os.replace(tmp, base + '.svg')
+        return base + '.svg'
+
+
+def title_card(title, subtitle):
+    """A 16:9 SVG poster naming the lesson, for when no frame can be grabbed."""
+    title = html.escape(title if len(title) <= 48 else title[:47] + '…')
+    subtitle = html.escape(subtitle if len(subtitle) <= 64 else subtitle[:63] + '…')
+    return f"""<svg xmlns="http://www.w3.org/2000/svg" width="1280" height="720" viewBox="0 0 1280 720">
+<defs><linearGradient id="g" x1="0" y1="0" x2="1" y2="1"><stop offset="0" stop-color="#1e1b4b"/><stop offset="1" stop-color="#4338ca"/></linearGradient></defs>
+<rect width="1280" height="720" fill="url(#g)"/>
+<circle cx="640" cy="300" r="72" fill="#ffffff" fill-opacity="0.15"/><path d="M615 260v80l70-40z" fill="#ffffff"/>
+<text x="640" y="470" fill="#ffffff" font-family="Helvetica, Arial, sans-serif" font-size="48" font-weight="700" text-anchor="middle">{title}</text>
+<text x="640" y="530" fill="#c7d2fe" font-family="Helvetica, Arial, sans-serif" font-size="28" text-anchor="middle">{subtitle}</text>
+</svg>
+"""
+
+
+class FileRange:
+    """`length` bytes of an open file from `start`, as a WSGI body that closes the file when done."""
+
+    def __init__(self, file, start, length):
+        self.file, self.start, self.length = file, start, length
+
+    def __iter__(self):
+        fd, pos, end = self.file.fileno(), self.start, self.start + self.length
+        while pos < end:
+            data = os.pread(fd, min(BLOCK, end - pos), pos)
+            if not data: break
+            pos += len(data)
+            yield data
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,229 @@
+import re
+import time
+import sqlite3
+import threading
+from contextvars import ContextVar
+
+# Per-request profiling of SQL and template time plus a small Prometheus registry.
+# Nothing here knows about Flask; lms_main wires it into the request cycle.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_STATEMENTS = 200  # detailed statements kept per request; counts and totals are always exact
+
+current_profile = ContextVar('lms_profile', default=None)
+
+
+# ==========================================
+# SQL NORMALIZATION
+# ==========================================
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_normalized = {}
+
+def normalize_sql(sql):
+    """Statement text with literals replaced and whitespace collapsed, so equal queries aggregate."""
+    text = _normalized.get(sql)
+    if text is None:
+        text = ' '.join(_PLACEHOLDER_LISTS.sub('(?, ...)', _LITERALS.sub('?', sql)).split())
+        if len(_normalized) < 4096: _normalized[sql] = text
+    return text
+
+
+# ==========================================
+# REQUEST PROFILE
+# ==========================================
+
+class Statement:
+    __slots__ = ('sql', 'duration', 'rows')
+
+    def __init__(self, sql, duration, rows):
+        self.sql, self.duration, self.rows = sql, duration, rows
+
+class RequestProfile:
+    """Time spent in the database and in templates during one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_started = None
+        self.statements = []
+        self.finished = False
+
+    def statement(self, sql, duration, rows):
+        self.queries += 1
+        self.db_time += duration
+        if len(self.statements) < MAX_STATEMENTS:
+            stmt = Statement(sql, duration, rows)
+            self.statements.append(stmt)
+            return stmt
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        return (f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+                f'tpl;dur={self.template_time * 1000:.2f}, total;dur={total * 1000:.2f}')
+
+    def slowest(self, n=5):
+        return sorted(self.statements, key=lambda s: s.duration, reverse=True)[:n]
+
+
+# ==========================================
+# INSTRUMENTED CONNECTION
+# ==========================================
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times execute and fetches against the statement record of the current request, if any."""
+
+    _stmt = None
+
+    def execute(self, sql, parameters=()):
+        profile = current_profile.get()
+        if profile is None: return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._stmt = profile.statement(sql, time.perf_counter() - start, max(self.rowcount, 0))
+
+    def executemany(self, sql, seq_of_parameters):
+        profile = current_profile.get()
+        if profile is None: return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._stmt = profile.statement(sql, time.perf_counter() - start, max(self.rowcount, 0))
+
+    def _fetched(self, start, rows):
+        # Rows of a SELECT are produced while fetching, so that time belongs to the statement too
+        profile, stmt, elapsed = current_profile.get(), self._stmt, time.perf_counter() - start
+        if profile is not None: profile.db_time += elapsed
+        if stmt is not None:
+            stmt.duration += elapsed
+            stmt.rows += rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()  # StopIteration ends the loop without being counted
+        self._fetched(start, 1)
+        return row
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# ==========================================
+# PROMETHEUS REGISTRY
+# ==========================================
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values):
+    return ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{{{_labels(self.labels, labels)}}} {value:g}' if labels else f'{self.name} {value:g}')
+        return lines
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._values = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None: series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[-2] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._values.items())
+        for labels, series in items:
+            base = _labels(self.labels, labels)
+            sep = ',' if base else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {series[-1]:.6f}' if base else f'{self.name}_sum {series[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{base}}} {cumulative}' if base else f'{self.name}_count {cumulative}')
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []  # callables returning [(name, help, type, value)] of unlabelled gauges at scrape time
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def expose(self):
+        lines = []
+        for metric in self.metrics: lines.extend(metric.expose())
+        for collect in self.collectors:
+            for name, help, kind, value in collect():
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}', f'{name} {value:g}']
+        return '\n'.join(lines) + '\n'
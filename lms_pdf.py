@@ -0,0 +1,100 @@
+import zlib
+
+# Minimal single-page PDF writer for certificates. It only uses the standard Helvetica fonts,
+# which every viewer ships, so nothing is embedded and no third-party library is needed.
+
+MM = 72 / 25.4
+A4_LANDSCAPE = (297, 210)  # mm
+
+# Advance widths (1/1000 em) of printable ASCII, from the Adobe core font metrics
+HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+FONTS = {'F1': ('Helvetica', HELVETICA), 'F2': ('Helvetica-Bold', HELVETICA_BOLD)}
+
+
+def text_width(text, font, size):
+    widths = FONTS[font][1]
+    return sum(widths[ord(ch) - 32] if 32 <= ord(ch) < 127 else 556 for ch in text) * size / 1000
+
+
+def pdf_string(text):
+    raw = text.encode('cp1252', 'replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class Page:
+    """Drawing commands for one page, in millimetres from the top-left corner like jsPDF."""
+
+    def __init__(self, size=A4_LANDSCAPE):
+        self.width, self.height = size
+        self.ops = []
+
+    def rect(self, x, y, w, h, line_width=0.5, color=(0, 0, 0)):
+        r, g, b = (c / 255 for c in color)
+        self.ops.append(f"{r:.3f} {g:.3f} {b:.3f} RG {line_width * MM:.2f} w "
+                        f"{x * MM:.2f} {(self.height - y - h) * MM:.2f} {w * MM:.2f} {h * MM:.2f} re S".encode())
+
+    def text(self, text, x, y, size=12, bold=False, color=(0, 0, 0), align='left'):
+        font = 'F2' if bold else 'F1'
+        width = text_width(text, font, size) / MM
+        if align == 'center': x -= width / 2
+        elif align == 'right': x -= width
+        r, g, b = (c / 255 for c in color)
+        self.ops.append(f"BT /{font} {size} Tf {r:.3f} {g:.3f} {b:.3f} rg {x * MM:.2f} {(self.height - y) * MM:.2f} Td ".encode()
+                        + pdf_string(text) + b" Tj ET")
+
+    def render(self, info=None):
+        """Serialize to PDF bytes. Output is deterministic for the same drawing and info."""
+        content = zlib.compress(b'\n'.join(self.ops), 9)
+        fonts = b' '.join(b'/%s %d 0 R' % (name.encode(), 5 + i) for i, name in enumerate(FONTS))
+        objects = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Resources << /Font << %s >> >> /Contents 4 0 R >>'
+            % (self.width * MM, self.height * MM, fonts),
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(content), content),
+        ]
+        objects += [b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % base.encode()
+                    for base, _ in FONTS.values()]
+        objects.append(b'<< ' + b' '.join(b'/%s %s' % (k.encode(), pdf_string(v)) for k, v in (info or {}).items()) + b' >>')
+        out, offsets = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'), []
+        for number, body in enumerate(objects, 1):
+            offsets.append(len(out))
+            out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        xref = len(out)
+        out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+        out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+        out += b'trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, len(objects), xref)
+        return bytes(out)
+
+
+def certificate_pdf(name, course, cert_id, date, verify_url=None):
+    """The certificate layout previously drawn client-side with jsPDF."""
+    indigo, grey = (79, 70, 229), (100, 100, 100)
+    page = Page()
+    page.rect(10, 10, 277, 190, 1.5, indigo)
+    page.rect(12, 12, 273, 186, 0.5, indigo)
+    page.text('ATHENA LMS', 148.5, 40, 24, bold=True, color=indigo, align='center')
+    page.text('Certificate of Completion', 148.5, 70, 35, bold=True, align='center')
+    page.text('This is to certify that', 148.5, 90, 16, align='center')
+    page.text(name, 148.5, 110, 28, bold=True, align='center')
+    page.text('has successfully completed the course', 148.5, 130, 16, align='center')
+    page.text(course, 148.5, 150, 22, color=indigo, align='center')
+    page.text(f'Certificate ID: {cert_id}', 20, 185, 12, color=grey)
+    page.text(f'Issued Date: {date}', 277, 185, 12, color=grey, align='right')
+    if verify_url: page.text(f'Verify at {verify_url}', 148.5, 193, 9, color=grey, align='center')
+    return page.render({'Title': f'{course} - Certificate of Completion', 'Author': 'Athena LMS', 'Subject': cert_id})
@@ -0,0 +1,85 @@
+"""Course recommendations from co-enrollment: learners who took this course also took those.
+
+The enrollments are a sparse learner x course matrix A; two courses are similar by the cosine of
+their columns, co(a, b) / sqrt(n(a) * n(b)), where co counts the learners enrolled in both and n
+the learners of each. build() computes A^T A one row at a time, so memory stays proportional to
+the enrollments rather than to the course pairs: the row of course a is a Counter over the course
+lists of a's learners, filled in C by chain.from_iterable, and only its top k survive.
+
+The neighbours are precomputed into course_similar (course, rank, similar course, score), so a
+learner's suggestions are one indexed query: the neighbours of their courses, summed by score,
+minus what they already take. Rebuilding everything is a batch job, `flask recommend-build`; in
+between, refresh() recomputes one course whose learners changed from those learners' enrollments
+alone, and re-ranks it in the lists of the courses it shares learners with.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import chain, groupby
+from operator import itemgetter
+
+
+def baskets(rows, max_courses, sizes=None):
+    """Tuples of the courses of each learner, from (user_id, course_id) rows ordered by user_id.
+
+    A learner with one course co-occurs with nothing and one enrolled in more than `max_courses`
+    says little about which courses belong together while costing max_courses^2 pairs; both are
+    left out, though they still count in `sizes` (a Counter of learners per course) when given.
+    """
+    for _, group in groupby(rows, itemgetter(0)):
+        courses = tuple(map(itemgetter(1), group))
+        if sizes is not None: sizes.update(courses)
+        if 1 < len(courses) <= max_courses: yield courses
+
+
+def ranked(scores, k):
+    """The `k` best of {course_id: score} as (rank, course_id, score), ties to the lower id."""
+    best = heapq.nlargest(k, ((score, -other) for other, score in scores.items()))
+    return [(rank, -other, score) for rank, (score, other) in enumerate(best)]
+
+
+def co_counts(course, found):
+    """Counter of the learners `course` shares with each other course, from the baskets `found` it is in: its row of A^T A."""
+    co = Counter(chain.from_iterable(found))
+    del co[course]
+    return co
+
+
+def similarities(course, co, sizes, min_common):
+    """{other course: cosine} for the courses of `co` sharing at least `min_common` learners with `course`."""
+    return {other: round(n / math.sqrt(sizes[course] * sizes[other]), 6) for other, n in co.items() if n >= min_common}
+
+
+def build(rows, k, min_common=2, max_courses=100):
+    """The top `k` neighbours of every course as (course_id, rank, similar_id, score) rows.
+
+    Pairs with fewer than `min_common` shared learners are ignored: one learner in common makes
+    two small courses look identical.
+    """
+    learners, sizes = defaultdict(list), Counter()  # course -> the baskets it is in: the columns of A
+    for basket in baskets(rows, max_courses, sizes):
+        for course in basket: learners[course].append(basket)
+    out = []
+    for course, found in learners.items():
+        scores = similarities(course, co_counts(course, found), sizes, min_common)
+        out.extend((course, *row) for row in ranked(scores, k))
+    return out
+
+
+def refresh(course, rows, sizes, lists, k, min_common=2, max_courses=100):
+    """The neighbour lists to store after the learners of `course` changed, as {course_id: [(rank, similar_id, score)]}.
+
+    `rows` are the (user_id, course_id) enrollments of the learners of `course`, ordered by user;
+    `sizes` the learners of every course in them; `lists` the stored {course_id: [(similar_id,
+    score)]} of those courses. Every score involving `course` is recomputed: its own list in full,
+    and its entry in the list of each course it shares learners with, where it is re-ranked among
+    the other entries as stored. Only those pair scores change when learners join `course`.
+    """
+    co = co_counts(course, baskets(rows, max_courses))
+    scores = similarities(course, co, sizes, min_common)
+    out = {course: ranked(scores, k)}
+    for other in co:
+        entries = {similar: score for similar, score in lists.get(other, ()) if similar != course}
+        if other in scores: entries[course] = scores[other]
+        out[other] = ranked(entries, k)
+    return out
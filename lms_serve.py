@@ -0,0 +1,204 @@
+"""Production server: a pre-forking master with a fixed thread pool in every worker process.
+
+    python lms_serve.py [--host 0.0.0.0] [--port 8000] [--workers 4] [--threads 8]
+
+The master applies pending migrations (existing data is never touched), compiles every
+template and then forks the workers, so the loaded app is shared copy-on-write. Workers
+accept on one shared socket. SIGTERM or SIGINT stops the server gracefully: workers stop
+accepting, finish in-flight requests and flush buffered writes, and any worker still busy
+after --graceful-timeout is killed. Workers that die unexpectedly are replaced. Lesson videos
+(lms_media.FileRange bodies) are sent with sendfile(2), page cache to socket, unless --no-sendfile.
+
+For gunicorn or uWSGI, point them at lms_main:app with preloading enabled and run
+`flask --app lms_main migrate` before starting.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+import lms_main as lms
+import lms_media
+
+log = logging.getLogger('lms.serve')
+
+
+class RequestHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = 5  # idle keep-alive connections are closed after this, so they cannot pin pool threads
+    access_log = False
+
+    sendfile = True
+
+    def log_request(self, code='-', size='-'):
+        if self.access_log: super().log_request(code, size)
+
+    def make_environ(self):
+        environ = super().make_environ()
+        if self.sendfile: environ['lms.socket'] = self.connection
+        return environ
+
+
+def zero_copy(app):
+    """Send lms_media.FileRange bodies with sendfile(2): Werkzeug writes the headers, the kernel copies the bytes."""
+    def application(environ, start_response):
+        write = None
+
+        def start(status, headers, exc_info=None):
+            nonlocal write
+            write = start_response(status, headers, exc_info)
+            return write
+
+        body = app(environ, start)
+        sock = environ.get('lms.socket')
+        if sock is None or not isinstance(body, lms_media.FileRange) or not body.length: return body
+        try:
+            write(b'')  # status line and headers
+            sock.sendfile(body.file, body.start, body.length)
+        finally:
+            body.close()
+        return []
+    return application
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug's server with requests handed to a bounded thread pool instead of a thread each."""
+
+    multithread = True
+
+    def __init__(self, app, fd, threads, handler):
+        super().__init__('127.0.0.1', 0, app, handler=handler, fd=fd)
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='lms-request')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self):
+        self.executor.shutdown(wait=True)
+
+
+# ==========================================
+# WORKER
+# ==========================================
+
+def run_worker(sock, args):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the master turns ^C into SIGTERM for everyone
+    lms.password_hasher.start()  # fork the hashing processes before this worker has threads
+    server = PooledWSGIServer(zero_copy(lms.app), sock.fileno(), args.threads, RequestHandler)
+    stop = lambda signum, frame: threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        server.drain()
+        lms.job_workers.stop()
+        lms.NOTE_BUFFER.flush()
+        lms.password_hasher.shutdown()
+
+
+# ==========================================
+# MASTER
+# ==========================================
+
+class Master:
+    def __init__(self, sock, args):
+        self.sock, self.args = sock, args
+        self.workers = {}  # pid -> start time
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.sock, self.args)
+            except BaseException:
+                log.exception('worker %d crashed', os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+
+    def stop(self, signum=None, frame=None):
+        if not self.stopping: log.info('shutting down %d workers (signal %s)', len(self.workers), signum)
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.args.workers): self.spawn()
+        log.info('listening on http://%s:%d with %d workers x %d threads (master pid %d)',
+                 *self.sock.getsockname()[:2], self.args.workers, self.args.threads, os.getpid())
+        deadline = None
+        while self.workers:
+            if self.stopping and deadline is None: deadline = time.monotonic() + self.args.graceful_timeout
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                if deadline and time.monotonic() > deadline:
+                    log.warning('killing %d workers still busy after %ss', len(self.workers), self.args.graceful_timeout)
+                    for pid in self.workers: os.kill(pid, signal.SIGKILL)
+                    deadline = float('inf')
+                time.sleep(0.1)
+                continue
+            started = self.workers.pop(pid, None)
+            if self.stopping or started is None: continue
+            log.warning('worker %d exited with status %d; replacing it', pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < 1: time.sleep(1)  # don't spin on a worker that dies at startup
+            self.spawn()
+        self.sock.close()
+        log.info('stopped')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes (default: CPU count)')
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker')
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--graceful-timeout', type=float, default=30, help='seconds in-flight requests get to finish on shutdown')
+    parser.add_argument('--keep-alive', type=float, default=5, help='idle keep-alive timeout in seconds; 0 closes after every response')
+    parser.add_argument('--access-log', action='store_true')
+    parser.add_argument('--no-sendfile', action='store_true', help='send lesson videos through Python instead of sendfile(2)')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+
+    lms.init_db()
+    lms.preload_templates()
+    lms.db_pool.size = max(lms.db_pool.size, args.threads)  # every request thread can hold a connection
+    RequestHandler.access_log, RequestHandler.sendfile = args.access_log, not args.no_sendfile
+    if args.keep_alive > 0: RequestHandler.timeout = args.keep_alive
+    else: RequestHandler.protocol_version = 'HTTP/1.0'
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    sock.set_inheritable(True)
+    gc.collect()
+    gc.freeze()  # keep the preloaded heap out of later collections so its pages stay shared
+    Master(sock, args).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,900 @@
+"""Data access for the routes: every query they run, behind one interface with SQLite and PostgreSQL dialects.
+
+A store wraps one connection checked out of its backend's pool for the length of a request. The
+methods are the same for both backends and return rows addressable by column name; only the SQL
+text and a few dialect hooks differ. Schema migrations stay with each backend: lms_main's
+MIGRATIONS for SQLite, POSTGRES_SCHEMA here for PostgreSQL.
+
+PostgreSQL needs `pip install "psycopg[binary]" psycopg_pool` and is selected in lms_main by
+LMS_DATABASE_URL=postgresql://...
+"""
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from operator import itemgetter
+
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool as PsycopgPool
+except ImportError:  # PostgreSQL support is optional
+    psycopg = None
+
+
+class Store(ABC):
+    """The queries of the app, run on one connection; subclasses supply `SQL` and the dialect hooks."""
+
+    SQL = {}
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, name, params=()):
+        return self.conn.execute(self.SQL[name], params)
+
+    def one(self, name, params=()):
+        return self.execute(name, params).fetchone()
+
+    def all(self, name, params=()):
+        return self.execute(name, params).fetchall()
+
+    def run(self, name, params=()):
+        return self.execute(name, params).rowcount
+
+    def run_many(self, name, seq):
+        if seq: self.conn.executemany(self.SQL[name], seq)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    # Dialect hooks
+    @abstractmethod
+    def match(self, terms):
+        """Full-text expression matching every term as a prefix."""
+
+    @abstractmethod
+    def id_list(self, ids):
+        """A list of ids as one bound parameter."""
+
+    # Users
+    def user_by_email(self, email):
+        return self.one('user_by_email', (email,))
+
+    def create_user(self, name, email, password_hash):
+        self.run('create_user', (name, email, password_hash))
+
+    def update_password(self, uid, password_hash):
+        self.run('update_password', (password_hash, uid))
+
+    # Server-side sessions (lms_auth.ServerSessionInterface)
+    def session(self, sid, now):
+        return self.one('session', (sid, now))
+
+    def save_session(self, sid, data, expires):
+        self.run('save_session', (sid, data, expires))
+
+    def delete_session(self, sid):
+        self.run('delete_session', (sid,))
+
+    def purge_sessions(self, now):
+        return self.run('purge_sessions', (now,))
+
+    # Enrollments
+    def user_stats(self, uid):
+        row = self.one('user_stats', (uid,))
+        return {'in_progress': row['in_progress'] if row else 0, 'completed': row['completed'] if row else 0}
+
+    def recent_enrollments(self, uid, limit=4):
+        return self.all('recent_enrollments', (uid, limit))
+
+    def enrollments(self, uid):
+        return self.all('enrollments', (uid,))
+
+    def course_enrollment(self, uid, course_id):
+        return self.one('course_enrollment', (uid, course_id))
+
+    def lessons_done(self, uid, course_id):
+        row = self.one('lessons_done', (uid, course_id))
+        return row['lessons_done'] if row else None
+
+    def enroll(self, uid, course_id):
+        return self.run('enroll', (uid, course_id))
+
+    def enrollment_progress(self, uid, course_ids):
+        return self.all('enrollment_progress', (uid, self.id_list(course_ids)))
+
+    # Progress and certificates; params come from lms_main.progress_params
+    def complete_lesson(self, params):
+        """Mark one lesson done; returns the new progress, or None when nothing was updated."""
+        row = self.conn.execute(self.SQL['lesson_progress'] + " RETURNING progress", params).fetchone()
+        return row['progress'] if row else None
+
+    def advance_progress(self, params):
+        row = self.conn.execute(self.SQL['progress'] + " RETURNING progress", params).fetchone()
+        return row['progress'] if row else None
+
+    def issue_certificate(self, params):
+        return self.run('issue_certificate', params)
+
+    def apply_progress(self, completions, steps):
+        """Batched lesson completions and step bumps, then certificates for whatever reached 100%.
+
+        Returns the params whose certificate was actually inserted, at most one per course.
+        """
+        self.run_many('lesson_progress', completions)
+        self.run_many('progress', steps)
+        by_course = {p['course_id']: p for p in completions + steps}
+        return [p for p in by_course.values() if self.issue_certificate(p)]
+
+    # Catalogue
+    def catalogue(self, uid, category, after_id, limit):
+        if category: return self.all('catalogue_category', (uid, category, after_id, limit))
+        return self.all('catalogue', (uid, after_id, limit))
+
+    def catalogue_version(self):
+        row = self.one('catalogue_version')
+        return (row['version'], row['updated_at']) if row else (0, 0)
+
+    def curriculum(self, course_id):
+        return self.all('curriculum', (course_id,))
+
+    def courses_after(self, last_id):
+        """(id, title, category) of courses added after `last_id`, oldest first."""
+        return [(r['id'], r['title'], r['category']) for r in self.execute('courses_after', (last_id,))]
+
+    def search(self, uid, terms, limit, after, candidates):
+        # `after` is the (score, id) keyset of the last row already shown; lower scores rank first
+        if not terms: return []
+        return self.all('search', {'uid': uid, 'match': self.match(terms), 'candidates': candidates,
+                                   'score': after[0], 'after': after[1], 'limit': limit})
+
+    # Notes
+    def notes(self, uid, course_id, lesson, before, limit):
+        if lesson is None: return self.all('notes', (uid, course_id, before, limit))
+        return self.all('notes_lesson', (uid, course_id, lesson, before, limit))
+
+    def save_notes(self, ops):
+        self.run_many('upsert_note', [op for op in ops if op['body'] is not None])
+        self.run_many('delete_note', [op for op in ops if op['body'] is None])
+
+    # Support tickets
+    def create_ticket(self, uid, subject, body, attachment, attachment_name, created_at):
+        return self.one('create_ticket', (uid, subject, body, attachment, attachment_name, created_at))['id']
+
+    def ticket(self, ticket_id):
+        return self.one('ticket', (ticket_id,))
+
+    def set_attachment_status(self, ticket_id, status):
+        self.run('attachment_status', (status, ticket_id))
+
+    # Lesson videos
+    def create_video(self, course_id, lesson, name, ext, size, created_at):
+        return self.one('create_video', (course_id, lesson, name, ext, size, created_at))['id']
+
+    def video(self, video_id):
+        return self.one('video', (video_id,))
+
+    def publish_video(self, video, now):
+        """Mark an uploaded video ready and make it the one its lesson plays."""
+        self.run('video_ready', (now, video['id']))
+        self.run('lesson_video', (video['id'], video['course_id'], video['lesson']))
+
+    def reject_video(self, video_id):
+        self.run('video_rejected', (video_id,))
+
+    # Job queue (lms_jobs); `attempts` makes settling a job a no-op once its claim has expired and it was claimed again
+    def enqueue_job(self, kind, payload, visible_at, created_at):
+        self.run('enqueue_job', (kind, payload, visible_at, created_at))
+
+    def job_ready(self, now):
+        return self.one('job_ready', (now,)) is not None
+
+    def claim_job(self, deadline, now):
+        return self.one('claim_job', (deadline, now))
+
+    def finish_job(self, job_id, attempts):
+        self.run('finish_job', (job_id, attempts))
+
+    def retry_job(self, job_id, attempts, visible_at, error):
+        self.run('retry_job', (visible_at, error, job_id, attempts))
+
+    def bury_job(self, job_id, attempts, error):
+        self.run('bury_job', (error, job_id, attempts))
+
+    def job_counts(self, now):
+        return self.one('job_counts', {'now': now})
+
+    def dead_jobs(self, limit=50):
+        return self.all('dead_jobs', (limit,))
+
+    def requeue_dead_jobs(self, now):
+        return self.run('requeue_dead_jobs', (now,))
+
+    # Course recommendations (lms_recommend)
+    def enrollment_pairs(self):
+        """(user_id, course_id) of every enrollment, ordered by user, streamed from the cursor."""
+        return map(itemgetter('user_id', 'course_id'), self.execute('enrollment_pairs'))
+
+    def enrollment_fingerprint(self):
+        """(enrollments, highest enrollment id): equal between two builds when no one enrolled or left in between."""
+        row = self.one('enrollment_fingerprint')
+        return (row['enrollments'], row['last_id'])
+
+    def recommend_build(self):
+        return self.one('recommend_build')
+
+    def save_neighbours(self, rows, fingerprint, built_at, seconds):
+        """Replace every course's neighbours in one transaction, so readers see the old set or the new one."""
+        self.run('clear_neighbours')
+        self.run_many('insert_neighbour', rows)
+        self.run('save_recommend_build', (fingerprint[0], fingerprint[1], len(rows), built_at, seconds))
+
+    def mark_course_stale(self, course_id):
+        """Queue a refresh of the course's neighbours; False when one is already pending."""
+        return self.run('mark_course_stale', (course_id,)) > 0
+
+    def take_stale_course(self, course_id):
+        """Take the course off the refresh queue; False when it was not on it (already refreshed)."""
+        return self.run('take_stale_course', (course_id,)) > 0
+
+    def course_baskets(self, course_id):
+        """(user_id, course_id) of every enrollment of the learners of `course_id`, ordered by user."""
+        return map(itemgetter('user_id', 'course_id'), self.execute('course_baskets', (course_id,)))
+
+    def course_sizes(self, course_ids):
+        """{course_id: learners enrolled}, from the course_stats rollup."""
+        return {r['course_id']: r['enrolled'] for r in self.execute('course_sizes', (self.id_list(course_ids),))}
+
+    def neighbour_lists(self, course_ids):
+        """{course_id: [(similar_id, score)]} as stored, best first."""
+        lists = {}
+        for r in self.execute('neighbour_lists', (self.id_list(course_ids),)): lists.setdefault(r['course_id'], []).append((r['similar_id'], r['score']))
+        return lists
+
+    def replace_neighbours(self, lists):
+        """Store {course_id: [(rank, similar_id, score)]} in place of the neighbours of each of those courses."""
+        self.run_many('clear_course_neighbours', [(course_id,) for course_id in lists])
+        self.run_many('insert_neighbour', [(course_id, *row) for course_id, rows in lists.items() for row in rows])
+
+    def recommended(self, uid, limit):
+        return self.all('recommended', {'uid': uid, 'limit': limit})
+
+    def popular_courses(self, uid, limit):
+        """The most-enrolled courses `uid` is not enrolled in, from the course_stats rollup."""
+        return self.all('popular_courses', (uid, limit))
+
+    # Course analytics: reads of the rollup tables only
+    def analytics_totals(self):
+        return self.one('analytics_totals')
+
+    def analytics_courses(self, after, limit):
+        """Courses by enrollments, most first; `after` is the (enrolled, course_id) keyset of the last row shown."""
+        return self.all('analytics_courses', {'enrolled': after[0], 'after': after[1], 'limit': limit})
+
+    def analytics_course(self, course_id):
+        return self.one('analytics_course', (course_id,))
+
+    def progress_histogram(self, course_id):
+        return {r['bucket']: r['learners'] for r in self.execute('progress_histogram', (course_id,))}
+
+    def analytics_daily(self, course_id, since, until):
+        """Daily counts between two 'YYYY-MM-DD' days inclusive, of one course or (course_id None) of all."""
+        if course_id is None: return self.all('analytics_daily', (since, until))
+        return self.all('analytics_course_daily', (course_id, since, until))
+
+    # Certificates
+    def certificate_list(self, uid):
+        return self.all('certificate_list', (uid,))
+
+    def certificates(self, uid):
+        return self.all('certificates', (uid,))
+
+    def certificate(self, uid, cert_id):
+        return self.one('certificate', (uid, cert_id))
+
+    def verify_certificate(self, cert_id):
+        return self.one('verify', (cert_id,))
+
+    def certificate_count(self):
+        return self.one('certificate_count')['n']
+
+    def certificate_ids(self, after=0):
+        """(seq, id) of certificates issued after insertion position `after`, in insertion order."""
+        return [(r['seq'], r['id']) for r in self.execute('certificate_ids', (after,))]
+
+
+# ==========================================
+# SQLITE
+# ==========================================
+
+CERTIFICATE_SQL = "SELECT cert.id, cert.date_issued, c.title AS course_title, u.name FROM certificate cert JOIN course c ON c.id = cert.course_id JOIN user u ON u.id = cert.user_id"
+
+class SQLiteStore(Store):
+    SQL = {
+        'user_by_email': "SELECT * FROM user WHERE email=?",
+        'create_user': "INSERT INTO user (name, email, password) VALUES (?,?,?)",
+        'update_password': "UPDATE user SET password=? WHERE id=?",
+        'session': "SELECT data, expires FROM web_session WHERE id=? AND expires > ?",
+        'save_session': "INSERT INTO web_session (id, data, expires) VALUES (?,?,?) ON CONFLICT (id) DO UPDATE SET data = excluded.data, expires = excluded.expires",
+        'delete_session': "DELETE FROM web_session WHERE id=?",
+        'purge_sessions': "DELETE FROM web_session WHERE expires <= ?",
+        'user_stats': "SELECT in_progress, completed FROM user_stats WHERE user_id=?",
+        'recent_enrollments': "SELECT c.title, e.progress, e.course_id, e.status FROM enrollment e JOIN course c ON e.course_id=c.id WHERE e.user_id=? ORDER BY e.updated_at DESC, e.id DESC LIMIT ?",
+        'enrollments': "SELECT c.id as course_id, c.title, c.description, e.status, e.progress FROM enrollment e JOIN course c ON e.course_id=c.id WHERE e.user_id=?",
+        'course_enrollment': "SELECT c.id as course_id, c.title, c.description, e.status, e.progress, e.lessons_done FROM enrollment e JOIN course c ON e.course_id=c.id WHERE e.user_id=? AND e.course_id=?",
+        'lessons_done': "SELECT lessons_done FROM enrollment WHERE user_id=? AND course_id=?",
+        'enroll': "INSERT OR IGNORE INTO enrollment (user_id, course_id, status, progress, updated_at, enrolled_at) VALUES (?, ?, 'In Progress', 0, strftime('%Y-%m-%d %H:%M:%f', 'now'), strftime('%Y-%m-%d %H:%M:%f', 'now'))",
+        'enrollment_progress': "SELECT course_id, progress, status FROM enrollment WHERE user_id=? AND course_id IN (SELECT value FROM json_each(?))",
+        # One lesson is worth 25%; status flips in the same statement so there is no read-then-write window
+        'progress': """
+            UPDATE enrollment SET progress = MIN(progress + :lessons * 25, 100),
+                status = CASE WHEN progress + :lessons * 25 >= 100 THEN 'Completed' ELSE status END,
+                updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+            WHERE user_id = :uid AND course_id = :course_id
+        """,
+        # Lesson completion: set the lesson's bit and derive progress from the running count, all in one statement
+        'lesson_progress': """
+            UPDATE enrollment SET lessons_done = bitmap_set(lessons_done, :lesson),
+                lessons_completed = lessons_completed + 1 - bitmap_test(lessons_done, :lesson),
+                progress = MIN(100, (lessons_completed + 1 - bitmap_test(lessons_done, :lesson)) * 100 / :total),
+                status = CASE WHEN lessons_completed + 1 - bitmap_test(lessons_done, :lesson) >= :total THEN 'Completed' ELSE status END,
+                updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+            WHERE user_id = :uid AND course_id = :course_id AND :lesson >= 0 AND :lesson < :total
+        """,
+        # ux_certificate_user_course makes concurrent completions issue exactly one certificate
+        'issue_certificate': """
+            INSERT INTO certificate (id, user_id, course_id, date_issued)
+            SELECT :cert_id, user_id, course_id, :today FROM enrollment WHERE user_id = :uid AND course_id = :course_id AND progress >= 100
+            ON CONFLICT (user_id, course_id) DO NOTHING
+        """,
+        'catalogue': "SELECT c.*, (SELECT 1 FROM enrollment WHERE user_id=? AND course_id=c.id) AS enrolled FROM course c WHERE c.id > ? ORDER BY c.id LIMIT ?",
+        'catalogue_category': "SELECT c.*, (SELECT 1 FROM enrollment WHERE user_id=? AND course_id=c.id) AS enrolled FROM course c WHERE c.category = ? AND c.id > ? ORDER BY c.id LIMIT ?",
+        'catalogue_version': "SELECT version, updated_at FROM catalogue_version WHERE id = 1",
+        'curriculum': "SELECT s.title AS section, l.position, l.title, l.video_id FROM lesson l JOIN section s ON s.id = l.section_id WHERE l.course_id = ? ORDER BY l.position",
+        'courses_after': "SELECT id, title, category FROM course WHERE id > ? ORDER BY id",
+        # BM25 ranks at most :candidates matches, so a two-letter prefix that hits most of the
+        # catalogue costs about as much as a specific query.
+        'search': """
+            SELECT c.*, hit.score, (SELECT 1 FROM enrollment WHERE user_id=:uid AND course_id=c.id) AS enrolled
+            FROM (SELECT rowid AS id, bm25(course_fts, 10.0, 1.0, 4.0) AS score FROM course_fts WHERE course_fts MATCH :match LIMIT :candidates) hit
+            JOIN course c ON c.id = hit.id WHERE (hit.score, hit.id) > (:score, :after) ORDER BY hit.score, hit.id LIMIT :limit
+        """,
+        'notes': "SELECT id, client_key, lesson, body, updated_at FROM note WHERE user_id=? AND course_id=? AND id < ? ORDER BY id DESC LIMIT ?",
+        'notes_lesson': "SELECT id, client_key, lesson, body, updated_at FROM note WHERE user_id=? AND course_id=? AND lesson=? AND id < ? ORDER BY id DESC LIMIT ?",
+        # Notes are keyed by a client-generated id within their course, so autosaves of the same draft overwrite instead of piling up
+        'upsert_note': """
+            INSERT INTO note (user_id, course_id, lesson, client_key, body, created_at, updated_at)
+            VALUES (:uid, :course_id, :lesson, :key, :body, :at, :at)
+            ON CONFLICT (user_id, course_id, client_key) DO UPDATE SET lesson = excluded.lesson, body = excluded.body, updated_at = excluded.updated_at
+            WHERE excluded.updated_at >= note.updated_at
+        """,
+        'delete_note': "DELETE FROM note WHERE user_id = :uid AND course_id = :course_id AND client_key = :key",
+        'certificate_list': "SELECT cert.id, c.title as course_title, cert.date_issued as date FROM certificate cert JOIN course c ON cert.course_id = c.id WHERE cert.user_id = ?",
+        'certificates': CERTIFICATE_SQL + " WHERE cert.user_id = ? ORDER BY cert.date_issued, cert.id",
+        'certificate': CERTIFICATE_SQL + " WHERE cert.user_id = ? AND cert.id = ?",
+        'verify': CERTIFICATE_SQL + " WHERE cert.id = ?",
+        'certificate_count': "SELECT COUNT(*) AS n FROM certificate",
+        'certificate_ids': "SELECT rowid AS seq, id FROM certificate WHERE rowid > ? ORDER BY rowid",
+        'create_ticket': "INSERT INTO support_ticket (user_id, subject, body, attachment, attachment_name, created_at) VALUES (?,?,?,?,?,?) RETURNING id",
+        'ticket': "SELECT t.*, u.name, u.email FROM support_ticket t JOIN user u ON u.id = t.user_id WHERE t.id=?",
+        'attachment_status': "UPDATE support_ticket SET attachment_status=? WHERE id=?",
+        'create_video': "INSERT INTO video (course_id, lesson, name, ext, size, created_at) VALUES (?,?,?,?,?,?) RETURNING id",
+        'video': """
+            SELECT v.*, l.title AS lesson_title, c.title AS course_title FROM video v JOIN course c ON c.id = v.course_id
+            LEFT JOIN lesson l ON l.course_id = v.course_id AND l.position = v.lesson WHERE v.id=?
+        """,
+        'video_ready': "UPDATE video SET status='ready', ready_at=? WHERE id=?",
+        'lesson_video': "UPDATE lesson SET video_id=? WHERE course_id=? AND position=?",
+        'video_rejected': "UPDATE video SET status='rejected' WHERE id=?",
+        'enqueue_job': "INSERT INTO job (kind, payload, visible_at, created_at) VALUES (?,?,?,?)",
+        'job_ready': "SELECT 1 FROM job WHERE state != 'dead' AND visible_at <= ? LIMIT 1",
+        'claim_job': """
+            UPDATE job SET state = 'running', attempts = attempts + 1, visible_at = ?
+            WHERE id = (SELECT id FROM job WHERE state != 'dead' AND visible_at <= ? ORDER BY visible_at, id LIMIT 1)
+            RETURNING id, kind, payload, attempts, created_at
+        """,
+        'finish_job': "DELETE FROM job WHERE id=? AND attempts=?",
+        'retry_job': "UPDATE job SET state='queued', visible_at=?, last_error=? WHERE id=? AND attempts=?",
+        'bury_job': "UPDATE job SET state='dead', last_error=? WHERE id=? AND attempts=?",
+        'job_counts': """
+            SELECT TOTAL(state != 'dead' AND visible_at <= :now) AS ready, TOTAL(state = 'running' AND visible_at > :now) AS running,
+                TOTAL(state = 'queued' AND visible_at > :now) AS delayed, TOTAL(state = 'dead') AS dead,
+                MIN(CASE WHEN state != 'dead' AND visible_at <= :now THEN created_at END) AS oldest_ready
+            FROM job
+        """,
+        'dead_jobs': "SELECT id, kind, payload, attempts, created_at, last_error FROM job WHERE state='dead' ORDER BY id LIMIT ?",
+        'requeue_dead_jobs': "UPDATE job SET state='queued', attempts=0, visible_at=? WHERE state='dead'",
+        # ux_enrollment_user_course covers this and is already in user order: one index scan, no sort
+        'enrollment_pairs': "SELECT user_id, course_id FROM enrollment ORDER BY user_id, course_id",
+        'enrollment_fingerprint': "SELECT COUNT(*) AS enrollments, IFNULL(MAX(id), 0) AS last_id FROM enrollment",
+        'recommend_build': "SELECT enrollments, last_id, neighbours, built_at, seconds FROM recommend_build WHERE id = 1",
+        'clear_neighbours': "DELETE FROM course_similar",
+        'insert_neighbour': "INSERT INTO course_similar (course_id, rank, similar_id, score) VALUES (?,?,?,?)",
+        'clear_course_neighbours': "DELETE FROM course_similar WHERE course_id=?",
+        'mark_course_stale': "INSERT OR IGNORE INTO course_similar_stale (course_id) VALUES (?)",
+        'take_stale_course': "DELETE FROM course_similar_stale WHERE course_id=?",
+        # ix_enrollment_course_user yields the learners in user order and ux_enrollment_user_course their courses: no sort
+        'course_baskets': "SELECT e.user_id, e.course_id FROM enrollment mine JOIN enrollment e ON e.user_id = mine.user_id WHERE mine.course_id=? ORDER BY mine.user_id",
+        'course_sizes': "SELECT course_id, enrolled FROM course_stats WHERE course_id IN (SELECT value FROM json_each(?))",
+        'neighbour_lists': "SELECT course_id, similar_id, score FROM course_similar WHERE course_id IN (SELECT value FROM json_each(?)) ORDER BY course_id, rank",
+        'save_recommend_build': """
+            INSERT INTO recommend_build (id, enrollments, last_id, neighbours, built_at, seconds) VALUES (1,?,?,?,?,?)
+            ON CONFLICT (id) DO UPDATE SET enrollments = excluded.enrollments, last_id = excluded.last_id,
+                neighbours = excluded.neighbours, built_at = excluded.built_at, seconds = excluded.seconds
+        """,
+        # The neighbours of the learner's courses, summed: k rows per enrollment, each a primary key range of course_similar
+        'recommended': """
+            SELECT c.*, r.score FROM (
+                SELECT s.similar_id, SUM(s.score) AS score FROM enrollment e JOIN course_similar s ON s.course_id = e.course_id
+                WHERE e.user_id = :uid AND NOT EXISTS (SELECT 1 FROM enrollment WHERE user_id = :uid AND course_id = s.similar_id)
+                GROUP BY s.similar_id ORDER BY score DESC, s.similar_id LIMIT :limit) r
+            JOIN course c ON c.id = r.similar_id ORDER BY r.score DESC, r.similar_id
+        """,
+        'popular_courses': """
+            SELECT c.* FROM course_stats s JOIN course c ON c.id = s.course_id
+            WHERE NOT EXISTS (SELECT 1 FROM enrollment WHERE user_id = ? AND course_id = s.course_id)
+            ORDER BY s.enrolled DESC, s.course_id LIMIT ?
+        """,
+        'analytics_totals': """
+            SELECT COUNT(*) AS courses, IFNULL(SUM(enrolled), 0) AS enrolled, IFNULL(SUM(completed), 0) AS completed,
+                IFNULL(SUM(progress_sum), 0) AS progress_sum, IFNULL(SUM(certificates), 0) AS certificates
+            FROM course_stats
+        """,
+        # The enrolled <= bound is a range on ix_course_stats_enrolled, so every page starts with an index seek
+        'analytics_courses': """
+            SELECT s.course_id, c.title, s.enrolled, s.completed, s.progress_sum, s.certificates
+            FROM course_stats s JOIN course c ON c.id = s.course_id
+            WHERE s.enrolled <= :enrolled AND (s.enrolled < :enrolled OR s.course_id > :after)
+            ORDER BY s.enrolled DESC, s.course_id LIMIT :limit
+        """,
+        'analytics_course': """
+            SELECT c.id AS course_id, c.title, IFNULL(s.enrolled, 0) AS enrolled, IFNULL(s.completed, 0) AS completed,
+                IFNULL(s.progress_sum, 0) AS progress_sum, IFNULL(s.certificates, 0) AS certificates
+            FROM course c LEFT JOIN course_stats s ON s.course_id = c.id WHERE c.id = ?
+        """,
+        'progress_histogram': "SELECT bucket, learners FROM course_progress WHERE course_id=? ORDER BY bucket",
+        'analytics_daily': "SELECT day, enrolled, completed, certificates FROM daily_stats WHERE day >= ? AND day <= ? ORDER BY day",
+        'analytics_course_daily': "SELECT day, enrolled, completed, certificates FROM course_daily WHERE course_id=? AND day >= ? AND day <= ? ORDER BY day",
+    }
+
+    def match(self, terms):
+        # Every term is a quoted prefix match, so partial words typed into the search box still hit
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def id_list(self, ids):
+        return json.dumps(list(ids))
+
+
+# ==========================================
+# POSTGRESQL
+# ==========================================
+
+PG_NOW = "to_char(clock_timestamp() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS.MS')"  # same text format SQLite stores
+PG_COURSE_COLUMNS = "c.id, c.title, c.description, c.type, c.category, c.lesson_count"
+PG_CERTIFICATE_SQL = 'SELECT cert.id, cert.date_issued, c.title AS course_title, u.name FROM certificate cert JOIN course c ON c.id = cert.course_id JOIN "user" u ON u.id = cert.user_id'
+SCHEMA_LOCK = 0x4C4D53  # pg_advisory_xact_lock key serializing concurrent schema setup
+
+# Mirrors the SQLite schema after all of lms_main's MIGRATIONS. Timestamps stay TEXT in the same
+# format, the lesson bitmaps use the same bit order (get_bit/set_bit number bits from the least
+# significant bit of the first byte), and user_stats is an index-only aggregate instead of a trigger table.
+POSTGRES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS "user" (id BIGSERIAL PRIMARY KEY, name TEXT, email TEXT UNIQUE, password TEXT);
+    -- lms_main.normalize_email(): addresses are stored lowercase; one whose lowercase form is taken stays as it was
+    UPDATE "user" u SET email = lower(trim(u.email))
+    WHERE u.email != lower(trim(u.email)) AND NOT EXISTS (SELECT 1 FROM "user" other WHERE other.email = lower(trim(u.email)));
+    CREATE TABLE IF NOT EXISTS course (
+        id BIGSERIAL PRIMARY KEY, title TEXT, description TEXT, type TEXT, category TEXT, lesson_count INTEGER NOT NULL DEFAULT 0,
+        search TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') || setweight(to_tsvector('simple', coalesce(category, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(description, '')), 'C')) STORED);
+    CREATE INDEX IF NOT EXISTS ix_course_category ON course (category, id);
+    CREATE INDEX IF NOT EXISTS ix_course_search ON course USING GIN (search);
+    CREATE TABLE IF NOT EXISTS enrollment (
+        id BIGSERIAL PRIMARY KEY, user_id BIGINT NOT NULL, course_id BIGINT NOT NULL, status TEXT, progress INTEGER,
+        updated_at TEXT, lessons_done BYTEA, lessons_completed INTEGER NOT NULL DEFAULT 0, enrolled_at TEXT, completed_at TEXT);
+    ALTER TABLE enrollment ADD COLUMN IF NOT EXISTS enrolled_at TEXT, ADD COLUMN IF NOT EXISTS completed_at TEXT;
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_enrollment_user_course ON enrollment (user_id, course_id);
+    CREATE INDEX IF NOT EXISTS ix_enrollment_user_status ON enrollment (user_id, status, course_id, progress);
+    CREATE INDEX IF NOT EXISTS ix_enrollment_user_recent ON enrollment (user_id, updated_at, id);
+    CREATE INDEX IF NOT EXISTS ix_enrollment_course_user ON enrollment (course_id, user_id);
+    CREATE TABLE IF NOT EXISTS certificate (id TEXT PRIMARY KEY, seq BIGSERIAL UNIQUE, user_id BIGINT, course_id BIGINT, date_issued TEXT);
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_certificate_user_course ON certificate (user_id, course_id);
+    CREATE INDEX IF NOT EXISTS ix_certificate_user_course ON certificate (user_id, course_id, date_issued, id);
+    CREATE TABLE IF NOT EXISTS section (id BIGSERIAL PRIMARY KEY, course_id BIGINT NOT NULL, position INTEGER NOT NULL, title TEXT);
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_section_course_position ON section (course_id, position);
+    CREATE TABLE IF NOT EXISTS lesson (id BIGSERIAL PRIMARY KEY, course_id BIGINT NOT NULL, section_id BIGINT NOT NULL, position INTEGER NOT NULL, title TEXT);
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_lesson_course_position ON lesson (course_id, position);
+    CREATE TABLE IF NOT EXISTS note (
+        id BIGSERIAL PRIMARY KEY, user_id BIGINT NOT NULL, course_id BIGINT NOT NULL, lesson INTEGER,
+        client_key TEXT NOT NULL, body TEXT NOT NULL, created_at TEXT NOT NULL, updated_at TEXT NOT NULL);
+    DROP INDEX IF EXISTS ux_note_user_key;
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_note_user_course_key ON note (user_id, course_id, client_key);
+    CREATE INDEX IF NOT EXISTS ix_note_user_course ON note (user_id, course_id, id);
+    CREATE INDEX IF NOT EXISTS ix_note_user_course_lesson ON note (user_id, course_id, lesson, id);
+    CREATE TABLE IF NOT EXISTS catalogue_version (id INTEGER PRIMARY KEY CHECK (id = 1), version BIGINT NOT NULL, updated_at BIGINT NOT NULL);
+    INSERT INTO catalogue_version (id, version, updated_at) VALUES (1, 1, extract(epoch FROM now())::BIGINT) ON CONFLICT (id) DO NOTHING;
+    CREATE TABLE IF NOT EXISTS web_session (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires DOUBLE PRECISION NOT NULL);
+    CREATE INDEX IF NOT EXISTS ix_web_session_expires ON web_session (expires);
+    CREATE TABLE IF NOT EXISTS support_ticket (
+        id BIGSERIAL PRIMARY KEY, user_id BIGINT NOT NULL, subject TEXT NOT NULL, body TEXT NOT NULL,
+        attachment TEXT, attachment_name TEXT, attachment_status TEXT, created_at TEXT NOT NULL);
+    CREATE INDEX IF NOT EXISTS ix_support_ticket_user ON support_ticket (user_id, id);
+    CREATE TABLE IF NOT EXISTS video (
+        id BIGSERIAL PRIMARY KEY, course_id BIGINT NOT NULL, lesson INTEGER NOT NULL, name TEXT NOT NULL, ext TEXT NOT NULL, size BIGINT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'uploading', created_at DOUBLE PRECISION NOT NULL, ready_at DOUBLE PRECISION);
+    ALTER TABLE lesson ADD COLUMN IF NOT EXISTS video_id BIGINT;
+    CREATE TABLE IF NOT EXISTS job (
+        id BIGSERIAL PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, state TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0, visible_at DOUBLE PRECISION NOT NULL, created_at DOUBLE PRECISION NOT NULL, last_error TEXT);
+    CREATE INDEX IF NOT EXISTS ix_job_visible ON job (visible_at, id) WHERE state <> 'dead';
+    CREATE TABLE IF NOT EXISTS course_stats (
+        course_id BIGINT PRIMARY KEY, enrolled INTEGER NOT NULL DEFAULT 0, completed INTEGER NOT NULL DEFAULT 0,
+        progress_sum BIGINT NOT NULL DEFAULT 0, certificates INTEGER NOT NULL DEFAULT 0);
+    CREATE INDEX IF NOT EXISTS ix_course_stats_enrolled ON course_stats (enrolled DESC, course_id);
+    CREATE TABLE IF NOT EXISTS course_progress (course_id BIGINT NOT NULL, bucket INTEGER NOT NULL, learners INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (course_id, bucket));
+    CREATE TABLE IF NOT EXISTS course_daily (
+        course_id BIGINT NOT NULL, day TEXT NOT NULL, enrolled INTEGER NOT NULL DEFAULT 0, completed INTEGER NOT NULL DEFAULT 0,
+        certificates INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (course_id, day));
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        day TEXT PRIMARY KEY, enrolled INTEGER NOT NULL DEFAULT 0, completed INTEGER NOT NULL DEFAULT 0, certificates INTEGER NOT NULL DEFAULT 0);
+
+    CREATE TABLE IF NOT EXISTS course_similar (
+        course_id BIGINT NOT NULL, rank INTEGER NOT NULL, similar_id BIGINT NOT NULL, score DOUBLE PRECISION NOT NULL, PRIMARY KEY (course_id, rank));
+    CREATE TABLE IF NOT EXISTS recommend_build (
+        id INTEGER PRIMARY KEY CHECK (id = 1), enrollments BIGINT NOT NULL, last_id BIGINT NOT NULL, neighbours BIGINT NOT NULL,
+        built_at DOUBLE PRECISION NOT NULL, seconds DOUBLE PRECISION NOT NULL);
+    CREATE TABLE IF NOT EXISTS course_similar_stale (course_id BIGINT PRIMARY KEY);
+
+    CREATE OR REPLACE FUNCTION bitmap_test(bits BYTEA, pos INTEGER) RETURNS INTEGER IMMUTABLE LANGUAGE SQL AS $$
+        SELECT CASE WHEN bits IS NULL OR pos IS NULL OR pos < 0 OR pos >= length(bits) * 8 THEN 0 ELSE get_bit(bits, pos) END
+    $$;
+    CREATE OR REPLACE FUNCTION bitmap_set(bits BYTEA, pos INTEGER) RETURNS BYTEA IMMUTABLE LANGUAGE SQL AS $$
+        SELECT CASE WHEN pos IS NULL OR pos < 0 THEN bits ELSE set_bit(
+            coalesce(bits, ''::BYTEA) || decode(repeat('00', greatest(0, pos / 8 + 1 - length(coalesce(bits, ''::BYTEA)))), 'hex'), pos, 1) END
+    $$;
+    CREATE OR REPLACE FUNCTION bitmap_prefix(n INTEGER) RETURNS BYTEA IMMUTABLE LANGUAGE SQL AS $$
+        SELECT decode(repeat('ff', greatest(n, 0) / 8)
+            || CASE WHEN greatest(n, 0) % 8 > 0 THEN lpad(to_hex((1 << (n % 8)) - 1), 2, '0') ELSE '' END, 'hex')
+    $$;
+
+    CREATE OR REPLACE FUNCTION lms_lesson_count() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN UPDATE course SET lesson_count = lesson_count + 1 WHERE id = NEW.course_id;
+        ELSE UPDATE course SET lesson_count = lesson_count - 1 WHERE id = OLD.course_id;
+        END IF;
+        RETURN NULL;
+    END $$;
+    DROP TRIGGER IF EXISTS trg_lesson_count ON lesson;
+    CREATE TRIGGER trg_lesson_count AFTER INSERT OR DELETE ON lesson FOR EACH ROW EXECUTE FUNCTION lms_lesson_count();
+
+    CREATE OR REPLACE FUNCTION lms_catalogue_version() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE catalogue_version SET version = version + 1, updated_at = extract(epoch FROM now())::BIGINT WHERE id = 1;
+        RETURN NULL;
+    END $$;
+    DROP TRIGGER IF EXISTS trg_catalogue_version ON course;
+    CREATE TRIGGER trg_catalogue_version AFTER INSERT OR UPDATE OR DELETE ON course FOR EACH STATEMENT EXECUTE FUNCTION lms_catalogue_version();
+
+    -- Course analytics rollups, kept current in the transaction of every enrollment and certificate write
+    CREATE OR REPLACE FUNCTION lms_enrollment_times() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.enrolled_at := coalesce(NEW.enrolled_at, NEW.updated_at, to_char(clock_timestamp() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS.MS'));
+        IF NEW.status = 'Completed' AND NEW.completed_at IS NULL THEN
+            NEW.completed_at := coalesce(NEW.updated_at, to_char(clock_timestamp() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS.MS'));
+        END IF;
+        RETURN NEW;
+    END $$;
+    DROP TRIGGER IF EXISTS trg_enrollment_times ON enrollment;
+    CREATE TRIGGER trg_enrollment_times BEFORE INSERT OR UPDATE OF status ON enrollment FOR EACH ROW EXECUTE FUNCTION lms_enrollment_times();
+
+    CREATE OR REPLACE FUNCTION lms_daily(course BIGINT, at TEXT, add_enrolled INTEGER, add_completed INTEGER, add_certificates INTEGER) RETURNS VOID LANGUAGE SQL AS $$
+        INSERT INTO course_daily AS d (course_id, day, enrolled, completed, certificates) VALUES (course, left(at, 10), add_enrolled, add_completed, add_certificates)
+            ON CONFLICT (course_id, day) DO UPDATE SET enrolled = d.enrolled + excluded.enrolled, completed = d.completed + excluded.completed,
+                certificates = d.certificates + excluded.certificates;
+        INSERT INTO daily_stats AS d (day, enrolled, completed, certificates) VALUES (left(at, 10), add_enrolled, add_completed, add_certificates)
+            ON CONFLICT (day) DO UPDATE SET enrolled = d.enrolled + excluded.enrolled, completed = d.completed + excluded.completed,
+                certificates = d.certificates + excluded.certificates;
+    $$;
+    CREATE OR REPLACE FUNCTION lms_course_stats() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            UPDATE course_stats SET enrolled = enrolled - 1, completed = completed - (OLD.status IS NOT DISTINCT FROM 'Completed')::INT,
+                progress_sum = progress_sum - coalesce(OLD.progress, 0) WHERE course_id = OLD.course_id;
+            UPDATE course_progress SET learners = learners - 1 WHERE course_id = OLD.course_id AND bucket = least(coalesce(OLD.progress, 0), 100) / 10;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            INSERT INTO course_stats AS s (course_id, enrolled, completed, progress_sum)
+                VALUES (NEW.course_id, 1, (NEW.status IS NOT DISTINCT FROM 'Completed')::INT, coalesce(NEW.progress, 0))
+                ON CONFLICT (course_id) DO UPDATE SET enrolled = s.enrolled + 1, completed = s.completed + excluded.completed, progress_sum = s.progress_sum + excluded.progress_sum;
+            INSERT INTO course_progress AS p (course_id, bucket, learners) VALUES (NEW.course_id, least(coalesce(NEW.progress, 0), 100) / 10, 1)
+                ON CONFLICT (course_id, bucket) DO UPDATE SET learners = p.learners + 1;
+        END IF;
+        IF TG_OP = 'INSERT' THEN PERFORM lms_daily(NEW.course_id, NEW.enrolled_at, 1, 0, 0); END IF;
+        IF TG_OP = 'DELETE' THEN
+            PERFORM lms_daily(OLD.course_id, OLD.enrolled_at, -1, 0, 0);
+            IF OLD.completed_at IS NOT NULL THEN PERFORM lms_daily(OLD.course_id, OLD.completed_at, 0, -1, 0); END IF;
+        ELSIF NEW.completed_at IS NOT NULL AND (TG_OP = 'INSERT' OR OLD.completed_at IS NULL) THEN
+            PERFORM lms_daily(NEW.course_id, NEW.completed_at, 0, 1, 0);
+        END IF;
+        RETURN NULL;
+    END $$;
+    DROP TRIGGER IF EXISTS trg_course_stats ON enrollment;
+    CREATE TRIGGER trg_course_stats AFTER INSERT OR DELETE ON enrollment FOR EACH ROW EXECUTE FUNCTION lms_course_stats();
+    DROP TRIGGER IF EXISTS trg_course_stats_update ON enrollment;
+    CREATE TRIGGER trg_course_stats_update AFTER UPDATE OF status, progress ON enrollment FOR EACH ROW
+        WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.progress IS DISTINCT FROM NEW.progress) EXECUTE FUNCTION lms_course_stats();
+
+    CREATE OR REPLACE FUNCTION lms_certificate_stats() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO course_stats AS s (course_id, certificates) VALUES (NEW.course_id, 1) ON CONFLICT (course_id) DO UPDATE SET certificates = s.certificates + 1;
+            PERFORM lms_daily(NEW.course_id, NEW.date_issued, 0, 0, 1);
+        ELSE
+            UPDATE course_stats SET certificates = certificates - 1 WHERE course_id = OLD.course_id;
+            PERFORM lms_daily(OLD.course_id, OLD.date_issued, 0, 0, -1);
+        END IF;
+        RETURN NULL;
+    END $$;
+    DROP TRIGGER IF EXISTS trg_certificate_stats ON certificate;
+    CREATE TRIGGER trg_certificate_stats AFTER INSERT OR DELETE ON certificate FOR EACH ROW EXECUTE FUNCTION lms_certificate_stats();
+"""
+
+POSTGRES_DEFAULT_CURRICULUM = """
+    INSERT INTO section (course_id, position, title)
+        SELECT c.id, s.position, s.title FROM course c, (VALUES (0, 'Basics'), (1, 'Core Concepts')) s (position, title)
+        WHERE c.lesson_count = 0 AND NOT EXISTS (SELECT 1 FROM section WHERE course_id = c.id);
+    INSERT INTO lesson (course_id, section_id, position, title)
+        SELECT s.course_id, s.id, s.position * 2 + l.n, l.title FROM section s
+        JOIN (VALUES (0, 0, 'Introduction'), (0, 1, 'Setup'), (1, 0, 'Deep Dive'), (1, 1, 'Wrap-up')) l (sp, n, title) ON l.sp = s.position
+        WHERE NOT EXISTS (SELECT 1 FROM lesson WHERE section_id = s.id);
+    UPDATE enrollment e SET lessons_completed = c.lesson_count * e.progress / 100, lessons_done = bitmap_prefix(c.lesson_count * e.progress / 100)
+        FROM course c WHERE c.id = e.course_id AND e.lessons_done IS NULL AND e.progress > 0;
+"""
+
+# lms_main.ANALYTICS_ROLLUP_SQL for PostgreSQL
+POSTGRES_ANALYTICS_ROLLUP = f"""
+    UPDATE enrollment SET enrolled_at = coalesce(updated_at, {PG_NOW}) WHERE enrolled_at IS NULL;
+    UPDATE enrollment SET completed_at = coalesce(updated_at, {PG_NOW}) WHERE status = 'Completed' AND completed_at IS NULL;
+    TRUNCATE course_stats, course_progress, course_daily, daily_stats;
+    INSERT INTO course_stats (course_id, enrolled, completed, progress_sum, certificates)
+        SELECT course_id, sum(enrolled), sum(completed), sum(progress_sum), sum(certificates) FROM (
+            SELECT course_id, count(*) AS enrolled, count(*) FILTER (WHERE status = 'Completed') AS completed,
+                coalesce(sum(progress), 0) AS progress_sum, 0 AS certificates FROM enrollment GROUP BY course_id
+            UNION ALL SELECT course_id, 0, 0, 0, count(*) FROM certificate GROUP BY course_id) t
+        GROUP BY course_id;
+    INSERT INTO course_progress (course_id, bucket, learners)
+        SELECT course_id, least(coalesce(progress, 0), 100) / 10, count(*) FROM enrollment GROUP BY 1, 2;
+    INSERT INTO course_daily (course_id, day, enrolled, completed, certificates)
+        SELECT course_id, day, sum(enrolled), sum(completed), sum(certificates) FROM (
+            SELECT course_id, left(enrolled_at, 10) AS day, count(*) AS enrolled, 0 AS completed, 0 AS certificates FROM enrollment GROUP BY 1, 2
+            UNION ALL SELECT course_id, left(completed_at, 10), 0, count(*), 0 FROM enrollment WHERE completed_at IS NOT NULL GROUP BY 1, 2
+            UNION ALL SELECT course_id, left(date_issued, 10), 0, 0, count(*) FROM certificate GROUP BY 1, 2) t
+        GROUP BY course_id, day;
+    INSERT INTO daily_stats (day, enrolled, completed, certificates)
+        SELECT day, sum(enrolled), sum(completed), sum(certificates) FROM course_daily GROUP BY day;
+"""
+
+class PostgresStore(Store):
+    """Every query is a server-side prepared statement from its first use on a connection (prepare_threshold=0)."""
+
+    SQL = {
+        'user_by_email': 'SELECT id, name, email, password FROM "user" WHERE email = %s',
+        'create_user': 'INSERT INTO "user" (name, email, password) VALUES (%s, %s, %s)',
+        'update_password': 'UPDATE "user" SET password = %s WHERE id = %s',
+        'session': "SELECT data, expires FROM web_session WHERE id = %s AND expires > %s",
+        'save_session': "INSERT INTO web_session (id, data, expires) VALUES (%s, %s, %s) ON CONFLICT (id) DO UPDATE SET data = excluded.data, expires = excluded.expires",
+        'delete_session': "DELETE FROM web_session WHERE id = %s",
+        'purge_sessions': "DELETE FROM web_session WHERE expires <= %s",
+        'user_stats': """
+            SELECT count(*) FILTER (WHERE status <> 'Completed') AS in_progress, count(*) FILTER (WHERE status = 'Completed') AS completed
+            FROM enrollment WHERE user_id = %s
+        """,
+        'recent_enrollments': "SELECT c.title, e.progress, e.course_id, e.status FROM enrollment e JOIN course c ON e.course_id = c.id WHERE e.user_id = %s ORDER BY e.updated_at DESC, e.id DESC LIMIT %s",
+        'enrollments': "SELECT c.id AS course_id, c.title, c.description, e.status, e.progress FROM enrollment e JOIN course c ON e.course_id = c.id WHERE e.user_id = %s",
+        'course_enrollment': "SELECT c.id AS course_id, c.title, c.description, e.status, e.progress, e.lessons_done FROM enrollment e JOIN course c ON e.course_id = c.id WHERE e.user_id = %s AND e.course_id = %s",
+        'lessons_done': "SELECT lessons_done FROM enrollment WHERE user_id = %s AND course_id = %s",
+        'enroll': f"INSERT INTO enrollment (user_id, course_id, status, progress, updated_at, enrolled_at) VALUES (%s, %s, 'In Progress', 0, {PG_NOW}, {PG_NOW}) ON CONFLICT (user_id, course_id) DO NOTHING",
+        'enrollment_progress': "SELECT course_id, progress, status FROM enrollment WHERE user_id = %s AND course_id = ANY(%s)",
+        'progress': f"""
+            UPDATE enrollment SET progress = LEAST(progress + %(lessons)s * 25, 100),
+                status = CASE WHEN progress + %(lessons)s * 25 >= 100 THEN 'Completed' ELSE status END,
+                updated_at = {PG_NOW}
+            WHERE user_id = %(uid)s AND course_id = %(course_id)s
+        """,
+        'lesson_progress': f"""
+            UPDATE enrollment SET lessons_done = bitmap_set(lessons_done, %(lesson)s),
+                lessons_completed = lessons_completed + 1 - bitmap_test(lessons_done, %(lesson)s),
+                progress = LEAST(100, (lessons_completed + 1 - bitmap_test(lessons_done, %(lesson)s)) * 100 / %(total)s),
+                status = CASE WHEN lessons_completed + 1 - bitmap_test(lessons_done, %(lesson)s) >= %(total)s THEN 'Completed' ELSE status END,
+                updated_at = {PG_NOW}
+            WHERE user_id = %(uid)s AND course_id = %(course_id)s AND %(lesson)s >= 0 AND %(lesson)s < %(total)s
+        """,
+        'issue_certificate': """
+            INSERT INTO certificate (id, user_id, course_id, date_issued)
+            SELECT %(cert_id)s, user_id, course_id, %(today)s FROM enrollment WHERE user_id = %(uid)s AND course_id = %(course_id)s AND progress >= 100
+            ON CONFLICT (user_id, course_id) DO NOTHING
+        """,
+        'catalogue': f"SELECT {PG_COURSE_COLUMNS}, (SELECT 1 FROM enrollment WHERE user_id = %s AND course_id = c.id) AS enrolled FROM course c WHERE c.id > %s ORDER BY c.id LIMIT %s",
+        'catalogue_category': f"SELECT {PG_COURSE_COLUMNS}, (SELECT 1 FROM enrollment WHERE user_id = %s AND course_id = c.id) AS enrolled FROM course c WHERE c.category = %s AND c.id > %s ORDER BY c.id LIMIT %s",
+        'catalogue_version': "SELECT version, updated_at FROM catalogue_version WHERE id = 1",
+        'curriculum': "SELECT s.title AS section, l.position, l.title, l.video_id FROM lesson l JOIN section s ON s.id = l.section_id WHERE l.course_id = %s ORDER BY l.position",
+        'courses_after': "SELECT id, title, category FROM course WHERE id > %s ORDER BY id",
+        # Negated rank so that, as with bm25(), lower scores rank first and the keyset compares the same way
+        'search': f"""
+            SELECT {PG_COURSE_COLUMNS}, hit.score, (SELECT 1 FROM enrollment WHERE user_id = %(uid)s AND course_id = c.id) AS enrolled
+            FROM (SELECT id, -ts_rank(search, to_tsquery('simple', %(match)s))::FLOAT8 AS score FROM course
+                  WHERE search @@ to_tsquery('simple', %(match)s) LIMIT %(candidates)s) hit
+            JOIN course c ON c.id = hit.id WHERE (hit.score, hit.id) > (%(score)s, %(after)s) ORDER BY hit.score, hit.id LIMIT %(limit)s
+        """,
+        'notes': "SELECT id, client_key, lesson, body, updated_at FROM note WHERE user_id = %s AND course_id = %s AND id < %s ORDER BY id DESC LIMIT %s",
+        'notes_lesson': "SELECT id, client_key, lesson, body, updated_at FROM note WHERE user_id = %s AND course_id = %s AND lesson = %s AND id < %s ORDER BY id DESC LIMIT %s",
+        'upsert_note': """
+            INSERT INTO note (user_id, course_id, lesson, client_key, body, created_at, updated_at)
+            VALUES (%(uid)s, %(course_id)s, %(lesson)s, %(key)s, %(body)s, %(at)s, %(at)s)
+            ON CONFLICT (user_id, course_id, client_key) DO UPDATE SET lesson = excluded.lesson, body = excluded.body, updated_at = excluded.updated_at
+            WHERE excluded.updated_at >= note.updated_at
+        """,
+        'delete_note': "DELETE FROM note WHERE user_id = %(uid)s AND course_id = %(course_id)s AND client_key = %(key)s",
+        'certificate_list': "SELECT cert.id, c.title AS course_title, cert.date_issued AS date FROM certificate cert JOIN course c ON cert.course_id = c.id WHERE cert.user_id = %s",
+        'certificates': PG_CERTIFICATE_SQL + " WHERE cert.user_id = %s ORDER BY cert.date_issued, cert.id",
+        'certificate': PG_CERTIFICATE_SQL + " WHERE cert.user_id = %s AND cert.id = %s",
+        'verify': PG_CERTIFICATE_SQL + " WHERE cert.id = %s",
+        'certificate_count': "SELECT count(*) AS n FROM certificate",
+        'certificate_ids': "SELECT seq, id FROM certificate WHERE seq > %s ORDER BY seq",
+        'create_ticket': "INSERT INTO support_ticket (user_id, subject, body, attachment, attachment_name, created_at) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id",
+        'ticket': 'SELECT t.*, u.name, u.email FROM support_ticket t JOIN "user" u ON u.id = t.user_id WHERE t.id = %s',
+        'attachment_status': "UPDATE support_ticket SET attachment_status = %s WHERE id = %s",
+        'create_video': "INSERT INTO video (course_id, lesson, name, ext, size, created_at) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id",
+        'video': """
+            SELECT v.*, l.title AS lesson_title, c.title AS course_title FROM video v JOIN course c ON c.id = v.course_id
+            LEFT JOIN lesson l ON l.course_id = v.course_id AND l.position = v.lesson WHERE v.id = %s
+        """,
+        'video_ready': "UPDATE video SET status = 'ready', ready_at = %s WHERE id = %s",
+        'lesson_video': "UPDATE lesson SET video_id = %s WHERE course_id = %s AND position = %s",
+        'video_rejected': "UPDATE video SET status = 'rejected' WHERE id = %s",
+        'enqueue_job': "INSERT INTO job (kind, payload, visible_at, created_at) VALUES (%s, %s, %s, %s)",
+        'job_ready': "SELECT 1 FROM job WHERE state <> 'dead' AND visible_at <= %s LIMIT 1",
+        # SKIP LOCKED: concurrent workers each take a different job instead of queueing on the same row
+        'claim_job': """
+            UPDATE job SET state = 'running', attempts = attempts + 1, visible_at = %s
+            WHERE id = (SELECT id FROM job WHERE state <> 'dead' AND visible_at <= %s ORDER BY visible_at, id LIMIT 1 FOR UPDATE SKIP LOCKED)
+            RETURNING id, kind, payload, attempts, created_at
+        """,
+        'finish_job': "DELETE FROM job WHERE id = %s AND attempts = %s",
+        'retry_job': "UPDATE job SET state = 'queued', visible_at = %s, last_error = %s WHERE id = %s AND attempts = %s",
+        'bury_job': "UPDATE job SET state = 'dead', last_error = %s WHERE id = %s AND attempts = %s",
+        'job_counts': """
+            SELECT count(*) FILTER (WHERE state <> 'dead' AND visible_at <= %(now)s) AS ready,
+                count(*) FILTER (WHERE state = 'running' AND visible_at > %(now)s) AS running,
+                count(*) FILTER (WHERE state = 'queued' AND visible_at > %(now)s) AS delayed, count(*) FILTER (WHERE state = 'dead') AS dead,
+                min(created_at) FILTER (WHERE state <> 'dead' AND visible_at <= %(now)s) AS oldest_ready
+            FROM job
+        """,
+        'dead_jobs': "SELECT id, kind, payload, attempts, created_at, last_error FROM job WHERE state = 'dead' ORDER BY id LIMIT %s",
+        'requeue_dead_jobs': "UPDATE job SET state = 'queued', attempts = 0, visible_at = %s WHERE state = 'dead'",
+        'enrollment_pairs': "SELECT user_id, course_id FROM enrollment ORDER BY user_id, course_id",
+        'enrollment_fingerprint': "SELECT count(*) AS enrollments, coalesce(max(id), 0) AS last_id FROM enrollment",
+        'recommend_build': "SELECT enrollments, last_id, neighbours, built_at, seconds FROM recommend_build WHERE id = 1",
+        'clear_neighbours': "DELETE FROM course_similar",
+        'insert_neighbour': "INSERT INTO course_similar (course_id, rank, similar_id, score) VALUES (%s, %s, %s, %s)",
+        'clear_course_neighbours': "DELETE FROM course_similar WHERE course_id = %s",
+        'mark_course_stale': "INSERT INTO course_similar_stale (course_id) VALUES (%s) ON CONFLICT DO NOTHING",
+        'take_stale_course': "DELETE FROM course_similar_stale WHERE course_id = %s",
+        'course_baskets': "SELECT e.user_id, e.course_id FROM enrollment mine JOIN enrollment e ON e.user_id = mine.user_id WHERE mine.course_id = %s ORDER BY mine.user_id",
+        'course_sizes': "SELECT course_id, enrolled FROM course_stats WHERE course_id = ANY(%s)",
+        'neighbour_lists': "SELECT course_id, similar_id, score FROM course_similar WHERE course_id = ANY(%s) ORDER BY course_id, rank",
+        'save_recommend_build': """
+            INSERT INTO recommend_build (id, enrollments, last_id, neighbours, built_at, seconds) VALUES (1, %s, %s, %s, %s, %s)
+            ON CONFLICT (id) DO UPDATE SET enrollments = excluded.enrollments, last_id = excluded.last_id,
+                neighbours = excluded.neighbours, built_at = excluded.built_at, seconds = excluded.seconds
+        """,
+        'recommended': f"""
+            SELECT {PG_COURSE_COLUMNS}, r.score FROM (
+                SELECT s.similar_id, sum(s.score) AS score FROM enrollment e JOIN course_similar s ON s.course_id = e.course_id
+                WHERE e.user_id = %(uid)s AND NOT EXISTS (SELECT 1 FROM enrollment x WHERE x.user_id = %(uid)s AND x.course_id = s.similar_id)
+                GROUP BY s.similar_id ORDER BY score DESC, s.similar_id LIMIT %(limit)s) r
+            JOIN course c ON c.id = r.similar_id ORDER BY r.score DESC, r.similar_id
+        """,
+        'popular_courses': f"""
+            SELECT {PG_COURSE_COLUMNS} FROM course_stats s JOIN course c ON c.id = s.course_id
+            WHERE NOT EXISTS (SELECT 1 FROM enrollment WHERE user_id = %s AND course_id = s.course_id)
+            ORDER BY s.enrolled DESC, s.course_id LIMIT %s
+        """,
+        'analytics_totals': """
+            SELECT count(*) AS courses, coalesce(sum(enrolled), 0)::BIGINT AS enrolled, coalesce(sum(completed), 0)::BIGINT AS completed,
+                coalesce(sum(progress_sum), 0)::BIGINT AS progress_sum, coalesce(sum(certificates), 0)::BIGINT AS certificates
+            FROM course_stats
+        """,
+        'analytics_courses': """
+            SELECT s.course_id, c.title, s.enrolled, s.completed, s.progress_sum, s.certificates
+            FROM course_stats s JOIN course c ON c.id = s.course_id
+            WHERE s.enrolled <= %(enrolled)s AND (s.enrolled < %(enrolled)s OR s.course_id > %(after)s)
+            ORDER BY s.enrolled DESC, s.course_id LIMIT %(limit)s
+        """,
+        'analytics_course': """
+            SELECT c.id AS course_id, c.title, coalesce(s.enrolled, 0) AS enrolled, coalesce(s.completed, 0) AS completed,
+                coalesce(s.progress_sum, 0) AS progress_sum, coalesce(s.certificates, 0) AS certificates
+            FROM course c LEFT JOIN course_stats s ON s.course_id = c.id WHERE c.id = %s
+        """,
+        'progress_histogram': "SELECT bucket, learners FROM course_progress WHERE course_id = %s ORDER BY bucket",
+        'analytics_daily': "SELECT day, enrolled, completed, certificates FROM daily_stats WHERE day >= %s AND day <= %s ORDER BY day",
+        'analytics_course_daily': "SELECT day, enrolled, completed, certificates FROM course_daily WHERE course_id = %s AND day >= %s AND day <= %s ORDER BY day",
+    }
+
+    def run_many(self, name, seq):
+        if seq:
+            with self.conn.cursor() as cur:
+                cur.executemany(self.SQL[name], seq)  # pipelined: one round trip for the whole batch
+
+    def match(self, terms):
+        return ' & '.join(f"'{term}':*" for term in terms)
+
+    def id_list(self, ids):
+        return list(ids)
+
+    def create_schema(self):
+        """Create or update every table, index, function and trigger; safe to run from many workers at once."""
+        self.conn.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK,), prepare=False)
+        self.conn.execute(POSTGRES_SCHEMA, prepare=False)
+        # Databases created before the analytics rollups existed get them backfilled once
+        if not self.conn.execute("SELECT 1 FROM course_stats LIMIT 1").fetchone():
+            self.conn.execute(POSTGRES_ANALYTICS_ROLLUP, prepare=False)
+        self.conn.commit()
+
+    def seed(self, password_hash, courses):
+        """The demo learner, courses, enrollments and certificate of lms_main.seed_db, into an empty database."""
+        if self.conn.execute('SELECT 1 FROM "user" LIMIT 1').fetchone(): return
+        uid = self.conn.execute(
+            """INSERT INTO "user" (name, email, password) VALUES ('Demo Student', 'user@example.com', %s) RETURNING id""", (password_hash,)).fetchone()['id']
+        ids = [self.conn.execute("INSERT INTO course (title, description, type, category) VALUES (%s, %s, %s, %s) RETURNING id", c).fetchone()['id']
+               for c in courses]
+        self.conn.execute(f"INSERT INTO enrollment (user_id, course_id, status, progress, updated_at) VALUES (%s, %s, 'In Progress', 45, {PG_NOW})", (uid, ids[0]))
+        self.conn.execute("INSERT INTO enrollment (user_id, course_id, status, progress, updated_at) VALUES (%s, %s, 'Completed', 100, '2024-05-10 12:00:00.000')", (uid, ids[1]))
+        self.conn.execute("INSERT INTO certificate (id, user_id, course_id, date_issued) VALUES ('CERT-101', %s, %s, '2024-05-10')", (uid, ids[1]))
+        self.conn.execute(POSTGRES_DEFAULT_CURRICULUM, prepare=False)
+        self.conn.commit()
+
+
+class PostgresPool:
+    """psycopg_pool behind the acquire/release/stats interface of lms_main's SQLite pool."""
+
+    def __init__(self, url, size, timeout):
+        if psycopg is None:
+            raise RuntimeError('PostgreSQL support needs `pip install "psycopg[binary]" psycopg_pool`')
+        self.url, self.size, self.timeout = url, size, timeout
+        self._lock = threading.Lock()
+        self._pool, self._pid = None, None
+
+    def _get_pool(self):
+        # Opened lazily in each process: the pool's connections and worker threads must not cross a fork
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = PsycopgPool(self.url, min_size=1, max_size=self.size, timeout=self.timeout, open=False,
+                                             kwargs={'row_factory': dict_row, 'prepare_threshold': 0})
+                    self._pool.open()
+                    self._pid = os.getpid()
+        return self._pool
+
+    def acquire(self):
+        return self._get_pool().getconn()
+
+    def release(self, conn):
+        if self._pid != os.getpid(): return
+        self._pool.putconn(conn)  # rolls back an open transaction, discards broken connections
+
+    def stats(self):
+        if self._pid != os.getpid():
+            return {'hits': 0, 'misses': 0, 'waits': 0, 'timeouts': 0, 'discarded': 0, 'wait_time': 0.0,
+                    'size': self.size, 'open': 0, 'idle': 0, 'hit_ratio': 0.0, 'avg_wait_ms': 0.0}
+        s = self._pool.get_stats()
+        requests, waits, wait_ms = s.get('requests_num', 0), s.get('requests_queued', 0), s.get('requests_wait_ms', 0)
+        return {'hits': requests - waits, 'misses': s.get('connections_num', 0), 'waits': waits, 'timeouts': s.get('requests_errors', 0),
+                'discarded': s.get('returns_bad', 0) + s.get('connections_lost', 0), 'wait_time': round(wait_ms / 1000, 6),
+                'size': self.size, 'open': s.get('pool_size', 0), 'idle': s.get('pool_available', 0),
+                'hit_ratio': round((requests - waits) / requests, 4) if requests else 0.0,
+                'avg_wait_ms': round(wait_ms / waits, 3) if waits else 0.0}
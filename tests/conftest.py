@@ -0,0 +1,50 @@
+"""Every test session runs the app against a fresh SQLite database in a temp directory.
+
+lms_main reads its configuration when it is imported, so the environment is set up here first.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+TMP = tempfile.mkdtemp(prefix='lms-test-')
+os.environ['LMS_DB'] = os.path.join(TMP, 'lms.db')
+os.environ['LMS_STATIC_DIR'] = os.path.join(TMP, 'static')
+os.environ['LMS_CERT_CACHE_DIR'] = os.path.join(TMP, 'certificates')
+os.environ['LMS_ADMIN_EMAILS'] = 'user@example.com'
+os.environ['LMS_JOB_THREADS'] = '0'  # tests drain the job queue themselves
+os.environ['LMS_HASH_WORKERS'] = '0'
+os.environ['LMS_LOGIN_IP_PER_MINUTE'] = os.environ['LMS_LOGIN_ACCOUNT_PER_MINUTE'] = '0'
+os.environ.pop('LMS_DATABASE_URL', None)
+
+import lms_main  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def lms():
+    lms_main.init_db()
+    return lms_main
+
+
+@pytest.fixture
+def client(lms):
+    """A test client signed in as the demo learner (an admin, see LMS_ADMIN_EMAILS above)."""
+    client = lms.app.test_client()
+    resp = client.post('/login', data={'email': 'user@example.com', 'password': 'password123'})
+    assert resp.status_code == 302
+    return client
+
+
+@pytest.fixture
+def signed_in_learner(lms):
+    """signed_in_learner(key): a test client signed in as learner-<key>@example.com, a learner without admin rights."""
+    def sign_in(key):
+        email = f'learner-{key}@example.com'
+        client = lms.app.test_client()
+        client.post('/signup', data={'name': f'Learner {key}', 'email': email, 'password': 'password123'})  # fails harmlessly once taken
+        assert client.post('/login', data={'email': email, 'password': 'password123'}).status_code == 302
+        return client
+    return sign_in
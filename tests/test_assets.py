@@ -0,0 +1,46 @@
+"""Page weight budgets and the generated stylesheet, as `flask --app lms_main check-assets` checks them."""
+import os
+import re
+
+import lms_assets
+
+CLASS_ATTR_RE = re.compile(r'class="([^"]*)"')
+JINJA_RE = re.compile(r'\{\{.*?\}\}|\{%.*?%\}')
+JS_CLASSES_RE = re.compile(r'className = "([^"]*)"|classList\.(?:add|remove|toggle)\(([^)]*)\)')
+JS_SELECTOR_RE = re.compile(r"querySelector(?:All)?\('\.([\w-]+)'\)")
+
+
+def template_classes(lms):
+    """Every class named in the templates' class attributes or set by app.js."""
+    classes = set()
+    for text in lms.TEMPLATES.values():
+        for attr in CLASS_ATTR_RE.findall(text): classes.update(JINJA_RE.sub(' ', attr).split())
+    for assigned, listed in JS_CLASSES_RE.findall(lms_assets.source('app.js').decode()):
+        classes.update(assigned.split() if assigned else re.findall(r"'([^']+)'", listed))
+    return classes
+
+
+def test_every_utility_class_gets_a_rule(lms):
+    own = set(lms_assets.CLASS_RE.findall(lms_assets.source('app.css').decode()))  # hand-written rules
+    hooks = set(JS_SELECTOR_RE.findall(lms_assets.source('app.js').decode())) | {'group'}  # no style of their own
+    utilities = {c for c in template_classes(lms) if c not in own | hooks and c != 'fa' and not c.startswith('fa-')}
+    with open(os.path.join(lms_assets.STATIC_DIR, lms.ASSETS['app.css']), encoding='utf-8') as f:
+        css = f.read()
+    missing = sorted(c for c in utilities if not re.search(r'\.' + re.escape(lms_assets.escape_class(c)) + r'[{:>\s]', css))
+    assert missing == []
+
+
+def assert_within_budget(lms, weights, paths):
+    assert [w[0] for w in weights] == list(paths)  # page_weights skips pages that did not render
+    for path, html, first_paint, external in weights:
+        assert html <= lms.HTML_BUDGET_BYTES, path
+        assert first_paint <= lms.FIRST_PAINT_BUDGET_BYTES, path
+        assert external == [], path  # render-blocking third-party resources
+
+
+def test_signed_out_pages_stay_within_budget(lms):
+    assert_within_budget(lms, lms.page_weights(lms.app.test_client(), lms.BUDGET_PAGES[:1]), lms.BUDGET_PAGES[:1])
+
+
+def test_signed_in_pages_stay_within_budget(lms, client):
+    assert_within_budget(lms, lms.page_weights(client, lms.BUDGET_PAGES[1:]), lms.BUDGET_PAGES[1:])
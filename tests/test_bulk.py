@@ -0,0 +1,37 @@
+"""Bulk imports match learners by email the way sign-up and sign-in store and look them up."""
+import io
+
+from werkzeug.security import generate_password_hash
+
+import lms_bulk
+
+
+def sign_in(lms, email):
+    return lms.app.test_client().post('/login', data={'email': email, 'password': 'password123'}).status_code
+
+
+def test_mixed_case_emails_match_across_import_signup_and_login(lms):
+    lms.app.test_client().post('/signup', data={'name': 'Alice', 'email': 'Alice@Corp.example', 'password': 'password123'})
+    password = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+    conn = lms.connect_db()
+    users = [{'name': 'Bob', 'email': ' Bob@Corp.example', 'password_hash': password},
+             {'name': 'Alice again', 'email': 'ALICE@corp.example', 'password_hash': password}]
+    assert lms_bulk.import_records(conn, 'users', iter(users), log=io.StringIO())[1] == 1  # Alice signed up already
+    enrollments = [{'email': 'alice@CORP.example', 'course_id': 2}, {'email': 'bob@corp.EXAMPLE', 'course_id': 3}]
+    assert lms_bulk.import_records(conn, 'enrollments', iter(enrollments), log=io.StringIO())[1] == 2
+    emails = [r[0] for r in conn.execute("SELECT email FROM user WHERE email LIKE '%@corp.example' ORDER BY email")]
+    assert emails == ['alice@corp.example', 'bob@corp.example']
+    conn.close()
+    assert sign_in(lms, 'Bob@Corp.example') == 302
+    assert sign_in(lms, 'alice@corp.example') == 302
+
+
+def test_migration_lowercases_existing_emails(lms, tmp_path):
+    conn = lms.connect_db(str(tmp_path / 'old.db'))
+    lms.migrate_db(conn)
+    conn.executemany("INSERT INTO user (name, email) VALUES (?, ?)", [('a', 'Carol@X.example'), ('b', 'Dan@X.example'), ('c', 'dan@x.example')])
+    conn.execute("DELETE FROM schema_version WHERE version = 16")  # as written before the migration existed
+    conn.commit()
+    lms.migrate_db(conn)
+    assert [r[0] for r in conn.execute("SELECT email FROM user ORDER BY name")] == ['carol@x.example', 'Dan@X.example', 'dan@x.example']
+    conn.close()
@@ -0,0 +1,27 @@
+"""Autosaved notes are scoped to the learner's own enrollment in the course in the URL."""
+
+
+def sync(client, course_id, *ops):
+    return client.post(f'/api/notes/{course_id}/sync', json={'ops': list(ops)})
+
+
+def bodies(client, course_id):
+    return {n['key']: n['body'] for n in client.get(f'/api/notes/{course_id}').get_json()['notes']}
+
+
+def test_same_key_in_two_courses_stays_two_notes(client):
+    assert sync(client, 1, {'key': 'shared-key-1', 'body': 'in course 1'}).status_code == 202
+    assert sync(client, 2, {'key': 'shared-key-1', 'body': 'in course 2'}).status_code == 202
+    assert bodies(client, 1)['shared-key-1'] == 'in course 1'
+    assert bodies(client, 2)['shared-key-1'] == 'in course 2'
+
+    assert sync(client, 2, {'key': 'shared-key-1', 'deleted': True}).status_code == 202
+    assert 'shared-key-1' not in bodies(client, 2)
+    assert bodies(client, 1)['shared-key-1'] == 'in course 1'
+
+
+def test_notes_need_an_enrollment(client):
+    for course_id in (6, 999999):  # a course the demo learner does not take, and one that does not exist
+        resp = sync(client, course_id, {'key': 'stray-note-1', 'body': 'x'})
+        assert resp.status_code == 403
+        assert bodies(client, course_id) == {}
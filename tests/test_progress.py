@@ -0,0 +1,41 @@
+"""The batched lesson-completion endpoint issues one certificate per finished course and reports only that one."""
+
+
+def query(lms, sql, params=()):
+    conn = lms.connect_db()
+    rows = [tuple(r) for r in conn.execute(sql, params)]
+    conn.close()
+    return rows
+
+
+def finish_course(lms, client, course_id):
+    [(total,)] = query(lms, "SELECT lesson_count FROM course WHERE id = ?", (course_id,))
+    events = [{'course_id': course_id, 'lesson': n} for n in range(total)] * 2  # replayed events too
+    resp = client.post('/api/progress/batch', json={'events': events})
+    assert resp.status_code == 200
+    return resp
+
+
+def certificates(lms, course_id):
+    return [cert_id for (cert_id,) in query(lms, "SELECT id FROM certificate WHERE user_id = 1 AND course_id = ?", (course_id,))]
+
+
+def test_batch_adds_only_inserted_certificates_to_the_filter(lms, client, monkeypatch):
+    client.post('/enroll/3')
+    added = []
+    monkeypatch.setattr(lms, 'certificate_issued', lambda ids: added.extend(ids))
+    finish_course(lms, client, 3)
+    assert added == certificates(lms, 3)
+    assert len(added) == 1
+
+    added.clear()
+    finish_course(lms, client, 3)  # replaying a finished course issues nothing
+    assert added == []
+
+
+def test_batch_queues_certificate_side_effects(lms, client):
+    client.post('/enroll/4')
+    finish_course(lms, client, 4)
+    [cert_id] = certificates(lms, 4)
+    jobs = [payload for (payload,) in query(lms, "SELECT payload FROM job WHERE kind = 'certificate_issued'")]
+    assert sum(f'"{cert_id}"' in payload for payload in jobs) == 1
@@ -0,0 +1,16 @@
+"""Every hot-path query in lms_main.PLAN_CHECKS must be answered from an index, never a full table scan."""
+
+
+def test_route_queries_use_indexes(lms, tmp_path):
+    conn = lms.connect_db(str(tmp_path / 'plans.db'))
+    lms.migrate_db(conn)
+    assert lms.find_table_scans(conn) == []
+    conn.close()
+
+
+def test_table_scan_is_reported(lms, tmp_path, monkeypatch):
+    monkeypatch.setattr(lms, 'PLAN_CHECKS', [('unindexed', "SELECT * FROM course WHERE description = ?", ('x',), ())])
+    conn = lms.connect_db(str(tmp_path / 'plans.db'))
+    lms.migrate_db(conn)
+    assert [name for name, _ in lms.find_table_scans(conn)] == ['unindexed']
+    conn.close()
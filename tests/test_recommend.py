@@ -0,0 +1,42 @@
+"""Enrollments refresh the neighbours of their course through the job queue, without waiting for `recommend-build`."""
+import lms_recommend
+from lms_store import SQLiteStore
+
+
+def neighbours(store):
+    return sorted(tuple(r) for r in store.conn.execute("SELECT course_id, rank, similar_id, score FROM course_similar"))
+
+
+def test_enrolling_refreshes_the_course_neighbours(lms, signed_in_learner, monkeypatch):
+    monkeypatch.setattr(lms, 'RECOMMEND_REFRESH_DELAY', 0)
+    conn = lms.connect_db()
+    store = SQLiteStore(conn)
+    new_course = conn.execute("INSERT INTO course (title, description, type, category) VALUES ('Rust in Production', 'Ownership and async.', 'Video', 'Backend') RETURNING id").fetchone()[0]
+    conn.commit()
+    lms.build_recommendations(store)
+    assert not any(new_course in (course, similar) for course, _, similar, _ in neighbours(store))
+
+    learners = [signed_in_learner(f'recommend-{n}') for n in range(3)]
+    for client in learners:
+        for course_id in (1, new_course): client.post(f'/enroll/{course_id}')
+    stale = lambda: {r[0] for r in conn.execute("SELECT course_id FROM course_similar_stale")}
+    assert {1, new_course} <= stale()
+    while lms.JOBS.work_one(): pass
+    assert not {1, new_course} & stale()
+
+    # The demo learner takes course 1, whose learners now also take the new course
+    assert new_course in [r['id'] for r in store.recommended(1, 10)]
+    assert neighbours(store) == sorted(lms_recommend.build(store.enrollment_pairs(), lms.RECOMMEND_K, lms.RECOMMEND_MIN_COMMON,
+                                                           lms.RECOMMEND_MAX_COURSES))  # what a full rebuild stores
+    conn.close()
+
+
+def test_one_refresh_is_queued_per_course(lms, client, signed_in_learner):
+    conn = lms.connect_db()
+    conn.execute("DELETE FROM course_similar_stale WHERE course_id = 5")
+    conn.commit()
+    before = conn.execute("SELECT COUNT(*) FROM job WHERE kind = 'recommend_refresh'").fetchone()[0]
+    client.post('/enroll/5')
+    signed_in_learner('recommend-queued').post('/enroll/5')
+    assert conn.execute("SELECT COUNT(*) FROM job WHERE kind = 'recommend_refresh'").fetchone()[0] == before + 1
+    conn.close()
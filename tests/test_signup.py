@@ -0,0 +1,28 @@
+"""A sign-up whose insert hits a locked database is retried without another throttle token or password hash."""
+import sqlite3
+
+import lms_store
+
+
+def test_locked_insert_retries_only_the_insert(lms, monkeypatch):
+    calls = {'take': 0, 'hash': 0, 'insert': 0}
+    take, hash_, create_user = lms.LOGIN_IP_LIMIT.take, lms.password_hasher.hash, lms_store.SQLiteStore.create_user
+    def counted_take(key):
+        calls['take'] += 1
+        return take(key)
+    def counted_hash(password):
+        calls['hash'] += 1
+        return hash_(password)
+    def locked_once(self, *args):
+        calls['insert'] += 1
+        if calls['insert'] == 1: raise sqlite3.OperationalError('database is locked')
+        return create_user(self, *args)
+    monkeypatch.setattr(lms.LOGIN_IP_LIMIT, 'take', counted_take)
+    monkeypatch.setattr(lms.password_hasher, 'hash', counted_hash)
+    monkeypatch.setattr(lms_store.SQLiteStore, 'create_user', locked_once)
+    resp = lms.app.test_client().post('/signup', data={'name': 'Retried', 'email': 'retried@example.com', 'password': 'password123'})
+    assert resp.status_code == 302
+    assert calls == {'take': 1, 'hash': 1, 'insert': 2}
+    conn = lms.connect_db()
+    assert conn.execute("SELECT COUNT(*) FROM user WHERE email = 'retried@example.com'").fetchone()[0] == 1
+    conn.close()
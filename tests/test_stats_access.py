@@ -0,0 +1,20 @@
+"""Operational counters are for admins; /metrics also accepts the scraper's bearer token."""
+import pytest
+
+STATS = ['/api/db-stats', '/api/notes-stats', '/api/auth-stats', '/api/jobs-stats', '/api/verify-stats',
+         '/api/wire-stats', '/api/recommend-stats', '/api/search-stats', '/metrics']
+
+
+@pytest.mark.parametrize('path', STATS)
+def test_stats_need_an_admin(lms, client, signed_in_learner, path):
+    assert lms.app.test_client().get(path).status_code == 302  # to the sign-in page
+    assert signed_in_learner('stats').get(path).status_code == 403
+    assert client.get(path).status_code == 200
+
+
+def test_metrics_accept_the_scrape_token(lms, monkeypatch):
+    monkeypatch.setattr(lms, 'METRICS_TOKEN', 's3cret')
+    anonymous = lms.app.test_client()
+    assert anonymous.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
+    assert anonymous.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 302
+    assert anonymous.get('/api/db-stats', headers={'Authorization': 'Bearer s3cret'}).status_code == 302
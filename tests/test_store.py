@@ -0,0 +1,270 @@
+"""The Store contract: the same calls give the same answers on SQLite and on PostgreSQL.
+
+Each test gets a freshly seeded database of each backend. PostgreSQL runs when psycopg is
+installed and a server can be had: LMS_TEST_DATABASE_URL (any database on a server where the
+tests may create and drop databases), else a throwaway server started with pgserver
+(`pip install pgserver`); without either, the postgres cases are skipped.
+"""
+import os
+import tempfile
+import uuid
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import lms_store
+
+PASSWORD_HASH = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+
+
+@pytest.fixture(scope='session')
+def postgres_url():
+    pytest.importorskip('psycopg')
+    url = os.environ.get('LMS_TEST_DATABASE_URL')
+    if url:
+        yield url
+        return
+    pgserver = pytest.importorskip('pgserver', reason='set LMS_TEST_DATABASE_URL or `pip install pgserver` to run the PostgreSQL cases')
+    try:
+        server = pgserver.get_server(tempfile.mkdtemp(prefix='lms-pg-'), cleanup_mode='stop')
+    except Exception as e:  # no initdb/postgres binaries for this platform, or they cannot run here
+        pytest.skip(f'cannot start PostgreSQL: {e}')
+    yield server.get_uri()
+    server.cleanup()
+
+
+def sqlite_store(lms, tmp_path):
+    conn = lms.connect_db(str(tmp_path / 'store.db'))
+    lms.migrate_db(conn)
+    lms.seed_db(conn)
+    yield lms_store.SQLiteStore(conn)
+    conn.close()
+
+
+def postgres_store(lms, url):
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+    name = f'lms_test_{uuid.uuid4().hex[:12]}'
+    with psycopg.connect(url, autocommit=True) as admin:
+        admin.execute(f'CREATE DATABASE {name}')
+    pool = lms_store.PostgresPool(make_conninfo(url, dbname=name), 1, 10)
+    conn = pool.acquire()
+    try:
+        store = lms_store.PostgresStore(conn)
+        store.create_schema()
+        store.seed(PASSWORD_HASH, lms.DEMO_COURSES)
+        yield store
+    finally:
+        pool.release(conn)
+        pool._pool.close()
+        with psycopg.connect(url, autocommit=True) as admin:
+            admin.execute(f'DROP DATABASE {name} WITH (FORCE)')
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def store(request, lms, tmp_path):
+    if request.param == 'sqlite':
+        yield from sqlite_store(lms, tmp_path)
+    else:
+        yield from postgres_store(lms, request.getfixturevalue('postgres_url'))
+
+
+def demo_uid(store):
+    return store.user_by_email('user@example.com')['id']
+
+
+def new_learner(store, n):
+    store.create_user(f'Learner {n}', f'learner{n}@example.com', PASSWORD_HASH)
+    return store.user_by_email(f'learner{n}@example.com')['id']
+
+
+def test_users(store):
+    assert store.user_by_email('user@example.com')['name'] == 'Demo Student'
+    assert store.user_by_email('nobody@example.com') is None
+    uid = new_learner(store, 1)
+    store.update_password(uid, 'changed')
+    store.commit()
+    assert store.user_by_email('learner1@example.com')['password'] == 'changed'
+
+
+def test_sessions(store):
+    store.save_session('a', '{"uid": 1}', 100.0)
+    store.save_session('b', '{}', 50.0)
+    store.save_session('a', '{"uid": 2}', 200.0)
+    store.commit()
+    assert store.session('a', 150.0)['data'] == '{"uid": 2}'
+    assert store.session('b', 60.0) is None  # expired
+    assert store.purge_sessions(60.0) == 1
+    store.delete_session('a')
+    store.commit()
+    assert store.session('a', 0.0) is None
+
+
+def test_enrollments(store):
+    uid = demo_uid(store)
+    assert store.user_stats(uid) == {'in_progress': 1, 'completed': 1}
+    assert sorted(r['course_id'] for r in store.enrollments(uid)) == [1, 2]
+    assert store.course_enrollment(uid, 2)['status'] == 'Completed'
+    assert store.course_enrollment(uid, 3) is None
+    assert [store.enroll(uid, 3), store.enroll(uid, 3)] == [1, 0]
+    store.commit()
+    assert store.user_stats(uid) == {'in_progress': 2, 'completed': 1}
+    assert store.recent_enrollments(uid, 1)[0]['course_id'] == 3
+    assert sorted((r['course_id'], r['progress']) for r in store.enrollment_progress(uid, [1, 3, 4])) == [(1, 45), (3, 0)]
+
+
+def test_progress_issues_one_certificate(lms, store):
+    uid = demo_uid(store)
+    store.enroll(uid, 3)
+    total = len(store.curriculum(3))
+    done = [store.complete_lesson(lms.progress_params(uid, 3, lesson=n, total=total)) for n in (0, 0, total, 1)]
+    assert done == [100 // total, 100 // total, None, 200 // total]  # a replay changes nothing, out of range updates no row
+    assert store.lessons_done(uid, 3) is not None
+    assert store.lessons_done(uid, 6) is None
+
+    store.enroll(uid, 4)
+    completions = [lms.progress_params(uid, 4, lesson=n, total=4) for n in range(4)]
+    issued = store.apply_progress(completions, [lms.progress_params(uid, 3, 0)])
+    assert [p['course_id'] for p in issued] == [4]
+    assert store.apply_progress(completions, []) == []
+    store.commit()
+    assert store.course_enrollment(uid, 4)['status'] == 'Completed'
+    [cert] = [c for c in store.certificate_list(uid) if c['id'] == issued[0]['cert_id']]
+    assert cert['course_title'] == 'Cloud Native DevOps'
+    assert store.certificate(uid, cert['id'])['course_title'] == 'Cloud Native DevOps'
+    assert store.certificate(uid + 1, cert['id']) is None
+    assert store.verify_certificate('CERT-101')['name'] == 'Demo Student'
+    assert store.certificate_count() == 2
+    seq, first = store.certificate_ids()[0]
+    assert first == 'CERT-101'
+    assert store.certificate_ids(seq) == [(store.certificate_ids()[1][0], cert['id'])]
+
+    assert store.advance_progress(lms.progress_params(uid, 1, 2)) == 95
+    assert store.advance_progress(lms.progress_params(uid, 1, 2)) == 100
+    assert store.issue_certificate(lms.progress_params(uid, 1)) == 1
+    assert store.issue_certificate(lms.progress_params(uid, 1)) == 0
+
+
+def test_catalogue_and_search(lms, store):
+    uid = demo_uid(store)
+    page = store.catalogue(uid, None, 0, 3)
+    assert [(r['id'], r['enrolled']) for r in page] == [(1, 1), (2, 1), (3, None)]
+    assert [r['id'] for r in store.catalogue(uid, None, 3, 10)] == [4, 5, 6]
+    assert [r['id'] for r in store.catalogue(uid, 'Python', 0, 10)] == [1, 6]
+    assert store.curriculum(1)[0]['position'] == 0
+    assert store.courses_after(4) == [(5, 'Agile Project Management', 'Management'), (6, 'Python for Data Science', 'Python')]
+    assert sorted(r['id'] for r in store.search(uid, ['py'], 10, lms.SEARCH_START, lms.SEARCH_CANDIDATES)) == [1, 6]
+    assert [r['id'] for r in store.search(uid, ['data', 'sci'], 10, lms.SEARCH_START, lms.SEARCH_CANDIDATES)] == [6]
+    assert store.search(uid, [], 10, lms.SEARCH_START, lms.SEARCH_CANDIDATES) == []
+
+
+def test_notes_are_keyed_per_course(store):
+    uid = demo_uid(store)
+    note = {'uid': uid, 'course_id': 1, 'lesson': 0, 'key': 'draft', 'body': 'first', 'at': '2024-01-01 00:00:00.000'}
+    store.save_notes([note, dict(note, course_id=2, body='other course'),
+                      dict(note, body='stale', at='2023-12-31 00:00:00.000'),  # older than what is saved: ignored
+                      dict(note, lesson=1, body='edited', at='2024-01-02 00:00:00.000')])
+    store.commit()
+    top = 2 ** 63 - 1
+    assert [(r['lesson'], r['body']) for r in store.notes(uid, 1, None, top, 10)] == [(1, 'edited')]
+    assert [r['body'] for r in store.notes(uid, 1, 0, top, 10)] == []
+    store.save_notes([dict(note, body=None)])
+    store.commit()
+    assert store.notes(uid, 1, None, top, 10) == []
+    assert [r['body'] for r in store.notes(uid, 2, None, top, 10)] == ['other course']
+
+
+def test_tickets_and_videos(store):
+    uid = demo_uid(store)
+    ticket_id = store.create_ticket(uid, 'Help', 'Body', 'a.pdf', 'receipt.pdf', '2024-01-01 00:00:00')
+    store.set_attachment_status(ticket_id, 'clean')
+    store.commit()
+    ticket = store.ticket(ticket_id)
+    assert (ticket['email'], ticket['attachment_status']) == ('user@example.com', 'clean')
+
+    video_id = store.create_video(1, 0, 'intro', 'mp4', 1024, 1.0)
+    video = store.video(video_id)
+    assert (video['course_title'], video['lesson_title'], video['status']) == ('Python Masterclass 2024', store.curriculum(1)[0]['title'], 'uploading')
+    store.publish_video(video, 2.0)
+    store.commit()
+    assert store.video(video_id)['status'] == 'ready'
+    assert store.curriculum(1)[0]['video_id'] == video_id
+    store.reject_video(video_id)
+    assert store.video(video_id)['status'] == 'rejected'
+
+
+def test_job_queue(store):
+    store.enqueue_job('a', '{}', 10.0, 10.0)
+    store.enqueue_job('b', '{}', 20.0, 10.0)
+    store.commit()
+    assert not store.job_ready(5.0)
+    assert store.job_ready(10.0)
+    job = store.claim_job(40.0, 25.0)
+    assert (job['kind'], job['attempts']) == ('a', 1)
+    assert store.job_counts(25.0)['ready'] == 1
+    store.finish_job(job['id'], 2)  # a stale claim settles nothing
+    store.finish_job(job['id'], 1)
+    job = store.claim_job(40.0, 25.0)
+    store.retry_job(job['id'], job['attempts'], 30.0, 'boom')
+    job = store.claim_job(40.0, 30.0)
+    assert job['attempts'] == 2
+    store.bury_job(job['id'], 2, 'boom again')
+    store.commit()
+    assert [(j['kind'], j['last_error']) for j in store.dead_jobs()] == [('b', 'boom again')]
+    counts = store.job_counts(30.0)
+    assert (counts['ready'], counts['running'], counts['delayed'], counts['dead']) == (0, 0, 0, 1)
+    assert store.requeue_dead_jobs(31.0) == 1
+    assert store.job_ready(31.0)
+
+
+def test_recommendations(lms, store):
+    uid = demo_uid(store)
+    for n in range(3):  # learners who take 1 and 3 together, and 2 and 4
+        learner = new_learner(store, n)
+        for course_id in (1, 2, 3, 4): store.enroll(learner, course_id)
+    store.commit()
+    assert store.enrollment_fingerprint()[0] == 14
+    assert sorted(store.enrollment_pairs())[:2] == [(uid, 1), (uid, 2)]
+    assert store.recommend_build() is None
+    rows = lms.build_recommendations(store)
+    assert {(course, similar) for course, _, similar, _ in rows if course == 1} == {(1, 2), (1, 3), (1, 4)}
+    assert store.recommend_build()['neighbours'] == len(rows)
+    assert lms.build_recommendations(store, if_changed=True) is None
+    assert [r['id'] for r in store.recommended(uid, 5)] == [3, 4]
+    assert [r['id'] for r in store.popular_courses(uid, 2)] == [3, 4]
+
+
+def test_recommendation_refresh(store):
+    uid = demo_uid(store)
+    assert [store.mark_course_stale(1), store.mark_course_stale(1)] == [True, False]
+    assert [store.take_stale_course(1), store.take_stale_course(1)] == [True, False]
+    learner = new_learner(store, 1)
+    for course_id in (1, 3): store.enroll(learner, course_id)
+    assert sorted(store.course_baskets(3)) == [(learner, 1), (learner, 3)]
+    assert sorted(store.course_baskets(1)) == [(uid, 1), (uid, 2), (learner, 1), (learner, 3)]
+    assert store.course_sizes([1, 3, 6]) == {1: 2, 3: 1}
+    store.replace_neighbours({1: [(0, 3, 0.7), (1, 2, 0.5)], 3: [(0, 1, 0.7)]})
+    store.replace_neighbours({3: [(0, 2, 0.9), (1, 1, 0.7)]})
+    store.commit()
+    assert store.neighbour_lists([1, 3, 6]) == {1: [(3, 0.7), (2, 0.5)], 3: [(2, 0.9), (1, 0.7)]}
+
+
+def test_analytics_rollups(store):
+    uid = demo_uid(store)
+    store.enroll(uid, 3)
+    store.commit()
+    totals = store.analytics_totals()
+    assert (totals['courses'], totals['enrolled'], totals['completed'], totals['certificates']) == (3, 3, 1, 1)
+    assert [(r['course_id'], r['enrolled']) for r in store.analytics_courses((2 ** 31, 0), 2)] == [(1, 1), (2, 1)]
+    assert store.analytics_course(2)['certificates'] == 1
+    assert store.analytics_course(6)['enrolled'] == 0
+    assert sum(store.progress_histogram(1).values()) == 1
+    assert store.analytics_daily(None, '2000-01-01', '2999-12-31')
+
+
+def test_backend_without_dialect_hooks_fails_when_constructed():
+    class Partial(lms_store.Store):
+        def match(self, terms):
+            return terms
+    with pytest.raises(TypeError, match='id_list'):
+        Partial(None)
@@ -0,0 +1,44 @@
+"""Support tickets keep their attachment through a retried database write, and oversized bodies are refused unread."""
+import io
+import os
+import sqlite3
+
+import lms_store
+
+
+def uploads(lms):
+    return set(os.listdir(lms.SUPPORT_UPLOAD_DIR)) if os.path.isdir(lms.SUPPORT_UPLOAD_DIR) else set()
+
+
+def post_ticket(client, data):
+    return client.post('/support', data={'subject': 'Broken video', 'body': 'It stops at 0:42.', 'attachment': (io.BytesIO(data), 'log.txt')},
+                       content_type='multipart/form-data')
+
+
+def test_locked_write_is_retried_without_losing_the_attachment(lms, client, monkeypatch):
+    create_ticket, calls = lms_store.SQLiteStore.create_ticket, []
+    def locked_once(self, *args):
+        calls.append(args)
+        if len(calls) == 1: raise sqlite3.OperationalError('database is locked')
+        return create_ticket(self, *args)
+    monkeypatch.setattr(lms_store.SQLiteStore, 'create_ticket', locked_once)
+    before = uploads(lms)
+    resp = post_ticket(client, b'x' * 1100)
+    assert resp.status_code == 302 and len(calls) == 2
+    [stored] = uploads(lms) - before  # no orphan from the first attempt
+    assert os.path.getsize(os.path.join(lms.SUPPORT_UPLOAD_DIR, stored)) == 1100
+    conn = lms.connect_db()
+    assert conn.execute("SELECT attachment FROM support_ticket ORDER BY id DESC LIMIT 1").fetchone()[0] == stored
+    conn.close()
+
+
+def test_oversized_upload_is_refused_before_it_is_saved(lms, client, monkeypatch):
+    monkeypatch.setattr(lms, 'SUPPORT_ATTACHMENT_MAX_BYTES', 1024)
+    conn = lms.connect_db()
+    tickets = conn.execute("SELECT COUNT(*) FROM support_ticket").fetchone()[0]
+    before = uploads(lms)
+    resp = post_ticket(client, b'x' * (lms.SUPPORT_FORM_MAX_BYTES + 2048))
+    assert resp.status_code == 302 and resp.headers['Location'].endswith('/support')
+    assert uploads(lms) == before
+    assert conn.execute("SELECT COUNT(*) FROM support_ticket").fetchone()[0] == tickets
+    conn.close()
@@ -0,0 +1,12 @@
+"""The public verification page is cached publicly, except when it is rendered inside a learner's signed-in shell."""
+
+
+def test_signed_out_page_and_json_are_public(lms, client):
+    assert lms.app.test_client().get('/verify/CERT-101').headers['Cache-Control'] == 'public, max-age=300'
+    assert client.get('/verify/CERT-101?format=json').headers['Cache-Control'] == 'public, max-age=300'
+
+
+def test_signed_in_page_is_private(client):
+    resp = client.get('/verify/CERT-101')
+    assert resp.status_code == 200 and 'Demo Student' in resp.get_data(as_text=True)
+    assert set(resp.headers['Cache-Control'].split(', ')) == {'private', 'no-cache'}